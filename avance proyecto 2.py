@@ -1,18 +1,51 @@
-import tkinter as tk
-from tkinter import messagebox
 import random
 import time
+import asyncio
+import base64
+import csv
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+import heapq
 from collections import deque # Necesario para la cola de BFS
-# REMOVIDO: import heapq (Ya no se usa la cola de prioridad de A*)
 
 # CONFIGURACIÓN Y CONSTANTES
 CELDA_TAMANO = 40
+VISTA_CELDAS = 15  # Celdas visibles por lado; los mapas más grandes se recorren con la cámara
+TAMANOS_MAPA = [15, 30, 60, 120, 250, 500]
 COLOR_FONDO = "#F0F0F0"
-FPS = 100
+TICKS_POR_SEGUNDO = 100  # Ritmo fijo de la simulación (energía, velocidad de enemigos, tiempos)
+FPS = 60  # Tope de dibujo; con carga se saltan frames pero no ticks
+MAX_TICKS_POR_FRAME = 10  # Si el atraso es mayor se descarta para no entrar en espiral
+TICKS_POR_PASO_TECLADO = 10  # Con una dirección mantenida el jugador avanza una celda cada 10 ticks
+MAX_PASOS_EN_COLA = 3  # Toques de tecla que se guardan para los ticks siguientes
 SEGUNDOS_COOLDOWN = 5
 SEGUNDOS_RESPAWN = 10
 ENERGIA_COSTO_CORRER = 8
 DISTANCIA_MINIMA_SALIDA = 8
+RADIO_REPLANIFICACION = 4 # Celdas que puede moverse el objetivo antes de recalcular un camino guardado
+TAMANO_CLUSTER = 10 # Lado de los bloques de la búsqueda jerárquica (HPA*)
+LARGO_ENTRADA_DOBLE = 6 # Desde este largo, una entrada entre bloques se marca en sus dos extremos
+PUERTO_SERVIDOR = 8765
+TICKS_POR_ENVIO = 5  # El servidor manda las diferencias cada 5 ticks (20 veces por segundo)
+LIMITE_BUFFER_CLIENTE = 1 << 20  # Un cliente que acumula más de esto sin leer se desconecta
+# El mapa de una sala se genera en el bucle que avanza todas las salas: a 120x120 tarda
+# unos 60 ms, menos que los MAX_TICKS_POR_FRAME ticks de atraso que se recuperan
+TAMANO_MAXIMO_SALA = 120
+RUTA_PUNTAJES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puntajes.db")
+RUTA_REPETICIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "repeticiones")
+MOVIMIENTOS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+PESOS_TERRENO = [60, 20, 10, 10]  # Camino, Muro, Túnel, Liana
 
 # COLORES PARA LA INTERFAZ
 BG_PRIMARIO = "#2C3E50"
@@ -29,6 +62,103 @@ COLORES_TERRENO = {
     3: "green"   # Liana
 }
 
+# INSTRUMENTACIÓN
+
+class _Tramo:
+    __slots__ = ('perfilador', 'nombre', 'inicio')
+
+    def __init__(self, perfilador, nombre):
+        self.perfilador = perfilador
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.perfilador.registrar_tramo(self.nombre, self.inicio, time.perf_counter())
+        return False
+
+
+class _TramoNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+class Perfilador:
+    """
+    Tramos de tiempo con nombre (with PERFILADOR.tramo('dibujo'): ...) y contadores de
+    eventos. Guarda las últimas `ventana` duraciones de cada tramo para calcular p50/p99 y,
+    si se pide, una traza que se exporta en formato Chrome trace (chrome://tracing,
+    Perfetto o speedscope). Desactivado, cada llamada cuesta una comparación.
+    """
+    def __init__(self, ventana=600, max_eventos=1_000_000):
+        self.activo = False
+        self.ventana = ventana
+        self.max_eventos = max_eventos
+        self.traza = None
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.origen = time.perf_counter()
+        self.duraciones = {}
+        self.contadores = {}
+        if self.traza is not None:
+            self.traza = deque(maxlen=self.max_eventos)
+
+    def activar(self, grabar_traza=False):
+        self.activo = True
+        if grabar_traza and self.traza is None:
+            self.traza = deque(maxlen=self.max_eventos)
+
+    def tramo(self, nombre):
+        return _Tramo(self, nombre) if self.activo else _TRAMO_NULO
+
+    def registrar_tramo(self, nombre, inicio, fin):
+        duracion = fin - inicio
+        duraciones = self.duraciones.get(nombre)
+        if duraciones is None:
+            duraciones = self.duraciones[nombre] = deque(maxlen=self.ventana)
+        duraciones.append(duracion)
+        if self.traza is not None:
+            self.traza.append((nombre, inicio, duracion))
+
+    def contar(self, nombre, cantidad=1):
+        if self.activo:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def percentiles(self, nombre):
+        valores = sorted(self.duraciones.get(nombre, ()))
+        return percentil(valores, 0.5), percentil(valores, 0.99)
+
+    def texto_resumen(self):
+        lineas = []
+        for nombre in sorted(self.duraciones):
+            p50, p99 = self.percentiles(nombre)
+            lineas.append(f"{nombre:<12} p50 {p50 * 1000:7.3f} ms  p99 {p99 * 1000:7.3f} ms")
+        for nombre, valor in sorted(self.contadores.items()):
+            lineas.append(f"{nombre:<20} {valor}")
+        return "\n".join(lineas)
+
+    def exportar_traza(self, ruta):
+        eventos = [{'name': nombre, 'cat': 'juego', 'ph': 'X', 'pid': 1, 'tid': 1,
+                    'ts': (inicio - self.origen) * 1e6, 'dur': duracion * 1e6}
+                   for nombre, inicio, duracion in (self.traza or ())]
+        eventos.append({'name': 'contadores', 'ph': 'C', 'pid': 1, 'tid': 1,
+                        'ts': (time.perf_counter() - self.origen) * 1e6, 'args': dict(self.contadores)})
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, archivo)
+        return ruta
+
+
+_TRAMO_NULO = _TramoNulo()
+PERFILADOR = Perfilador()
+
 # CLASES DE LÓGICA DE TERRENO Y ENTIDADES
 
 class Terreno:
@@ -53,6 +183,85 @@ class Liana(Terreno):
     def __init__(self):
         super().__init__(3, False, True)
 
+# Una instancia compartida por código de terreno (el código es el índice)
+TERRENOS = (Camino(), Muro(), Tunel(), Liana())
+
+# Tablas para bytearray.translate: código de terreno -> 1 si es transitable
+TABLA_JUGADOR = bytes(int(t.transitable_jugador) for t in TERRENOS).ljust(256, b'\0')
+TABLA_ENEMIGO = bytes(int(t.transitable_enemigo) for t in TERRENOS).ljust(256, b'\0')
+
+
+class FilaTerreno:
+    __slots__ = ('mapa', 'inicio')
+
+    def __init__(self, mapa, fila):
+        self.mapa = mapa
+        self.inicio = fila * mapa.columnas
+
+    def __len__(self):
+        return self.mapa.columnas
+
+    def __getitem__(self, columna):
+        if not 0 <= columna < self.mapa.columnas:
+            raise IndexError(columna)
+        return TERRENOS[self.mapa.codigos[self.inicio + columna]]
+
+    def __setitem__(self, columna, terreno):
+        if not 0 <= columna < self.mapa.columnas:
+            raise IndexError(columna)
+        self.mapa.asignar_indice(self.inicio + columna, terreno)
+
+
+class MapaTerreno:
+    """
+    Cuadrícula plana de códigos de terreno (un byte por celda) con máscaras de
+    tránsito precalculadas para el jugador y el enemigo.
+    mapa[r][c] devuelve el Terreno de la celda, como la antigua lista de listas.
+    Con mascaras se usan tal cual los códigos y las máscaras recibidos (p.ej. vistas de
+    solo lectura sobre un paquete de niveles); se copian recién al primer cambio.
+    """
+    def __init__(self, filas, columnas, codigos=None, mascaras=None):
+        self.filas = filas
+        self.columnas = columnas
+        if mascaras is not None:
+            self.codigos = codigos
+            self.mascara_jugador, self.mascara_enemigo = mascaras
+            return
+        self.codigos = bytearray(codigos) if codigos is not None else bytearray(filas * columnas)
+        self.actualizar_mascaras()
+
+    def actualizar_mascaras(self):
+        self.mascara_jugador = self.codigos.translate(TABLA_JUGADOR)
+        self.mascara_enemigo = self.codigos.translate(TABLA_ENEMIGO)
+
+    def __len__(self):
+        return self.filas
+
+    def __getitem__(self, fila):
+        if not 0 <= fila < self.filas:
+            raise IndexError(fila)
+        return FilaTerreno(self, fila)
+
+    def __iter__(self):
+        for fila in range(self.filas):
+            yield FilaTerreno(self, fila)
+
+    def indice(self, x, y):
+        return x * self.columnas + y
+
+    def dentro(self, x, y):
+        return 0 <= x < self.filas and 0 <= y < self.columnas
+
+    def asignar_indice(self, indice, terreno):
+        if not isinstance(self.codigos, bytearray):
+            self.codigos = bytearray(self.codigos)
+            self.mascara_jugador = bytearray(self.mascara_jugador)
+            self.mascara_enemigo = bytearray(self.mascara_enemigo)
+        codigo = terreno.simbolo
+        self.codigos[indice] = codigo
+        self.mascara_jugador[indice] = TABLA_JUGADOR[codigo]
+        self.mascara_enemigo[indice] = TABLA_ENEMIGO[codigo]
+
 class Jugador:
     def __init__(self, nombre, x, y):
         self.nombre = nombre
@@ -61,17 +270,14 @@ class Jugador:
         self.energia = 100
         self.trampas_disponibles = 3
         self.trampa_cooldown_fin = 0
+        self.trampa_lista = True
 
     def mover(self, dx, dy, mapa_logico, es_correr=False):
         nueva_x = self.x + dx
         nueva_y = self.y + dy
 
-        filas = len(mapa_logico)
-        columnas = len(mapa_logico[0])
-
-        if 0 <= nueva_x < filas and 0 <= nueva_y < columnas:
-            celda = mapa_logico[nueva_x][nueva_y]
-            if celda.transitable_jugador:
+        if mapa_logico.dentro(nueva_x, nueva_y):
+            if mapa_logico.mascara_jugador[mapa_logico.indice(nueva_x, nueva_y)]:
                 if es_correr:
                     if self.energia >= ENERGIA_COSTO_CORRER:
                         self.energia -= ENERGIA_COSTO_CORRER
@@ -88,57 +294,103 @@ class Jugador:
             self.energia = min(100, self.energia + 0.5)
 
     def colocar_trampa(self):
-        ahora = time.time()
-        if len(self.juego.trampas_activas) < 3 and ahora >= self.trampa_cooldown_fin:
+        ahora = self.juego.reloj()
+        if self.juego.indice.cantidad_trampas < self.juego.config['max_trampas'] and self.trampa_lista:
+            self.trampa_lista = False
             self.trampa_cooldown_fin = ahora + SEGUNDOS_COOLDOWN
+            self.juego.planificador.programar(SEGUNDOS_COOLDOWN * TICKS_POR_SEGUNDO, self._fin_cooldown)
             return (self.x, self.y, ahora)
         return None
 
+    def _fin_cooldown(self):
+        self.trampa_lista = True
+
 class Enemigo:
-    def __init__(self, x, y, modo_juego, velocidad_base):
+    def __init__(self, x, y, modo_juego, velocidad_base, buscador=None, radio_replanificacion=RADIO_REPLANIFICACION):
         self.x = x
         self.y = y
         self.modo_juego = modo_juego
         self.velocidad = velocidad_base
         self.contador_movimiento = 0
+        # Sin buscador se usa el campo de distancias compartido (o _bfs si no hay campo)
+        self.buscador = buscador
+        self.radio_replanificacion = radio_replanificacion
+        self.camino = None
+        self.objetivo_plan = None
+        self.mapa_plan = None
 
+    def listo_para_mover(self):
+        return self.contador_movimiento + 1 >= self.velocidad
 
     def _bfs(self, inicio, objetivo, mapa_logico):
         """
         Implementación de Búsqueda en Amplitud (BFS) para encontrar la ruta más corta.
+        Trabaja con índices planos sobre la máscara de tránsito del enemigo.
         """
-        filas, columnas = len(mapa_logico), len(mapa_logico[0])
-        cola = deque([inicio])
-        padre = {inicio: None}
-        visitados = {inicio}
+        columnas = mapa_logico.columnas
+        total = mapa_logico.filas * columnas
+        mascara = mapa_logico.mascara_enemigo
+        inicio_idx = mapa_logico.indice(*inicio)
+        objetivo_idx = mapa_logico.indice(*objetivo)
+
+        cola = deque([inicio_idx])
+        padre = {inicio_idx: None}
+        visitados = bytearray(total)
+        visitados[inicio_idx] = 1
 
         while cola:
-            x, y = cola.popleft()
-            actual = (x, y)
+            actual = cola.popleft()
 
-            if actual == objetivo:
+            if actual == objetivo_idx:
+                PERFILADOR.contar('nodos_expandidos', len(padre))
                 camino = []
-                while actual != inicio:
+                while actual != inicio_idx:
                     camino.append(actual)
                     actual = padre[actual]
-                return camino[-1] if camino else None 
-
-            posibles_movimientos = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-
-            for dx, dy in posibles_movimientos:
-                nx, ny = x + dx, y + dy
-                vecino = (nx, ny)
-
-                if 0 <= nx < filas and 0 <= ny < columnas and vecino not in visitados:
-                    terreno = mapa_logico[nx][ny]
-                    if terreno.transitable_enemigo:
-                        visitados.add(vecino)
-                        padre[vecino] = actual
-                        cola.append(vecino)
+                return divmod(camino[-1], columnas) if camino else None
+
+            y = actual % columnas
+            # Mismo orden que antes: arriba, abajo, izquierda, derecha
+            for vecino, valido in ((actual - columnas, actual >= columnas),
+                                   (actual + columnas, actual + columnas < total),
+                                   (actual - 1, y > 0),
+                                   (actual + 1, y < columnas - 1)):
+                if valido and not visitados[vecino] and mascara[vecino]:
+                    visitados[vecino] = 1
+                    padre[vecino] = actual
+                    cola.append(vecino)
+        PERFILADOR.contar('nodos_expandidos', len(padre))
         return None 
 
+    def _paso_planificado(self, inicio, objetivo, mapa_logico, conectividad=None):
+        # El camino se guarda invertido (el próximo paso al final) y se reutiliza mientras el
+        # objetivo no se aleje del punto planificado más que el radio. Cerca del final la
+        # tolerancia se reduce, para no perseguir una posición vieja del jugador.
+        columnas = mapa_logico.columnas
+        mascara = mapa_logico.mascara_enemigo
+        camino = self.camino if self.mapa_plan is mapa_logico else None
+
+        if camino:
+            fila_plan, col_plan = divmod(self.objetivo_plan, columnas)
+            desvio = abs(fila_plan - objetivo[0]) + abs(col_plan - objetivo[1])
+            if desvio > min(self.radio_replanificacion, len(camino) // 2) or not mascara[camino[-1]]:
+                camino = None
+
+        if not camino:
+            inicio_idx = mapa_logico.indice(*inicio)
+            if conectividad is not None and not conectividad.enemigo_puede_llegar(inicio, objetivo):
+                camino = None
+            else:
+                camino = self.buscador.buscar(mapa_logico, mascara, inicio_idx, mapa_logico.indice(*objetivo))
+            self.camino = camino
+            self.objetivo_plan = mapa_logico.indice(*objetivo)
+            self.mapa_plan = mapa_logico
+            if not camino:
+                return None
+
+        return divmod(camino.pop(), columnas)
 
-    def mover_ia(self, jugador_pos, mapa_logico, salida_pos):
+    def mover_ia(self, jugador_pos, mapa_logico, salida_pos, campo=None, conectividad=None):
         self.contador_movimiento += 1
         if self.contador_movimiento < self.velocidad:
             return False
@@ -152,7 +404,16 @@ class Enemigo:
         else:
             objetivo = salida_pos
 
-        siguiente_paso = self._bfs(inicio, objetivo, mapa_logico)
+        # Con un campo de distancias compartido el paso se lee en O(1); el buscador
+        # incremental guarda su propio árbol y también responde sin camino guardado
+        if self.buscador is not None and self.buscador.incremental:
+            siguiente_paso = self.buscador.siguiente_paso(inicio, objetivo, mapa_logico, conectividad)
+        elif self.buscador is not None:
+            siguiente_paso = self._paso_planificado(inicio, objetivo, mapa_logico, conectividad)
+        elif campo is not None and campo.objetivo == objetivo:
+            siguiente_paso = campo.siguiente_paso(inicio)
+        else:
+            siguiente_paso = self._bfs(inicio, objetivo, mapa_logico)
 
         if siguiente_paso:
             self.x, self.y = siguiente_paso
@@ -160,23 +421,1462 @@ class Enemigo:
         return False
 
 
+def vecinos_celda(filas, columnas, celda):
+    # Vecinos ortogonales de un índice lineal que quedan dentro del mapa
+    y = celda % columnas
+    if celda >= columnas:
+        yield celda - columnas
+    if celda < (filas - 1) * columnas:
+        yield celda + columnas
+    if y > 0:
+        yield celda - 1
+    if y < columnas - 1:
+        yield celda + 1
+
+
+class CampoDistancias:
+    """
+    BFS inverso desde el objetivo sobre las celdas transitables por el enemigo
+    (o por quien indique la máscara). Se calcula una vez por objetivo y todos los
+    enemigos lo consultan en O(1).
+    """
+    def __init__(self, mapa_logico, objetivo, version_mapa=0, mascara=None, distancias=None):
+        self.filas, self.columnas = mapa_logico.filas, mapa_logico.columnas
+        self.objetivo = objetivo
+        self.version_mapa = version_mapa
+        if distancias is not None:
+            # Ya calculadas (paquete de niveles)
+            self.distancias = distancias
+            return
+        self.distancias = array('i', [-1]) * (self.filas * self.columnas)
+        PERFILADOR.contar('campos_distancia')
+        self._calcular(mapa_logico.mascara_enemigo if mascara is None else mascara)
+
+    def _calcular(self, mascara):
+        columnas = self.columnas
+        total = self.filas * columnas
+        distancias = self.distancias
+        origen = self.objetivo[0] * columnas + self.objetivo[1]
+
+        # Igual que en _bfs, el objetivo también debe ser transitable
+        if not mascara[origen]:
+            return
+
+        distancias[origen] = 0
+        cola = deque([origen])
+
+        while cola:
+            actual = cola.popleft()
+            siguiente = distancias[actual] + 1
+            y = actual % columnas
+
+            for vecino, valido in ((actual - columnas, actual >= columnas),
+                                   (actual + columnas, actual + columnas < total),
+                                   (actual - 1, y > 0),
+                                   (actual + 1, y < columnas - 1)):
+                if valido and distancias[vecino] == -1 and mascara[vecino]:
+                    distancias[vecino] = siguiente
+                    cola.append(vecino)
+
+    def celda_cambiada(self, mascara, celda, version_mapa):
+        """
+        Repara las distancias después de que celda se abrió o se cerró en la máscara.
+        Abrir solo puede acortar: se propaga un BFS desde la celda por donde mejora. Cerrar
+        alarga a las celdas cuyos caminos mínimos pasaban todos por ella; esas se buscan
+        por niveles y se recalculan desde el borde que no cambió. Devuelve las celdas que
+        cambiaron como (celda, distancia anterior).
+        """
+        self.version_mapa = version_mapa
+        if not isinstance(self.distancias, array):
+            # Vista de solo lectura sobre un paquete de niveles: se copia al primer cambio
+            self.distancias = array('i', self.distancias)
+        distancias = self.distancias
+        origen = self.objetivo[0] * self.columnas + self.objetivo[1]
+        filas, columnas = self.filas, self.columnas
+
+        if celda == origen:
+            anteriores = array('i', distancias)
+            distancias[:] = array('i', [-1]) * len(distancias)
+            self._calcular(mascara)
+            return [(idx, anterior) for idx, anterior in enumerate(anteriores) if distancias[idx] != anterior]
+
+        if mascara[celda]:
+            if distancias[celda] != -1:
+                return []
+            alcanzados = [distancias[vecino] for vecino in vecinos_celda(filas, columnas, celda) if distancias[vecino] >= 0]
+            if not alcanzados:
+                return []
+            distancias[celda] = min(alcanzados) + 1
+            cambios = [(celda, -1)]
+            cola = deque([celda])
+            while cola:
+                actual = cola.popleft()
+                siguiente = distancias[actual] + 1
+                for vecino in vecinos_celda(filas, columnas, actual):
+                    anterior = distancias[vecino]
+                    if mascara[vecino] and (anterior == -1 or anterior > siguiente):
+                        distancias[vecino] = siguiente
+                        cambios.append((vecino, anterior))
+                        cola.append(vecino)
+            return cambios
+
+        if distancias[celda] == -1:
+            return []
+        # Afectadas: cada una sin otro vecino a distancia uno menos que no sea afectado. Al
+        # marcarla se pone en -1, así ese vecino deja de contar para sus hijas
+        cambios = [(celda, distancias[celda])]
+        cola = deque(vecino for vecino in vecinos_celda(filas, columnas, celda) if distancias[vecino] == distancias[celda] + 1)
+        distancias[celda] = -1
+        vistas = set(cola)
+        afectadas = []
+        while cola:
+            actual = cola.popleft()
+            anterior = distancias[actual]
+            if any(distancias[vecino] == anterior - 1 and mascara[vecino] for vecino in vecinos_celda(filas, columnas, actual)):
+                continue
+            distancias[actual] = -1
+            cambios.append((actual, anterior))
+            afectadas.append(actual)
+            for vecino in vecinos_celda(filas, columnas, actual):
+                if vecino not in vistas and distancias[vecino] == anterior + 1:
+                    vistas.add(vecino)
+                    cola.append(vecino)
+
+        # Las afectadas se recalculan desde los vecinos que conservaron su distancia
+        abiertos = []
+        for actual in afectadas:
+            alcanzados = [distancias[vecino] for vecino in vecinos_celda(filas, columnas, actual) if distancias[vecino] >= 0]
+            if alcanzados:
+                abiertos.append((min(alcanzados) + 1, actual))
+        heapq.heapify(abiertos)
+        while abiertos:
+            distancia, actual = heapq.heappop(abiertos)
+            if distancias[actual] != -1:
+                continue
+            distancias[actual] = distancia
+            for vecino in vecinos_celda(filas, columnas, actual):
+                if distancias[vecino] == -1 and mascara[vecino]:
+                    heapq.heappush(abiertos, (distancia + 1, vecino))
+        return cambios
+
+    def distancia(self, pos):
+        return self.distancias[pos[0] * self.columnas + pos[1]]
+
+    def siguiente_paso(self, pos):
+        x, y = pos
+        if self.distancias[x * self.columnas + y] == 0:
+            return None
+
+        # La celda propia puede no estar en el campo (p.ej. un enemigo que aparece sobre un muro),
+        # por eso se elige el vecino alcanzado con menor distancia
+        mejor_paso, mejor_distancia = None, -1
+        for dx, dy in MOVIMIENTOS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.filas and 0 <= ny < self.columnas:
+                distancia = self.distancias[nx * self.columnas + ny]
+                if distancia >= 0 and (mejor_paso is None or distancia < mejor_distancia):
+                    mejor_paso, mejor_distancia = (nx, ny), distancia
+        return mejor_paso
+
+
+def heuristica_manhattan(a, b, columnas):
+    fila_a, col_a = divmod(a, columnas)
+    fila_b, col_b = divmod(b, columnas)
+    return abs(fila_a - fila_b) + abs(col_a - col_b)
+
+
+def heuristica_cero(a, b, columnas):
+    # Convierte A* en Dijkstra; sirve de referencia para medir la heurística
+    return 0
+
+
+HEURISTICAS = {'manhattan': heuristica_manhattan, 'cero': heuristica_cero}
+
+
+class BuscadorAEstrella:
+    """
+    A* sobre índices planos de una máscara de tránsito (4 vecinos, costo 1). Lleva la
+    cuenta de consultas y nodos expandidos para comparar algoritmos y heurísticas.
+    """
+    incremental = False
+
+    def __init__(self, heuristica='manhattan'):
+        self.nombre_heuristica = heuristica
+        self.heuristica = HEURISTICAS[heuristica]
+        self.consultas = 0
+        self.expansiones = 0
+        self.ultimas_expansiones = 0
+
+    def celda_cambiada(self, celda):
+        # No guarda nada entre consultas
+        pass
+
+    def _sucesores(self, actual, padre, mascara, columnas, filas, objetivo):
+        y = actual % columnas
+        for vecino, valido in ((actual - columnas, actual >= columnas),
+                               (actual + columnas, actual < (filas - 1) * columnas),
+                               (actual - 1, y > 0),
+                               (actual + 1, y < columnas - 1)):
+            if valido and mascara[vecino]:
+                yield vecino, 1
+
+    def buscar(self, mapa_logico, mascara, inicio, objetivo):
+        """
+        Devuelve las celdas del camino de inicio a objetivo (sin incluir inicio) en orden
+        inverso, para consumirlas con pop(); None si no hay camino.
+        """
+        self.consultas += 1
+        self.ultimas_expansiones = 0
+        # Igual que en _bfs, el objetivo también debe ser transitable
+        if not mascara[objetivo]:
+            return None
+
+        columnas, filas = mapa_logico.columnas, mapa_logico.filas
+        heuristica = self.heuristica
+        costo = {inicio: 0}
+        padre = {inicio: None}
+        h = heuristica(inicio, objetivo, columnas)
+        # Empates en f se resuelven por menor h: se avanza hacia el objetivo
+        abiertos = [(h, h, 0, inicio)]
+        expansiones = 0
+
+        while abiertos:
+            _, _, g, actual = heapq.heappop(abiertos)
+            if g != costo[actual]:
+                continue
+            if actual == objetivo:
+                break
+            expansiones += 1
+
+            for vecino, paso in self._sucesores(actual, padre[actual], mascara, columnas, filas, objetivo):
+                nuevo = g + paso
+                if nuevo < costo.get(vecino, nuevo + 1):
+                    costo[vecino] = nuevo
+                    padre[vecino] = actual
+                    h = heuristica(vecino, objetivo, columnas)
+                    heapq.heappush(abiertos, (nuevo + h, h, nuevo, vecino))
+        else:
+            actual = None
+
+        self.ultimas_expansiones = expansiones
+        self.expansiones += expansiones
+        PERFILADOR.contar('nodos_expandidos', expansiones)
+        if actual is None:
+            return None
+
+        # Entre puntos consecutivos del camino solo hay tramos rectos (JPS salta varias celdas)
+        camino = []
+        while actual != inicio:
+            anterior = padre[actual]
+            paso = (1 if actual > anterior else -1) * (1 if actual // columnas == anterior // columnas else columnas)
+            while actual != anterior:
+                camino.append(actual)
+                actual -= paso
+        return camino
+
+
+class BuscadorJPS(BuscadorAEstrella):
+    """
+    Jump Point Search para grillas de costo uniforme con 4 vecinos (la variante sin
+    diagonales de PathFinding.js). En lugar de encolar cada celda de un pasillo, salta
+    en línea recta hasta la próxima celda con un vecino forzado.
+    """
+    def _sucesores(self, actual, padre, mascara, columnas, filas, objetivo):
+        fila, col = divmod(actual, columnas)
+        if padre is None:
+            direcciones = MOVIMIENTOS
+        else:
+            fila_padre, col_padre = divmod(padre, columnas)
+            d_fila = (fila > fila_padre) - (fila < fila_padre)
+            d_col = (col > col_padre) - (col < col_padre)
+            if d_col:
+                direcciones = ((0, d_col), (-1, 0), (1, 0))
+            else:
+                direcciones = ((d_fila, 0), (0, -1), (0, 1))
+
+        for d_fila, d_col in direcciones:
+            f, c = fila + d_fila, col + d_col
+            if not (0 <= f < filas and 0 <= c < columnas):
+                continue
+            if d_col:
+                salto = self._saltar_horizontal(f * columnas + c, f, c, d_col, mascara, columnas, filas, objetivo)
+            else:
+                salto = self._saltar_vertical(f * columnas + c, f, c, d_fila, mascara, columnas, filas, objetivo)
+            if salto is not None:
+                yield salto, abs(salto // columnas - fila) + abs(salto % columnas - col)
+
+    def _saltar_horizontal(self, idx, fila, col, d_col, mascara, columnas, filas, objetivo):
+        # La celda de la que se viene siempre existe, así que idx - d_col nunca se sale de la fila
+        arriba = fila > 0
+        abajo = fila < filas - 1
+        while 0 <= col < columnas and mascara[idx]:
+            if idx == objetivo:
+                return idx
+            if arriba and mascara[idx - columnas] and not mascara[idx - columnas - d_col]:
+                return idx
+            if abajo and mascara[idx + columnas] and not mascara[idx + columnas - d_col]:
+                return idx
+            idx += d_col
+            col += d_col
+        return None
+
+    def _saltar_vertical(self, idx, fila, col, d_fila, mascara, columnas, filas, objetivo):
+        paso = d_fila * columnas
+        izquierda = col > 0
+        derecha = col < columnas - 1
+        while 0 <= fila < filas and mascara[idx]:
+            if idx == objetivo:
+                return idx
+            if izquierda and mascara[idx - 1] and not mascara[idx - 1 - paso]:
+                return idx
+            if derecha and mascara[idx + 1] and not mascara[idx + 1 - paso]:
+                return idx
+            # Al avanzar en vertical hay que mirar si algún salto horizontal encuentra algo
+            if (derecha and self._saltar_horizontal(idx + 1, fila, col + 1, 1, mascara, columnas, filas, objetivo) is not None) or \
+                    (izquierda and self._saltar_horizontal(idx - 1, fila, col - 1, -1, mascara, columnas, filas, objetivo) is not None):
+                return idx
+            idx += paso
+            fila += d_fila
+        return None
+
+
+class BuscadorIncremental:
+    """
+    Búsqueda hacia atrás desde el objetivo que se conserva entre ticks (la idea de
+    Fringe-Retrieving A*). Guarda el árbol de caminos mínimos que sale del objetivo: un
+    enemigo que ya está en el árbol da su paso leyendo su padre, y si no, la búsqueda
+    sigue desde la frontera guardada hasta alcanzarlo. Cuando el objetivo se mueve a una
+    celda del árbol se conserva el subárbol que cuelga de ella (sus distancias siguen
+    siendo exactas, corridas en lo que valía la nueva raíz); al cerrarse una celda solo se
+    recorta lo que colgaba de ella. Lo conservado depende de la zona buscada, no del mapa.
+    """
+    incremental = True
+
+    def __init__(self, heuristica='manhattan'):
+        self.nombre_heuristica = heuristica
+        self.heuristica = HEURISTICAS[heuristica]
+        self.consultas = 0
+        self.expansiones = 0
+        self.ultimas_expansiones = 0
+        self.reinicios = 0
+        self.mapa = None
+        self._reiniciar(None)
+
+    def _reiniciar(self, raiz):
+        self.raiz = raiz
+        # Cerradas: distancia exacta a la raíz y celda siguiente hacia ella
+        self.distancias = {} if raiz is None else {raiz: 0}
+        self.padres = {} if raiz is None else {raiz: None}
+        # Celdas que el enemigo no puede pisar pero donde hay uno parado -> su paso
+        self.sumideros = {}
+        self.frontera = {}
+        self.meta = None
+        if raiz is not None:
+            self.reinicios += 1
+            self._rehacer_frontera()
+
+    def _rehacer_frontera(self):
+        # Vecinos transitables de lo cerrado con su mejor distancia tentativa; la cola se
+        # arma de nuevo en la próxima búsqueda
+        mascara = self.mapa.mascara_enemigo
+        filas, columnas = self.mapa.filas, self.mapa.columnas
+        distancias, frontera = self.distancias, {}
+        for celda, distancia in distancias.items():
+            if not mascara[celda]:
+                continue
+            for vecino in vecinos_celda(filas, columnas, celda):
+                if vecino not in distancias and mascara[vecino]:
+                    actual = frontera.get(vecino)
+                    if actual is None or distancia + 1 < actual[0]:
+                        frontera[vecino] = (distancia + 1, celda)
+        self.frontera = frontera
+        self.sumideros = {}
+        self.meta = None
+
+    def _subarbol(self, raiz):
+        # Celdas cerradas cuya cadena de padres pasa por raiz (raiz incluida)
+        dentro = {raiz: True}
+        padres = self.padres
+        for celda in self.distancias:
+            recorridas = []
+            actual = celda
+            while actual is not None and actual not in dentro:
+                recorridas.append(actual)
+                actual = padres[actual]
+            valor = actual is not None and dentro[actual]
+            for recorrida in recorridas:
+                dentro[recorrida] = valor
+        return [celda for celda, valor in dentro.items() if valor]
+
+    def _reenraizar(self, raiz):
+        if raiz not in self.distancias or not self.mapa.mascara_enemigo[raiz]:
+            self._reiniciar(raiz)
+            return
+        base = self.distancias[raiz]
+        conservadas = self._subarbol(raiz)
+        self.distancias = {celda: self.distancias[celda] - base for celda in conservadas}
+        self.padres = {celda: self.padres[celda] for celda in conservadas}
+        self.padres[raiz] = None
+        self.raiz = raiz
+        self._rehacer_frontera()
+
+    def celda_cambiada(self, celda):
+        if self.mapa is None or self.raiz is None:
+            return
+        mascara = self.mapa.mascara_enemigo
+        if celda == self.raiz:
+            self._reiniciar(self.raiz)
+            return
+        if not mascara[celda]:
+            # Se cerró: lo que colgaba de ella deja el árbol y se vuelve a buscar desde el borde
+            if celda in self.distancias:
+                quitadas = set(self._subarbol(celda))
+                self.distancias = {c: d for c, d in self.distancias.items() if c not in quitadas}
+                self.padres = {c: p for c, p in self.padres.items() if c not in quitadas}
+            self._rehacer_frontera()
+            return
+        if celda in self.distancias:
+            return
+        # Se abrió: si acorta el camino de alguna celda cerrada se empieza de nuevo; si no,
+        # solo es una celda más en la frontera
+        alcanzadas = [self.distancias[vecino] for vecino in vecinos_celda(self.mapa.filas, self.mapa.columnas, celda)
+                      if vecino in self.distancias and mascara[vecino]]
+        if alcanzadas and max(alcanzadas) > min(alcanzadas) + 2:
+            self._reiniciar(self.raiz)
+        else:
+            self._rehacer_frontera()
+
+    def _buscar(self, meta):
+        # A* desde la frontera guardada hasta cerrar meta; True si la alcanzó
+        mapa, mascara = self.mapa, self.mapa.mascara_enemigo
+        filas, columnas = mapa.filas, mapa.columnas
+        distancias, padres, frontera, heuristica = self.distancias, self.padres, self.frontera, self.heuristica
+
+        if meta != self.meta:
+            # Otra meta cambia la heurística: se reordena la frontera
+            if not mascara[meta] and meta not in frontera:
+                for vecino in vecinos_celda(filas, columnas, meta):
+                    if vecino in distancias and mascara[vecino]:
+                        distancia = distancias[vecino] + 1
+                        if meta not in frontera or distancia < frontera[meta][0]:
+                            frontera[meta] = (distancia, vecino)
+            self.abiertos = []
+            for celda, (distancia, _) in frontera.items():
+                h = heuristica(celda, meta, columnas)
+                self.abiertos.append((distancia + h, h, distancia, celda))
+            heapq.heapify(self.abiertos)
+            self.meta = meta
+        abiertos = self.abiertos
+
+        expansiones = 0
+        while meta not in distancias and meta not in self.sumideros:
+            if not abiertos:
+                break
+            _, _, distancia, celda = heapq.heappop(abiertos)
+            entrada = frontera.get(celda)
+            if entrada is None or entrada[0] != distancia:
+                continue
+            del frontera[celda]
+            if not mascara[celda]:
+                # Solo la meta entra sin ser transitable: se guarda su paso pero no se expande
+                self.sumideros[celda] = entrada[1]
+                continue
+            distancias[celda] = distancia
+            padres[celda] = entrada[1]
+            expansiones += 1
+            for vecino in vecinos_celda(filas, columnas, celda):
+                if vecino in distancias or not (mascara[vecino] or vecino == meta):
+                    continue
+                nueva = distancia + 1
+                actual = frontera.get(vecino)
+                if actual is None or nueva < actual[0]:
+                    frontera[vecino] = (nueva, celda)
+                    h = heuristica(vecino, meta, columnas)
+                    heapq.heappush(abiertos, (nueva + h, h, nueva, vecino))
+
+        self.ultimas_expansiones = expansiones
+        self.expansiones += expansiones
+        PERFILADOR.contar('nodos_expandidos', expansiones)
+        return meta in distancias or meta in self.sumideros
+
+    def siguiente_paso(self, inicio, objetivo, mapa_logico, conectividad=None):
+        self.consultas += 1
+        self.ultimas_expansiones = 0
+        raiz = mapa_logico.indice(*objetivo)
+        if mapa_logico is not self.mapa:
+            self.mapa = mapa_logico
+            self._reiniciar(raiz)
+        elif raiz != self.raiz:
+            self._reenraizar(raiz)
+
+        celda = mapa_logico.indice(*inicio)
+        # Igual que en _bfs, el objetivo también debe ser transitable
+        if celda == raiz or not mapa_logico.mascara_enemigo[raiz]:
+            return None
+        if conectividad is not None and not conectividad.enemigo_puede_llegar(inicio, objetivo):
+            return None
+        if not self._buscar(celda):
+            return None
+        paso = self.padres[celda] if celda in self.distancias else self.sumideros[celda]
+        return divmod(paso, mapa_logico.columnas)
+
+
+class GrafoJerarquico:
+    """
+    Capa abstracta de HPA* (Botea, Müller y Schaeffer) sobre una máscara de tránsito. El
+    mapa se parte en bloques de tamano x tamano; en cada borde entre bloques vecinos se
+    marcan entradas (una por tramo abierto, o dos si el tramo es largo) y dentro de cada
+    bloque se guardan las distancias entre sus entradas. Una consulta larga recorre solo
+    ese grafo chico y después se refina bloque por bloque.
+    Los bordes se calculan al construir; las distancias internas de cada bloque, la primera
+    vez que una búsqueda pasa por él, y se descartan cuando cambia una celda del bloque.
+    """
+    def __init__(self, mapa_logico, mascara, tamano=TAMANO_CLUSTER):
+        self.filas, self.columnas = mapa_logico.filas, mapa_logico.columnas
+        self.mascara = mascara
+        self.tamano = tamano
+        self.bloques_fila = -(-self.filas // tamano)
+        self.bloques_columna = -(-self.columnas // tamano)
+        self.bordes = {}
+        self.entradas = {}
+        self.aristas = {}
+        self.recalculos = 0
+        self.exploradas = 0
+
+        for bloque in range(self.bloques_fila * self.bloques_columna):
+            for vecino in self._vecinos_siguientes(bloque):
+                self._calcular_borde(bloque, vecino)
+
+    def bloque_de(self, celda):
+        fila, col = divmod(celda, self.columnas)
+        return (fila // self.tamano) * self.bloques_columna + col // self.tamano
+
+    def _limites(self, bloque):
+        fila, col = divmod(bloque, self.bloques_columna)
+        fila, col = fila * self.tamano, col * self.tamano
+        return fila, min(fila + self.tamano, self.filas), col, min(col + self.tamano, self.columnas)
+
+    def _vecinos_siguientes(self, bloque):
+        # Bloque de la derecha y de abajo: cada borde se guarda una sola vez como (menor, mayor)
+        fila, col = divmod(bloque, self.bloques_columna)
+        if col < self.bloques_columna - 1:
+            yield bloque + 1
+        if fila < self.bloques_fila - 1:
+            yield bloque + self.bloques_columna
+
+    def _bordes_de(self, bloque):
+        fila, col = divmod(bloque, self.bloques_columna)
+        if col > 0:
+            yield (bloque - 1, bloque)
+        if fila > 0:
+            yield (bloque - self.bloques_columna, bloque)
+        for vecino in self._vecinos_siguientes(bloque):
+            yield (bloque, vecino)
+
+    def _calcular_borde(self, bloque, vecino):
+        columnas, mascara = self.columnas, self.mascara
+        fila0, fila1, col0, col1 = self._limites(bloque)
+        if vecino == bloque + 1:
+            pares = [(f * columnas + col1 - 1, f * columnas + col1) for f in range(fila0, fila1)]
+        else:
+            pares = [((fila1 - 1) * columnas + c, fila1 * columnas + c) for c in range(col0, col1)]
+
+        entradas, tramo = [], []
+        for par in pares + [None]:
+            if par is not None and mascara[par[0]] and mascara[par[1]]:
+                tramo.append(par)
+                continue
+            if len(tramo) >= LARGO_ENTRADA_DOBLE:
+                entradas += [tramo[0], tramo[-1]]
+            elif tramo:
+                entradas.append(tramo[len(tramo) // 2])
+            tramo = []
+        self.bordes[(bloque, vecino)] = entradas
+
+    def _calcular_bloque(self, bloque):
+        # Entradas propias con sus vecinas del otro lado, y distancias internas entre entradas
+        if bloque in self.aristas:
+            return
+        entradas = {}
+        for borde in self._bordes_de(bloque):
+            propio = 0 if borde[0] == bloque else 1
+            for par in self.bordes[borde]:
+                entradas.setdefault(par[propio], []).append(par[1 - propio])
+
+        aristas = {}
+        for entrada in entradas:
+            distancias, _ = self._explorar(entrada, bloque)
+            aristas[entrada] = [(otra, distancias[otra]) for otra in entradas
+                                if otra != entrada and otra in distancias]
+        self.entradas[bloque] = entradas
+        self.aristas[bloque] = aristas
+        self.recalculos += 1
+        PERFILADOR.contar('bloques_recalculados')
+
+    def _explorar(self, origen, bloque, destino=None):
+        # BFS sin salir del bloque; con destino se detiene al encontrarlo
+        columnas, mascara = self.columnas, self.mascara
+        fila0, fila1, col0, col1 = self._limites(bloque)
+        distancias = {origen: 0}
+        padre = {origen: None}
+        cola = deque([origen])
+
+        while cola:
+            actual = cola.popleft()
+            if actual == destino:
+                break
+            fila, col = divmod(actual, columnas)
+            for vecino, valido in ((actual - columnas, fila > fila0),
+                                   (actual + columnas, fila < fila1 - 1),
+                                   (actual - 1, col > col0),
+                                   (actual + 1, col < col1 - 1)):
+                if valido and vecino not in distancias and mascara[vecino]:
+                    distancias[vecino] = distancias[actual] + 1
+                    padre[vecino] = actual
+                    cola.append(vecino)
+        self.exploradas += len(distancias)
+        return distancias, padre
+
+    def celda_cambiada(self, celda):
+        # Se rehace el bloque de la celda y, si está sobre un borde, ese borde y el bloque vecino
+        bloque = self.bloque_de(celda)
+        fila, col = divmod(celda, self.columnas)
+        fila0, fila1, col0, col1 = self._limites(bloque)
+        afectados = {bloque}
+        for borde in list(self._bordes_de(bloque)):
+            otro = borde[1] if borde[0] == bloque else borde[0]
+            if otro // self.bloques_columna == bloque // self.bloques_columna:
+                sobre_borde = col == (col0 if otro < bloque else col1 - 1)
+            else:
+                sobre_borde = fila == (fila0 if otro < bloque else fila1 - 1)
+            if sobre_borde:
+                self._calcular_borde(*borde)
+                afectados.add(otro)
+        for afectado in afectados:
+            self.entradas.pop(afectado, None)
+            self.aristas.pop(afectado, None)
+
+    def _buscar_abstracto(self, inicio, objetivo):
+        """
+        A* sobre las entradas. El inicio y el objetivo se conectan con un BFS dentro de
+        su propio bloque. Devuelve (puntos de paso de inicio a objetivo, largo) o None.
+        """
+        if not self.mascara[objetivo]:
+            return None
+        columnas = self.columnas
+        bloque_inicio, bloque_objetivo = self.bloque_de(inicio), self.bloque_de(objetivo)
+
+        distancias_inicio, _ = self._explorar(inicio, bloque_inicio)
+        if bloque_inicio == bloque_objetivo and objetivo in distancias_inicio:
+            return [inicio, objetivo], distancias_inicio[objetivo]
+        self._calcular_bloque(bloque_inicio)
+        # En una grilla de costo 1 la distancia es simétrica entre celdas transitables
+        distancias_objetivo, _ = self._explorar(objetivo, bloque_objetivo)
+
+        # -1 y -2 representan al inicio y al objetivo, que pueden coincidir con una entrada
+        fila_objetivo, col_objetivo = divmod(objetivo, columnas)
+        costo = {-1: 0}
+        padre = {-1: None}
+        abiertos = [(0, 0, -1)]
+        expansiones = 0
+
+        while abiertos:
+            _, g, nodo = heapq.heappop(abiertos)
+            if g != costo[nodo]:
+                continue
+            if nodo == -2:
+                break
+            expansiones += 1
+
+            if nodo == -1:
+                sucesores = [(entrada, distancias_inicio[entrada]) for entrada in self.entradas[bloque_inicio]
+                             if entrada in distancias_inicio]
+            else:
+                bloque = self.bloque_de(nodo)
+                self._calcular_bloque(bloque)
+                sucesores = self.aristas[bloque][nodo] + [(otra, 1) for otra in self.entradas[bloque][nodo]]
+                if bloque == bloque_objetivo and nodo in distancias_objetivo:
+                    sucesores.append((-2, distancias_objetivo[nodo]))
+
+            for vecino, paso in sucesores:
+                nuevo = g + paso
+                if nuevo < costo.get(vecino, nuevo + 1):
+                    costo[vecino] = nuevo
+                    padre[vecino] = nodo
+                    if vecino == -2:
+                        h = 0
+                    else:
+                        fila, col = divmod(vecino, columnas)
+                        h = abs(fila - fila_objetivo) + abs(col - col_objetivo)
+                    heapq.heappush(abiertos, (nuevo + h, nuevo, vecino))
+        else:
+            nodo = None
+
+        self.exploradas += expansiones
+        if nodo is None:
+            return None
+        puntos = []
+        while nodo is not None:
+            puntos.append({-1: inicio, -2: objetivo}.get(nodo, nodo))
+            nodo = padre[nodo]
+        puntos.reverse()
+        return puntos, costo[-2]
+
+    def distancia(self, inicio, objetivo):
+        # Solo el grafo abstracto: alcanza para saber si hay camino y cuánto mide
+        resultado = self._buscar_abstracto(inicio, objetivo)
+        return resultado[1] if resultado else None
+
+    def refinar(self, desde, hasta):
+        # Celdas de desde a hasta (sin desde) en orden inverso. Si están en bloques distintos
+        # es una arista entre entradas vecinas; si no, un BFS dentro del bloque.
+        bloque = self.bloque_de(desde)
+        if self.bloque_de(hasta) != bloque:
+            return [hasta]
+        _, padre = self._explorar(desde, bloque, hasta)
+        tramo = []
+        while hasta != desde:
+            tramo.append(hasta)
+            hasta = padre[hasta]
+        return tramo
+
+    def buscar(self, inicio, objetivo):
+        resultado = self._buscar_abstracto(inicio, objetivo)
+        if resultado is None:
+            return None
+        puntos, largo = resultado
+        return CaminoJerarquico(self, puntos, largo) if largo else None
+
+
+class CaminoJerarquico:
+    """
+    Camino de HPA* que se comporta como la lista invertida de BuscadorAEstrella.buscar
+    (pop(), len() y [-1]) pero refina cada tramo recién cuando se lo va a recorrer.
+    """
+    def __init__(self, grafo, puntos, largo):
+        self.grafo = grafo
+        self.desde = puntos[0]
+        self.puntos = puntos[:0:-1]
+        self.largo = largo
+        self.tramo = []
+
+    def _refinar(self):
+        while not self.tramo and self.puntos:
+            hasta = self.puntos.pop()
+            self.tramo = self.grafo.refinar(self.desde, hasta)
+            self.desde = hasta
+
+    def __len__(self):
+        return self.largo
+
+    def __getitem__(self, indice):
+        self._refinar()
+        return self.tramo[indice]
+
+    def pop(self):
+        self._refinar()
+        self.largo -= 1
+        return self.tramo.pop()
+
+
+class BuscadorJerarquico:
+    """
+    Búsqueda HPA*: un GrafoJerarquico por máscara (enemigo o jugador) que se construye en
+    la primera consulta y se mantiene al día bloque por bloque cuando cambia una celda.
+    Las consultas cortas (a menos de un bloque) van directo a A* sobre la grilla: ahí el
+    rodeo por las entradas cuesta más de lo que ahorra.
+    """
+    incremental = False
+
+    def __init__(self, tamano=TAMANO_CLUSTER):
+        self.tamano = tamano
+        self.grafos = {}
+        self.local = BuscadorAEstrella()
+        self.consultas = 0
+        self.expansiones = 0
+        self.ultimas_expansiones = 0
+
+    def grafo(self, mapa_logico, mascara):
+        tipo = 'enemigo' if mascara is mapa_logico.mascara_enemigo else 'jugador'
+        grafo = self.grafos.get(tipo)
+        if grafo is None or grafo.mascara is not mascara:
+            grafo = self.grafos[tipo] = GrafoJerarquico(mapa_logico, mascara, self.tamano)
+        return grafo
+
+    def celda_cambiada(self, celda):
+        for grafo in self.grafos.values():
+            grafo.celda_cambiada(celda)
+
+    def _contar(self, grafo, antes):
+        self.ultimas_expansiones = grafo.exploradas - antes
+        self.expansiones += self.ultimas_expansiones
+        PERFILADOR.contar('nodos_expandidos', self.ultimas_expansiones)
+
+    def _es_corta(self, mapa_logico, inicio, objetivo):
+        return heuristica_manhattan(inicio, objetivo, mapa_logico.columnas) < self.tamano
+
+    def _buscar_local(self, mapa_logico, mascara, inicio, objetivo):
+        camino = self.local.buscar(mapa_logico, mascara, inicio, objetivo)
+        self.ultimas_expansiones = self.local.ultimas_expansiones
+        self.expansiones += self.ultimas_expansiones
+        return camino
+
+    def buscar(self, mapa_logico, mascara, inicio, objetivo):
+        self.consultas += 1
+        if self._es_corta(mapa_logico, inicio, objetivo):
+            return self._buscar_local(mapa_logico, mascara, inicio, objetivo)
+        grafo = self.grafo(mapa_logico, mascara)
+        antes = grafo.exploradas
+        camino = grafo.buscar(inicio, objetivo)
+        # Los tramos se refinan al avanzar, así que acá solo cuenta lo explorado por el grafo abstracto
+        self._contar(grafo, antes)
+        return camino
+
+    def distancia(self, mapa_logico, mascara, inicio, objetivo):
+        self.consultas += 1
+        if self._es_corta(mapa_logico, inicio, objetivo):
+            camino = self._buscar_local(mapa_logico, mascara, inicio, objetivo)
+            return None if camino is None else len(camino)
+        grafo = self.grafo(mapa_logico, mascara)
+        antes = grafo.exploradas
+        distancia = grafo.distancia(inicio, objetivo)
+        self._contar(grafo, antes)
+        return distancia
+
+
+# 'campo' (campo de distancias compartido) no necesita buscador propio
+ALGORITMOS_BUSQUEDA = {'astar': BuscadorAEstrella, 'jps': BuscadorJPS, 'hpa': BuscadorJerarquico,
+                       'incremental': BuscadorIncremental}
+
+
+class IndiceConectividad:
+    """
+    Etiquetas de componente conexa para las celdas transitables por el jugador y por
+    el enemigo. Se construye una vez por mapa; saber si una celda llega a otra pasa a
+    ser una comparación de etiquetas.
+    """
+    def __init__(self, mapa_logico, version_mapa=0, componentes=None):
+        self.filas, self.columnas = mapa_logico.filas, mapa_logico.columnas
+        self.version_mapa = version_mapa
+        # Se calcula recién cuando un cambio de terreno necesita una etiqueta nueva
+        self._proxima_etiqueta = None
+        if componentes is not None:
+            # Etiquetas guardadas en un paquete de niveles
+            self.componentes_jugador, self.componentes_enemigo = componentes
+            return
+        self.componentes_jugador = self._etiquetar(mapa_logico.mascara_jugador)
+        self.componentes_enemigo = self._etiquetar(mapa_logico.mascara_enemigo)
+
+    def _etiquetar(self, mascara):
+        columnas = self.columnas
+        total = self.filas * columnas
+        etiquetas = array('i', [-1]) * total
+        etiqueta = -1
+
+        for origen in range(total):
+            if not mascara[origen] or etiquetas[origen] != -1:
+                continue
+
+            etiqueta += 1
+            etiquetas[origen] = etiqueta
+            cola = deque([origen])
+
+            while cola:
+                actual = cola.popleft()
+                y = actual % columnas
+                for vecino, valido in ((actual - columnas, actual >= columnas),
+                                       (actual + columnas, actual + columnas < total),
+                                       (actual - 1, y > 0),
+                                       (actual + 1, y < columnas - 1)):
+                    if valido and etiquetas[vecino] == -1 and mascara[vecino]:
+                        etiquetas[vecino] = etiqueta
+                        cola.append(vecino)
+
+        return etiquetas
+
+    def celda_cambiada(self, mapa_logico, celda, version_mapa):
+        self.version_mapa = version_mapa
+        if not isinstance(self.componentes_jugador, array):
+            # Vistas de solo lectura sobre un paquete de niveles: se copian al primer cambio
+            self.componentes_jugador = array('i', self.componentes_jugador)
+            self.componentes_enemigo = array('i', self.componentes_enemigo)
+        self._reetiquetar(self.componentes_jugador, mapa_logico.mascara_jugador, celda)
+        self._reetiquetar(self.componentes_enemigo, mapa_logico.mascara_enemigo, celda)
+
+    def _reetiquetar(self, etiquetas, mascara, celda):
+        """
+        Abrir una celda puede unir componentes y cerrarla puede partir el suyo. Se lanza un
+        BFS desde cada vecino y avanzan por turnos; los que se tocan son el mismo componente
+        y los que se agotan solos son partes separadas. El último que sigue abierto es el
+        más grande y conserva su etiqueta, así el trabajo depende de las partes chicas.
+        """
+        abierta = bool(mascara[celda])
+        if abierta == (etiquetas[celda] != -1):
+            return
+
+        if abierta:
+            origenes = {}
+            for vecino in vecinos_celda(self.filas, self.columnas, celda):
+                if etiquetas[vecino] != -1:
+                    origenes.setdefault(etiquetas[vecino], vecino)
+            if len(origenes) <= 1:
+                etiquetas[celda] = next(iter(origenes)) if origenes else self._nueva_etiqueta()
+                return
+            origenes = list(origenes.values())
+        else:
+            etiqueta = etiquetas[celda]
+            etiquetas[celda] = -1
+            origenes = [vecino for vecino in vecinos_celda(self.filas, self.columnas, celda)
+                        if etiquetas[vecino] == etiqueta]
+            if len(origenes) < 2:
+                return
+
+        # Cada búsqueda solo pisa su propia etiqueta (la celda cambiada quedó en -1). Al
+        # tocarse dos búsquedas se funden, la más chica dentro de la otra
+        duenos = {origen: i for i, origen in enumerate(origenes)}
+        grupos = {i: (deque([origen]), [origen]) for i, origen in enumerate(origenes)}
+        raiz = list(range(len(origenes)))
+        agotados = set()
+
+        def buscar_raiz(i):
+            while raiz[i] != i:
+                raiz[i] = raiz[raiz[i]]
+                i = raiz[i]
+            return i
+
+        while len(grupos) - len(agotados) > 1:
+            for i in list(grupos):
+                if i not in grupos or i in agotados:
+                    continue
+                cola, celdas = grupos[i]
+                if not cola:
+                    agotados.add(i)
+                    continue
+                actual = cola.popleft()
+                propia = etiquetas[actual]
+                for vecino in vecinos_celda(self.filas, self.columnas, actual):
+                    if not mascara[vecino] or etiquetas[vecino] != propia:
+                        continue
+                    otro = duenos.get(vecino)
+                    if otro is None:
+                        duenos[vecino] = i
+                        cola.append(vecino)
+                        celdas.append(vecino)
+                        continue
+                    otro = buscar_raiz(otro)
+                    if otro == i:
+                        continue
+                    chico, grande = (i, otro) if len(celdas) < len(grupos[otro][1]) else (otro, i)
+                    grupos[grande][0].extend(grupos[chico][0])
+                    grupos[grande][1].extend(grupos[chico][1])
+                    del grupos[chico]
+                    raiz[chico] = grande
+                    i = grande
+                    cola, celdas = grupos[i]
+
+        if len(grupos) == 1:
+            # Cerrar la celda no partió el componente
+            return
+
+        # Los agotados tienen todas sus celdas; el que sigue (o el último) conserva la etiqueta
+        sigue = next((i for i in grupos if i not in agotados), max(grupos))
+        if abierta:
+            etiquetas[celda] = etiquetas[origenes[sigue]]
+        for i, (_, celdas) in grupos.items():
+            if i != sigue:
+                nueva = etiquetas[celda] if abierta else self._nueva_etiqueta()
+                for idx in celdas:
+                    etiquetas[idx] = nueva
+
+    def _nueva_etiqueta(self):
+        if self._proxima_etiqueta is None:
+            self._proxima_etiqueta = max(max(self.componentes_jugador, default=-1),
+                                         max(self.componentes_enemigo, default=-1)) + 1
+        self._proxima_etiqueta += 1
+        return self._proxima_etiqueta - 1
+
+    def _conectadas(self, etiquetas, a, b):
+        etiqueta = etiquetas[a[0] * self.columnas + a[1]]
+        return etiqueta != -1 and etiqueta == etiquetas[b[0] * self.columnas + b[1]]
+
+    def conectadas_enemigo(self, a, b):
+        return self._conectadas(self.componentes_enemigo, a, b)
+
+    def enemigo_puede_llegar(self, inicio, objetivo):
+        # Un enemigo sobre una celda que no puede pisar (p.ej. recién aparecido) sale por un vecino
+        x, y = inicio
+        if self.componentes_enemigo[x * self.columnas + y] != -1:
+            return self.conectadas_enemigo(inicio, objetivo)
+        return any(0 <= x + dx < self.filas and 0 <= y + dy < self.columnas and
+                   self.conectadas_enemigo((x + dx, y + dy), objetivo) for dx, dy in MOVIMIENTOS)
+
+
+class ServicioAparicion:
+    """
+    Listas precalculadas, por mapa y por modo, de las celdas donde puede aparecer un
+    enemigo. En cazador se usa la distancia BFS real a la salida, no la de Manhattan.
+    """
+    def __init__(self, mapa_logico, salida_pos, version_mapa=0, distancia_minima=DISTANCIA_MINIMA_SALIDA, rng=None,
+                 campo_salida=None, candidatas=None):
+        self.columnas = mapa_logico.columnas
+        self.rng = rng or random
+        self.version_mapa = version_mapa
+        self.distancia_minima = distancia_minima
+        if candidatas is not None:
+            # Campo y listas leídos de un paquete de niveles
+            self.campo_salida = campo_salida
+            self.candidatas = candidatas
+            return
+        self.campo_salida = CampoDistancias(mapa_logico, salida_pos, version_mapa)
+
+        mascara = mapa_logico.mascara_enemigo
+        # Las listas quedan ordenadas por índice, lo que permite excluir una celda con bisect
+        self.candidatas = {
+            'escapa': array('i', (idx for idx in range(len(mascara)) if mascara[idx])),
+            'cazador': array('i', (idx for idx, distancia in enumerate(self.campo_salida.distancias)
+                                   if distancia >= distancia_minima)),
+        }
+
+    def celda_cambiada(self, mascara, celda, version_mapa):
+        # Las listas se corrigen con bisect solo en las celdas cuyo valor cambió
+        self.version_mapa = version_mapa
+        self.candidatas = {modo: lista if isinstance(lista, array) else array('i', lista)
+                           for modo, lista in self.candidatas.items()}
+        self._actualizar('escapa', celda, bool(mascara[celda]))
+        cambios = self.campo_salida.celda_cambiada(mascara, celda, version_mapa)
+        distancias = self.campo_salida.distancias
+        for idx, _ in cambios:
+            self._actualizar('cazador', idx, distancias[idx] >= self.distancia_minima)
+
+    def _actualizar(self, modo, idx, incluida):
+        lista = self.candidatas[modo]
+        pos = bisect_left(lista, idx)
+        presente = pos < len(lista) and lista[pos] == idx
+        if incluida and not presente:
+            lista.insert(pos, idx)
+        elif presente and not incluida:
+            del lista[pos]
+
+    def hay_candidatas(self, modo):
+        return len(self.candidatas[modo]) > 0
+
+    def sortear(self, modo, excluir=None):
+        lista = self.candidatas[modo]
+        total = len(lista)
+
+        excluida = -1
+        if excluir is not None:
+            idx_excluido = excluir[0] * self.columnas + excluir[1]
+            pos = bisect_left(lista, idx_excluido)
+            if pos < total and lista[pos] == idx_excluido:
+                excluida = pos
+
+        disponibles = total - (excluida != -1)
+        if disponibles <= 0:
+            return None
+
+        elegido = self.rng.randrange(disponibles)
+        if excluida != -1 and elegido >= excluida:
+            elegido += 1
+        return divmod(lista[elegido], self.columnas)
+
+
+class IndiceEspacial:
+    """
+    Índice por celda (x, y) de trampas y enemigos. Se actualiza cuando algo se mueve,
+    aparece o desaparece, de modo que disparar trampas y detectar colisiones es O(1)
+    por entidad sin importar cuántas haya.
+    """
+    def __init__(self):
+        self.trampas = {}
+        self.enemigos = {}
+        self.cantidad_trampas = 0
+
+    def agregar_trampa(self, trampa):
+        self.trampas.setdefault((trampa[0], trampa[1]), []).append(trampa)
+        self.cantidad_trampas += 1
+
+    def quitar_trampa_en(self, pos):
+        trampas = self.trampas.get(pos)
+        if not trampas:
+            return None
+        trampa = trampas.pop(0)
+        if not trampas:
+            del self.trampas[pos]
+        self.cantidad_trampas -= 1
+        return trampa
+
+    def todas_las_trampas(self):
+        return [trampa for trampas in self.trampas.values() for trampa in trampas]
+
+    def agregar_enemigo(self, enemigo):
+        self.enemigos.setdefault((enemigo.x, enemigo.y), []).append(enemigo)
+
+    def quitar_enemigo(self, enemigo, pos=None):
+        pos = pos or (enemigo.x, enemigo.y)
+        enemigos = self.enemigos[pos]
+        enemigos.remove(enemigo)
+        if not enemigos:
+            del self.enemigos[pos]
+
+    def mover_enemigo(self, enemigo, pos_anterior):
+        self.quitar_enemigo(enemigo, pos_anterior)
+        self.agregar_enemigo(enemigo)
+
+    def enemigos_en(self, pos):
+        return self.enemigos.get(pos, ())
+
+
+MODOS_ENJAMBRE = ('escapa', 'cazador')
+
+class EnjambreEnemigos:
+    """
+    Enemigos guardados en arreglos paralelos (posición, velocidad, contador y modo) en vez
+    de un objeto por enemigo. Cada enemigo es un hueco de los arreglos; los que mueren dejan
+    el hueco en una lista libre que reutiliza la siguiente aparición.
+    """
+    def __init__(self):
+        self.xs = array('i')
+        self.ys = array('i')
+        self.velocidades = array('i')
+        self.contadores = array('i')
+        self.modos = bytearray()
+        self.vivos = bytearray()
+        self.ids = array('i')
+        self.libres = []
+        self.cantidad = 0
+        # Un hueco reutilizado es otro enemigo: recibe un identificador nuevo
+        self._ids = itertools.count()
+
+    def __len__(self):
+        return self.cantidad
+
+    def agregar(self, x, y, modo, velocidad):
+        if self.libres:
+            hueco = self.libres.pop()
+            self.xs[hueco], self.ys[hueco] = x, y
+            self.velocidades[hueco] = velocidad
+            self.contadores[hueco] = 0
+            self.modos[hueco] = MODOS_ENJAMBRE.index(modo)
+            self.vivos[hueco] = 1
+            self.ids[hueco] = next(self._ids)
+        else:
+            hueco = len(self.vivos)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.velocidades.append(velocidad)
+            self.contadores.append(0)
+            self.modos.append(MODOS_ENJAMBRE.index(modo))
+            self.vivos.append(1)
+            self.ids.append(next(self._ids))
+        self.cantidad += 1
+        return hueco
+
+    def quitar(self, hueco):
+        self.vivos[hueco] = 0
+        self.libres.append(hueco)
+        self.cantidad -= 1
+
+    def huecos_vivos(self):
+        vivos = self.vivos
+        return [hueco for hueco in range(len(vivos)) if vivos[hueco]]
+
+    def posiciones(self):
+        xs, ys, ids = self.xs, self.ys, self.ids
+        return {ids[hueco]: (xs[hueco], ys[hueco]) for hueco in self.huecos_vivos()}
+
+    def avanzar(self, obtener_campo):
+        # Un solo recorrido para todos: se suma el contador y los que completan su espera
+        # leen el siguiente paso del campo de distancias de su modo (pedido una vez por tick)
+        xs, ys = self.xs, self.ys
+        velocidades, contadores = self.velocidades, self.contadores
+        modos = self.modos
+        campos = [None] * len(MODOS_ENJAMBRE)
+        movidos = 0
+
+        for hueco in self.huecos_vivos():
+            contador = contadores[hueco] + 1
+            if contador < velocidades[hueco]:
+                contadores[hueco] = contador
+                continue
+            contadores[hueco] = 0
+
+            modo = modos[hueco]
+            campo = campos[modo]
+            if campo is None:
+                campo = campos[modo] = obtener_campo(MODOS_ENJAMBRE[modo])
+            paso = campo.siguiente_paso((xs[hueco], ys[hueco]))
+            if paso:
+                xs[hueco], ys[hueco] = paso
+                movidos += 1
+        return movidos
+
+
+class PlanificadorEventos:
+    """
+    Cola de temporizadores ordenada por tick (montículo). Programar cuesta O(log n)
+    y en cada tick solo se miran los eventos vencidos, nunca la lista completa.
+    """
+    def __init__(self):
+        self.eventos = []
+        self.tick_actual = 0
+        self._contador = itertools.count()
+
+    def programar(self, ticks, callback, *args):
+        # El contador desempata los eventos del mismo tick en el orden en que se programaron
+        heapq.heappush(self.eventos, (self.tick_actual + max(0, int(ticks)), next(self._contador), callback, args))
+
+    def ejecutar_hasta(self, tick):
+        self.tick_actual = tick
+        eventos = self.eventos
+        while eventos and eventos[0][0] <= tick:
+            _, _, callback, args = heapq.heappop(eventos)
+            callback(*args)
+
+
 # CLASE DE PUNTUACIÓN Y REGISTRO
 
+class AlmacenPuntajes:
+    """
+    Registro persistente de partidas en SQLite. Los índices por (modo, dificultad, puntaje),
+    (modo, puntaje) y fecha dan tops e historial sin recorrer ni ordenar la tabla, y cada
+    inserción es O(log n). Los pares (modo, dificultad) usados se guardan aparte para no
+    recorrer la tabla con DISTINCT al arrancar.
+    El historial se pagina con (fecha, id) como cursor sobre índices en ese mismo orden:
+    cada página es una búsqueda en el índice, sin OFFSET y sin ordenar.
+    """
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS partidas (
+            id INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            modo TEXT NOT NULL,
+            dificultad TEXT NOT NULL,
+            puntaje INTEGER NOT NULL,
+            fecha TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_modo_dificultad_puntaje ON partidas (modo, dificultad, puntaje DESC);
+        CREATE INDEX IF NOT EXISTS idx_modo_puntaje ON partidas (modo, puntaje DESC);
+        DROP INDEX IF EXISTS idx_fecha;
+        DROP INDEX IF EXISTS idx_modo_dificultad_fecha;
+        DROP INDEX IF EXISTS idx_nombre_fecha;
+        CREATE INDEX IF NOT EXISTS idx_fecha_id ON partidas (fecha DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_modo_fecha_id ON partidas (modo, fecha DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_modo_dificultad_fecha_id ON partidas (modo, dificultad, fecha DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_nombre_fecha_id ON partidas (nombre, fecha DESC, id DESC);
+        CREATE TABLE IF NOT EXISTS claves (
+            modo TEXT NOT NULL,
+            dificultad TEXT NOT NULL,
+            PRIMARY KEY (modo, dificultad)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, ruta=":memory:"):
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.row_factory = sqlite3.Row
+        if ruta != ":memory:":
+            self.conexion.execute("PRAGMA journal_mode=WAL")
+            self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(self.ESQUEMA)
+        # Una base de antes de la tabla de claves (o cargada por fuera) se completa una sola vez
+        if (self.conexion.execute("SELECT 1 FROM claves LIMIT 1").fetchone() is None and
+                self.conexion.execute("SELECT 1 FROM partidas LIMIT 1").fetchone() is not None):
+            with self.conexion:
+                self.conexion.execute("INSERT OR IGNORE INTO claves SELECT DISTINCT modo, dificultad FROM partidas")
+
+    def registrar(self, nombre, modo, dificultad, puntaje, fecha):
+        with self.conexion:
+            cursor = self.conexion.execute(
+                "INSERT INTO partidas (nombre, modo, dificultad, puntaje, fecha) VALUES (?, ?, ?, ?, ?)",
+                (nombre, modo, dificultad, puntaje, fecha))
+            self.conexion.execute("INSERT OR IGNORE INTO claves (modo, dificultad) VALUES (?, ?)", (modo, dificultad))
+        return cursor.lastrowid
+
+    def top(self, modo, limite=5, dificultad=None):
+        if dificultad is None:
+            filas = self.conexion.execute(
+                "SELECT nombre, puntaje FROM partidas WHERE modo = ? ORDER BY puntaje DESC LIMIT ?",
+                (modo, limite))
+        else:
+            filas = self.conexion.execute(
+                "SELECT nombre, puntaje FROM partidas WHERE modo = ? AND dificultad = ? ORDER BY puntaje DESC LIMIT ?",
+                (modo, dificultad, limite))
+        return [dict(fila) for fila in filas]
+
+    def _filtro(self, modo=None, dificultad=None, nombre=None):
+        condiciones, parametros = [], []
+        for columna, valor in (('modo', modo), ('dificultad', dificultad), ('nombre', nombre)):
+            if valor:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(valor)
+        return (" WHERE " + " AND ".join(condiciones) if condiciones else ""), parametros
+
+    def _desde_cursor(self, columnas, cursor, limite, salto=0, hacia_atras=False, modo=None, dificultad=None,
+                      nombre=None):
+        """
+        Filas que siguen al cursor (fecha, id) en el orden del historial, o que lo preceden
+        con hacia_atras; cursor None es el principio. SQLite busca en el índice solo por la
+        fecha de un (fecha, id) < (?, ?), así que se hacen dos búsquedas exactas: la misma
+        fecha con otro id, y después las fechas siguientes.
+        """
+        comparacion, sentido = (">", "ASC") if hacia_atras else ("<", "DESC")
+        orden = f" ORDER BY fecha {sentido}, id {sentido}"
+        donde, parametros = self._filtro(modo, dificultad, nombre)
+        if cursor is None:
+            return self.conexion.execute(f"SELECT {columnas} FROM partidas{donde}{orden} LIMIT ? OFFSET ?",
+                                         parametros + [limite, salto]).fetchall()
+
+        enlace = " AND " if donde else " WHERE "
+        misma_fecha = f"{donde}{enlace}fecha = ? AND id {comparacion} ?"
+        filas = self.conexion.execute(f"SELECT {columnas} FROM partidas{misma_fecha}{orden} LIMIT ? OFFSET ?",
+                                      parametros + [cursor[0], cursor[1], limite, salto]).fetchall()
+        if 0 <= limite <= len(filas):
+            return filas
+
+        # Del salto se descuentan las filas de la misma fecha que ya se saltearon
+        salteadas = self.conexion.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM partidas{misma_fecha} LIMIT ?)",
+                                          parametros + [cursor[0], cursor[1], salto]).fetchone()[0]
+        resto = limite - len(filas) if limite >= 0 else -1
+        return filas + self.conexion.execute(
+            f"SELECT {columnas} FROM partidas{donde}{enlace}fecha {comparacion} ?{orden} LIMIT ? OFFSET ?",
+            parametros + [cursor[0], resto, salto - salteadas]).fetchall()
+
+    def historial(self, limite=-1, cursor=None, modo=None, dificultad=None, nombre=None):
+        # Las partidas siguientes al cursor, de la más nueva a la más vieja, con su clave (fecha, id)
+        filas = self._desde_cursor("id, nombre, modo, dificultad, puntaje, fecha", cursor, limite,
+                                   modo=modo, dificultad=dificultad, nombre=nombre)
+        return [dict(fila) for fila in filas]
+
+    def mover_cursor(self, cursor, filas, modo=None, dificultad=None, nombre=None):
+        """
+        Cursor que queda `filas` partidas más abajo en el historial (más arriba si es
+        negativo), o None si se pasa del principio. Parte de una búsqueda en el índice y
+        solo salta |filas| entradas, no todas las anteriores.
+        """
+        if filas == 0 or (cursor is None and filas < 0):
+            return cursor
+        encontradas = self._desde_cursor("fecha, id", cursor, 1, abs(filas) - 1, filas < 0, modo, dificultad, nombre)
+        if not encontradas:
+            # Hacia arriba se llegó al principio; hacia abajo, no hay tantas partidas
+            return None if filas < 0 else cursor
+        return tuple(encontradas[0])
+
+    def iterar(self, modo=None, dificultad=None, nombre=None, tamano_bloque=200):
+        # Recorre el historial por bloques con el cursor (fecha, id): cada bloque es una
+        # lectura del índice y nunca se carga el historial completo en memoria
+        cursor = None
+        while True:
+            filas = self.historial(tamano_bloque, cursor, modo, dificultad, nombre)
+            if not filas:
+                return
+            cursor = (filas[-1]['fecha'], filas[-1]['id'])
+            for registro in filas:
+                del registro['id']
+                yield registro
+
+    def cantidad(self, modo=None, dificultad=None, nombre=None):
+        donde, parametros = self._filtro(modo, dificultad, nombre)
+        return self.conexion.execute("SELECT COUNT(*) FROM partidas" + donde, parametros).fetchone()[0]
+
+    def claves(self):
+        return [tuple(fila) for fila in self.conexion.execute("SELECT modo, dificultad FROM claves")]
+
+    def posicion(self, modo, dificultad, puntaje):
+        # Lugar (1 = mejor) que ocupa un puntaje entre todas las partidas guardadas
+        fila = self.conexion.execute(
+            "SELECT COUNT(*) FROM partidas WHERE modo = ? AND dificultad = ? AND puntaje > ?",
+            (modo, dificultad, puntaje)).fetchone()
+        return fila[0] + 1
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+class TablaClasificacion:
+    """
+    Los k mejores puntajes por (modo, dificultad), cada uno en un min-heap de tamaño fijo:
+    insertar es O(log k) y el peor puntaje del top está siempre en la raíz.
+    """
+    def __init__(self, k=5):
+        self.k = k
+        self.montones = {}
+        self._orden = itertools.count()
+
+    def registrar(self, modo, dificultad, nombre, puntaje):
+        # Con empate queda primero el que llegó antes (orden negativo = más nuevo es menor)
+        monton = self.montones.setdefault((modo, dificultad), [])
+        entrada = (puntaje, -next(self._orden), nombre)
+
+        if len(monton) < self.k:
+            heapq.heappush(monton, entrada)
+            return True
+        if entrada > monton[0]:
+            heapq.heapreplace(monton, entrada)
+            return True
+        return False
+
+    def _entradas(self, modo, dificultad=None):
+        if dificultad is not None:
+            return self.montones.get((modo, dificultad), [])
+        return [e for (m, _), monton in self.montones.items() if m == modo for e in monton]
+
+    def top(self, modo, dificultad=None):
+        return [{'nombre': nombre, 'puntaje': puntaje}
+                for puntaje, _, nombre in heapq.nlargest(self.k, self._entradas(modo, dificultad))]
+
+    def posicion(self, modo, dificultad, puntaje):
+        # Lugar dentro del top (1 = mejor) o None si el puntaje no entra
+        monton = self.montones.get((modo, dificultad), [])
+        if len(monton) >= self.k and puntaje < monton[0][0]:
+            return None
+        return 1 + sum(1 for p, _, _ in monton if p > puntaje)
+
+
 class PuntajeManager:
     PUNTOS_BASE = 50
     BONO_TRAMPA = 10
 
-    def __init__(self):
-        self.top_escapa = []
-        self.top_cazador = []
+    def __init__(self, ruta_db=":memory:", tamano_top=5):
+        # Por defecto en memoria (partidas sin interfaz); la interfaz usa RUTA_PUNTAJES
+        self.almacen = AlmacenPuntajes(ruta_db)
+        self.clasificacion = TablaClasificacion(tamano_top)
+        self.puntos_actuales = 0
+        self._ultimo_registro = None
+        self._ultima_posicion = None
+
+        for modo, dificultad in self.almacen.claves():
+            for item in reversed(self.almacen.top(modo, tamano_top, dificultad)):
+                self.clasificacion.registrar(modo, dificultad, item['nombre'], item['puntaje'])
+
+    @property
+    def top_escapa(self):
+        return self.clasificacion.top('escapa')
+
+    @property
+    def top_cazador(self):
+        return self.clasificacion.top('cazador')
+
+    def _registrar(self, nombre, modo, dificultad, puntaje):
+        self.almacen.registrar(nombre, modo, dificultad, puntaje, time.strftime("%Y-%m-%d %H:%M:%S"))
+        self.clasificacion.registrar(modo, dificultad, nombre, puntaje)
+        # En el top la posición sale del heap; fuera de él se cuenta recién si alguien la pide
+        self._ultimo_registro = (modo, dificultad, puntaje)
+        self._ultima_posicion = self.clasificacion.posicion(modo, dificultad, puntaje)
+
+    @property
+    def ultima_posicion(self):
+        # Contar los puntajes mayores en SQLite cuesta O(posición): solo lo paga el diálogo de victoria
+        if self._ultima_posicion is None and self._ultimo_registro is not None:
+            self._ultima_posicion = self.almacen.posicion(*self._ultimo_registro)
+        return self._ultima_posicion
+
+    def empezar_partida(self):
+        # El manager de la interfaz dura toda la sesión: los puntos de una partida perdida
+        # no pasan a la siguiente (la repetición de esa partida empieza en cero)
         self.puntos_actuales = 0
-        self.historial_completo = []
-
-    def _obtener_puntaje(self, item):
-        return item['puntaje']
 
-    def _obtener_fecha(self, item):
-        return item['fecha']
+    @property
+    def historial_completo(self):
+        return self.almacen.historial()
 
     def calcular_y_registrar_puntaje(self, nombre, modo, tiempo_final=0, multiplicador_dificultad=1.0, dificultad="Normal"):
 
@@ -184,21 +1884,11 @@ class PuntajeManager:
             puntaje = max(0, 5000 - int(tiempo_final * 10))
             puntaje += int(self.puntos_actuales)
             puntaje = int(puntaje * multiplicador_dificultad)
-            self.registrar_top(self.top_escapa, nombre, puntaje)
 
         elif modo == 'cazador':
             puntaje = self.puntos_actuales
-            self.registrar_top(self.top_cazador, nombre, puntaje)
 
-        registro = {
-            'nombre': nombre,
-            'modo': modo,
-            'dificultad': dificultad,
-            'puntaje': puntaje,
-            'fecha': time.strftime("%Y-%m-%d %H:%M:%S")
-        }
-        self.historial_completo.append(registro)
-        self.historial_completo.sort(key=self._obtener_fecha, reverse=True)
+        self._registrar(nombre, modo, dificultad, puntaje)
 
         self.puntos_actuales = 0
         return puntaje
@@ -206,26 +1896,10 @@ class PuntajeManager:
     def log_cazador_final(self, nombre, dificultad):
         puntaje = int(self.puntos_actuales)
         if puntaje > 0:
-            self.registrar_top(self.top_cazador, nombre, puntaje)
-
-            registro = {
-                'nombre': nombre,
-                'modo': 'cazador',
-                'dificultad': dificultad,
-                'puntaje': puntaje,
-                'fecha': time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            self.historial_completo.append(registro)
-            self.historial_completo.sort(key=self._obtener_fecha, reverse=True)
+            self._registrar(nombre, 'cazador', dificultad, puntaje)
 
         self.puntos_actuales = 0
 
-
-    def registrar_top(self, lista_top, nombre, puntaje):
-        lista_top.append({'nombre': nombre, 'puntaje': puntaje})
-        self.top_cazador.sort(key=self._obtener_puntaje, reverse=True)
-        lista_top[:] = lista_top[:5]
-
     def enemigo_escapo(self):
         self.puntos_actuales -= self.PUNTOS_BASE
 
@@ -238,47 +1912,131 @@ class PuntajeManager:
     def mostrar_top(self, modo):
         if modo == 'escapa':
             lista = self.top_escapa
-            titulo = "TOP 5 - Modo Escapa (Tiempo)"
+            titulo = f"TOP {self.clasificacion.k} - Modo Escapa (Tiempo)"
         else:
             lista = self.top_cazador
-            titulo = "TOP 5 - Modo Cazador (Puntos)"
+            titulo = f"TOP {self.clasificacion.k} - Modo Cazador (Puntos)"
 
-        texto = titulo + "\n" + "="*len(titulo) + "\n"
+        lineas = [titulo, "="*len(titulo)]
         if not lista:
-            texto += "Aún no hay puntajes registrados."
+            lineas.append("Aún no hay puntajes registrados.")
         else:
-            for i, item in enumerate(lista):
-                texto += f"{i+1}. {item['nombre']}: {item['puntaje']} puntos\n"
-        return texto
-
-    def mostrar_historial_completo(self):
-        texto = "HISTORIAL COMPLETO DE PARTIDAS\n" + "="*35 + "\n"
-        if not self.historial_completo:
-            texto += "Aún no hay partidas registradas en esta sesión."
+            lineas.extend(f"{i+1}. {item['nombre']}: {item['puntaje']} puntos" for i, item in enumerate(lista))
+        return "\n".join(lineas)
+
+    def iterar_historial(self, modo=None, dificultad=None, nombre=None):
+        return self.almacen.iterar(modo, dificultad, nombre)
+
+    def pagina_historial(self, cursor, limite, modo=None, dificultad=None, nombre=None):
+        return self.almacen.historial(limite, cursor, modo, dificultad, nombre)
+
+    def mover_cursor_historial(self, cursor, filas, modo=None, dificultad=None, nombre=None):
+        return self.almacen.mover_cursor(cursor, filas, modo, dificultad, nombre)
+
+    def cantidad_historial(self, modo=None, dificultad=None, nombre=None):
+        return self.almacen.cantidad(modo, dificultad, nombre)
+
+    def formatear_registro(self, item):
+        return f"[{item['fecha']}] {item['nombre']} - {item['modo'].capitalize()} ({item['dificultad']}): {item['puntaje']} pts"
+
+    def mostrar_historial_completo(self, limite=50):
+        # Solo las últimas partidas; el historial completo se recorre con HistorialVentana
+        lineas = ["HISTORIAL DE PARTIDAS", "="*35]
+        lineas.extend(self.formatear_registro(item) for item in itertools.islice(self.iterar_historial(), limite))
+        if len(lineas) == 2:
+            lineas.append("Aún no hay partidas registradas.")
+        return "\n".join(lineas)
+
+
+class PaginadorHistorial:
+    """
+    Posición de una ventana de filas sobre el historial filtrado. La página se ubica con un
+    cursor (fecha, id): los movimientos cortos parten del cursor actual y los saltos largos,
+    de anclas guardadas cada PASO_ANCLA filas.
+    """
+    PASO_ANCLA = 1000
+
+    def __init__(self, puntaje_manager, filas_visibles):
+        self.puntaje_manager = puntaje_manager
+        self.filas_visibles = filas_visibles
+        self.filtrar()
+
+    def filtrar(self, modo=None, dificultad=None, nombre=None):
+        self.filtros = {'modo': modo, 'dificultad': dificultad, 'nombre': nombre}
+        self.total = self.puntaje_manager.cantidad_historial(**self.filtros)
+        self.inicio = 0
+        self.cursor = None
+        self.anclas = [None]
+
+    def _cursor_en(self, posicion):
+        # Cursor de la fila anterior a posicion, desde la referencia conocida más cercana
+        if abs(posicion - self.inicio) <= self.PASO_ANCLA:
+            base, cursor = self.inicio, self.cursor
         else:
-            for item in self.historial_completo:
-                texto += f"[{item['fecha'].split(' ')[1]}] {item['nombre']} - {item['modo'].capitalize()} ({item['dificultad']}): {item['puntaje']} pts\n"
-        return texto
+            bloque = posicion // self.PASO_ANCLA
+            # Las anclas se completan una vez por filtro, a medida que la barra llega más lejos
+            while len(self.anclas) <= bloque:
+                self.anclas.append(self.puntaje_manager.mover_cursor_historial(
+                    self.anclas[-1], self.PASO_ANCLA, **self.filtros))
+            base, cursor = bloque * self.PASO_ANCLA, self.anclas[bloque]
+        return self.puntaje_manager.mover_cursor_historial(cursor, posicion - base, **self.filtros)
+
+    def mover(self, filas):
+        # Devuelve si la ventana cambió de lugar; nunca queda más allá de la última página
+        maximo = max(0, self.total - self.filas_visibles)
+        nuevo_inicio = min(max(0, self.inicio + filas), maximo)
+        if nuevo_inicio == self.inicio:
+            return False
+        self.cursor = self._cursor_en(nuevo_inicio)
+        self.inicio = nuevo_inicio
+        return True
+
+    def pagina(self):
+        return self.puntaje_manager.pagina_historial(self.cursor, self.filas_visibles, **self.filtros)
 
 # CLASE PRINCIPAL DEL JUEGO
 
 class Juego:
-    def __init__(self, filas, columnas, modo_inicial, dificultad):
+    def __init__(self, filas, columnas, modo_inicial, dificultad, parametros=None, semilla=None, nivel=None,
+                 puntaje_manager=None):
+        # Un nivel de un paquete trae su propio tamaño y semilla
+        if nivel is not None:
+            filas, columnas, semilla = nivel.filas, nivel.columnas, nivel.semilla
         self.filas = filas
         self.columnas = columnas
-        self.mapa_logico = []
+        self.mapa_logico = None
         self.modo_actual = modo_inicial
         self.dificultad = dificultad
         self.salida_pos = (self.filas-1, self.columnas-1)
+        self.version_mapa = 0
+        self._campos = {}
+        self._ids_enemigos = itertools.count()
+        self.buscadores = {}
+        # Todo el azar de la partida sale de este generador: con la misma semilla y las
+        # mismas entradas por tick, la partida se repite exactamente
+        self.semilla = semilla if semilla is not None else random.randrange(2**32)
+        self.rng = random.Random(self.semilla)
+        self.parametros = parametros or {}
+        self.grabadora = GrabadoraPartida()
 
         self._ajustar_parametros_dificultad()
-        self.generar_mapa()
+        if parametros:
+            self.config.update(parametros)
+        if nivel is not None:
+            self.cargar_nivel(nivel)
+        else:
+            self.generar_mapa()
         self.jugador = Jugador("", 0, 0)
+        self.jugador.trampas_disponibles = self.config['max_trampas']
         self.enemigos = []
-        self.puntaje_manager = PuntajeManager()
-        self.trampas_activas = []
-        self.enemigos_muertos = []
-        self.tiempo_inicio = time.time()
+        # En modo enjambre los enemigos viven en arreglos y self.enemigos queda vacía
+        self.enjambre = EnjambreEnemigos() if self.config['enjambre'] else None
+        # La interfaz pasa el suyo (con la base de puntajes); sin interfaz alcanza uno en memoria
+        self.puntaje_manager = puntaje_manager if puntaje_manager is not None else PuntajeManager()
+        self.indice = IndiceEspacial()
+        self.planificador = PlanificadorEventos()
+        self.ticks = 0
+        self.puntaje_final = None
 
         self.jugador.juego = self
 
@@ -290,111 +2048,200 @@ class Juego:
                 'velocidad_escapa': 30,
                 'enemigos_escapa': 1,
                 'velocidad_cazador': 40,
-                'multiplicador_puntaje': 1.0
+                'multiplicador_puntaje': 1.0,
+                'max_trampas': 3,
+                'algoritmo_escapa': 'jps',
+                'algoritmo_cazador': 'campo',
+                'radio_replanificacion': RADIO_REPLANIFICACION,
+                'enjambre': False
             },
             'Normal': {
                 'velocidad_escapa': 20,
                 'enemigos_escapa': 2,
                 'velocidad_cazador': 30,
-                'multiplicador_puntaje': 1.5
+                'multiplicador_puntaje': 1.5,
+                'max_trampas': 3,
+                'algoritmo_escapa': 'jps',
+                'algoritmo_cazador': 'campo',
+                'radio_replanificacion': RADIO_REPLANIFICACION,
+                'enjambre': False
             },
             'Dificil': {
                 'velocidad_escapa': 10,
                 'enemigos_escapa': 3,
                 'velocidad_cazador': 20,
-                'multiplicador_puntaje': 2.0
+                'multiplicador_puntaje': 2.0,
+                'max_trampas': 3,
+                'algoritmo_escapa': 'jps',
+                'algoritmo_cazador': 'campo',
+                'radio_replanificacion': RADIO_REPLANIFICACION,
+                'enjambre': False
             }
         }[self.dificultad]
 
 
     def _obtener_posicion_segura(self, modo):
-        distancia_minima = DISTANCIA_MINIMA_SALIDA
-        salida_pos = self.salida_pos
-
-        while True:
-            e_x = random.randint(0, self.filas - 1)
-            e_y = random.randint(0, self.columnas - 1)
-            e_pos = (e_x, e_y)
-
-            es_transitable = self.mapa_logico[e_x][e_y].transitable_enemigo
-            es_posicion_jugador = (e_x, e_y) == (self.jugador.x, self.jugador.y)
-
-            if not es_transitable:
-                continue
-
-            if modo == 'escapa':
-                return e_x, e_y
-
-            elif modo == 'cazador':
-
-                distancia_a_salida = abs(e_x - salida_pos[0]) + abs(e_y - salida_pos[1])
-                es_lejos_de_salida = distancia_a_salida >= distancia_minima
-
-                tiene_camino_a_salida = self._validar_camino_enemigo_bfs(e_pos, self.salida_pos)
-
-                if not es_posicion_jugador and tiene_camino_a_salida and es_lejos_de_salida:
-                    return e_x, e_y
+        # Sorteo O(1) entre celdas precalculadas; nunca se queda buscando indefinidamente.
+        # generar_mapa talla un corredor si faltan candidatas, así que esto solo pasa en
+        # mapas demasiado chicos para alejarse DISTANCIA_MINIMA_SALIDA de la salida
+        if not self.aparicion.hay_candidatas(modo):
+            raise ValueError(f"El mapa de {self.filas}x{self.columnas} no tiene celdas donde "
+                             f"pueda aparecer un enemigo en modo {modo}")
+        PERFILADOR.contar('sorteos_aparicion')
+        posicion = self.aparicion.sortear(modo, excluir=(self.jugador.x, self.jugador.y))
+        if posicion is None:
+            # La única candidata es la celda del jugador
+            PERFILADOR.contar('apariciones_fallidas')
+        return posicion
 
 
     def _validar_camino_bfs(self, inicio, fin):
-        movimientos = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        cola = deque([inicio])
-        visitados = {inicio}
-
-        while cola:
-            x, y = cola.popleft()
-            if (x, y) == fin: return True
-
-            for dx, dy in movimientos:
-                nx, ny = x + dx, y + dy
-                nueva_pos = (nx, ny)
-
-                if 0 <= nx < self.filas and 0 <= ny < self.columnas and nueva_pos not in visitados:
-                    terreno = self.mapa_logico[nx][ny]
-                    if terreno.transitable_jugador:
-                        visitados.add(nueva_pos)
-                        cola.append(nueva_pos)
-        return False
+        return self._validar_camino(inicio, fin, self.mapa_logico.mascara_jugador)
 
     def _validar_camino_enemigo_bfs(self, inicio, fin):
-        movimientos = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        cola = deque([inicio])
-        visitados = {inicio}
+        return self._validar_camino(inicio, fin, self.mapa_logico.mascara_enemigo)
+
+    def _validar_camino(self, inicio, fin, mascara):
+        columnas = self.columnas
+        total = self.filas * columnas
+        inicio_idx = inicio[0] * columnas + inicio[1]
+        fin_idx = fin[0] * columnas + fin[1]
+        # Con la capa jerárquica ya armada la consulta se responde sobre el grafo abstracto
+        jerarquico = self.buscadores.get('hpa')
+        if jerarquico is not None and self.mapa_logico is not None:
+            return jerarquico.distancia(self.mapa_logico, mascara, inicio_idx, fin_idx) is not None
+
+        cola = deque([inicio_idx])
+        visitados = bytearray(total)
+        visitados[inicio_idx] = 1
 
         while cola:
-            x, y = cola.popleft()
-            if (x, y) == fin: return True
-
-            for dx, dy in movimientos:
-                nx, ny = x + dx, y + dy
-                nueva_pos = (nx, ny)
-
-                if 0 <= nx < self.filas and 0 <= ny < self.columnas and nueva_pos not in visitados:
-                    terreno = self.mapa_logico[nx][ny]
-                    if terreno.transitable_enemigo:
-                        visitados.add(nueva_pos)
-                        cola.append(nueva_pos)
+            actual = cola.popleft()
+            if actual == fin_idx: return True
+
+            y = actual % columnas
+            for vecino, valido in ((actual - columnas, actual >= columnas),
+                                   (actual + columnas, actual + columnas < total),
+                                   (actual - 1, y > 0),
+                                   (actual + 1, y < columnas - 1)):
+                if valido and not visitados[vecino] and mascara[vecino]:
+                    visitados[vecino] = 1
+                    cola.append(vecino)
         return False
 
     def generar_mapa(self):
-        mapa_valido = False
-        while not mapa_valido:
-            opciones = [Camino(), Muro(), Tunel(), Liana()]
-            self.mapa_logico = []
+        # Todo el mapa se sortea en una sola llamada
+        opciones = [t.simbolo for t in TERRENOS]
+        codigos = self.rng.choices(opciones, weights=PESOS_TERRENO, k=self.filas * self.columnas)
+        self.mapa_logico = MapaTerreno(self.filas, self.columnas, codigos)
+
+        inicio_pos = (0, 0)
+        self.mapa_logico[inicio_pos[0]][inicio_pos[1]] = Camino()
+        self.mapa_logico[self.salida_pos[0]][self.salida_pos[1]] = Camino()
+
+        # En vez de descartar el mapa y volver a intentar, se talla un corredor
+        self.celdas_talladas = 0
+        if not self._validar_camino_bfs(inicio_pos, self.salida_pos):
+            self._tallar_corredor(inicio_pos, self.salida_pos)
+
+        self.version_mapa += 1
+        self.aparicion = ServicioAparicion(self.mapa_logico, self.salida_pos, self.version_mapa, rng=self.rng)
+        if not self.aparicion.hay_candidatas('cazador'):
+            # Ninguna celda del enemigo queda lejos de la salida: otro corredor, ahora para el
+            # enemigo y desde la salida, garantiza dónde aparecer en modo cazador
+            self._tallar_corredor(self.salida_pos, inicio_pos, para_enemigo=True)
+            self.aparicion = ServicioAparicion(self.mapa_logico, self.salida_pos, self.version_mapa, rng=self.rng)
+        self.conectividad = IndiceConectividad(self.mapa_logico, self.version_mapa)
+        PERFILADOR.contar('mapas_generados')
+        PERFILADOR.contar('celdas_talladas', self.celdas_talladas)
+
+    def cargar_nivel(self, nivel):
+        """
+        Usa un mapa ya generado y validado de un paquete de niveles. Terreno, campo de la
+        salida, componentes y candidatas son vistas sobre el archivo: no se copia ni se
+        recalcula nada. El generador queda como después de generar_mapa con la misma
+        semilla, así que la partida es idéntica a una con el mapa generado.
+        """
+        self.mapa_logico = MapaTerreno(nivel.filas, nivel.columnas, nivel.codigos,
+                                       (nivel.mascara_jugador, nivel.mascara_enemigo))
+        self.rng.setstate((self.rng.getstate()[0], tuple(nivel.estado_rng), None))
+        self.celdas_talladas = 0
+        PERFILADOR.contar('niveles_cargados')
+
+        self.version_mapa += 1
+        self.conectividad = IndiceConectividad(self.mapa_logico, self.version_mapa,
+                                               (nivel.componentes_jugador, nivel.componentes_enemigo))
+        campo_salida = CampoDistancias(self.mapa_logico, self.salida_pos, self.version_mapa,
+                                       distancias=nivel.distancias_salida)
+        self.aparicion = ServicioAparicion(self.mapa_logico, self.salida_pos, self.version_mapa, rng=self.rng,
+                                           campo_salida=campo_salida, candidatas=nivel.candidatas)
+        # Los cazadores huyen hacia la salida: su campo es el mismo que el del paquete
+        self._campos['cazador'] = campo_salida
+
+    def _tallar_corredor(self, inicio, fin, para_enemigo=False):
+        # Random walk monótono de inicio a fin (siempre |dx| + |dy| pasos). Las celdas que no
+        # se pueden pisar se vuelven a sortear solo entre los terrenos transitables, con sus
+        # mismos pesos, para no alterar la proporción de terrenos.
+        if para_enemigo:
+            transitables = [t for t in TERRENOS if t.transitable_enemigo]
+            mascara = self.mapa_logico.mascara_enemigo
+        else:
+            transitables = [t for t in TERRENOS if t.transitable_jugador]
+            mascara = self.mapa_logico.mascara_jugador
+        pesos = [PESOS_TERRENO[t.simbolo] for t in transitables]
+
+        x, y = inicio
+        paso_x = 1 if fin[0] >= x else -1
+        paso_y = 1 if fin[1] >= y else -1
+
+        while (x, y) != fin:
+            faltan_x = abs(fin[0] - x)
+            faltan_y = abs(fin[1] - y)
+            if self.rng.randrange(faltan_x + faltan_y) < faltan_x:
+                x += paso_x
+            else:
+                y += paso_y
 
-            for i in range(self.filas):
-                fila = []
-                for j in range(self.columnas):
-                    terreno_elegido = random.choices(opciones, weights=[60, 20, 10, 10], k=1)[0]
-                    fila.append(terreno_elegido)
-                self.mapa_logico.append(fila)
+            idx = self.mapa_logico.indice(x, y)
+            if mascara[idx]:
+                continue
+            if para_enemigo and self.mapa_logico.mascara_jugador[idx]:
+                # Un túnel pasa a camino: el corredor del jugador no se corta
+                self.mapa_logico[x][y] = Camino()
+            else:
+                self.mapa_logico[x][y] = self.rng.choices(transitables, weights=pesos, k=1)[0]
+            self.celdas_talladas += 1
 
-            inicio_pos = (0, 0)
-            self.mapa_logico[inicio_pos[0]][inicio_pos[1]] = Camino()
-            self.mapa_logico[self.salida_pos[0]][self.salida_pos[1]] = Camino()
+    def cambiar_terreno(self, x, y, terreno):
+        """
+        Cambia una celda en plena partida. Componentes, campos de distancia y candidatas de
+        aparición se reparan alrededor de la celda en vez de rehacerse, la capa jerárquica
+        recalcula solo su bloque y los caminos guardados se descartan.
+        """
+        self.mapa_logico[x][y] = terreno
+        self.version_mapa += 1
+        celda = self.mapa_logico.indice(x, y)
+        mascara = self.mapa_logico.mascara_enemigo
+
+        self.conectividad.celda_cambiada(self.mapa_logico, celda, self.version_mapa)
+        self.aparicion.celda_cambiada(mascara, celda, self.version_mapa)
+        for campo in self._campos.values():
+            # En un nivel de paquete el campo de los cazadores es el mismo de la aparición
+            if campo is not self.aparicion.campo_salida:
+                campo.celda_cambiada(mascara, celda, self.version_mapa)
+
+        for buscador in self.buscadores.values():
+            buscador.celda_cambiada(celda)
+        for enemigo in self.enemigos:
+            enemigo.camino = None
 
-            if self._validar_camino_bfs(inicio_pos, self.salida_pos):
-                mapa_valido = True
+    def obtener_campo(self, clave, objetivo):
+        # Solo se recalcula si cambió la celda objetivo o el mapa
+        campo = self._campos.get(clave)
+        if campo is None or campo.objetivo != objetivo or campo.version_mapa != self.version_mapa:
+            campo = CampoDistancias(self.mapa_logico, objetivo, self.version_mapa)
+            self._campos[clave] = campo
+        return campo
 
     def _inicializar_entidades(self):
         if self.modo_actual == 'escapa':
@@ -402,396 +2249,2250 @@ class Juego:
             velocidad = self.config['velocidad_escapa']
 
             initial_positions = [(self.filas-1, 0), (0, self.columnas-1), (self.filas-1, self.columnas-1)]
-            self.enemigos = [
-                Enemigo(x, y, 'escapa', velocidad)
-                for (x, y) in initial_positions[:num_enemigos]
-            ]
+            for (x, y) in initial_positions[:num_enemigos]:
+                self._agregar_enemigo(x, y, 'escapa', velocidad)
+            # Más enemigos que esquinas (p.ej. un enjambre): el resto aparece al azar
+            for _ in range(num_enemigos - len(initial_positions)):
+                posicion = self._obtener_posicion_segura('escapa')
+                if posicion:
+                    self._agregar_enemigo(posicion[0], posicion[1], 'escapa', velocidad)
 
         elif self.modo_actual == 'cazador':
              velocidad = self.config['velocidad_cazador']
-             e_x, e_y = self._obtener_posicion_segura('cazador')
-             self.enemigos = [Enemigo(e_x, e_y, 'cazador', velocidad)]
+             posicion = self._obtener_posicion_segura('cazador')
+             if posicion:
+                 self._agregar_enemigo(posicion[0], posicion[1], 'cazador', velocidad)
+
+    def obtener_buscador(self, algoritmo):
+        # Un buscador por algoritmo y partida, compartido por los enemigos que lo usan
+        if algoritmo not in ALGORITMOS_BUSQUEDA:
+            return None
+        if algoritmo not in self.buscadores:
+            self.buscadores[algoritmo] = ALGORITMOS_BUSQUEDA[algoritmo]()
+        return self.buscadores[algoritmo]
+
+    def _agregar_enemigo(self, x, y, modo, velocidad):
+        if self.enjambre is not None:
+            return self.enjambre.agregar(x, y, modo, velocidad)
+        buscador = self.obtener_buscador(self.config[f'algoritmo_{modo}'])
+        enemigo = Enemigo(x, y, modo, velocidad, buscador, self.config['radio_replanificacion'])
+        enemigo.identificador = next(self._ids_enemigos)
+        self.enemigos.append(enemigo)
+        self.indice.agregar_enemigo(enemigo)
+        return enemigo
+
+    def _quitar_enemigo(self, enemigo):
+        self.enemigos.remove(enemigo)
+        self.indice.quitar_enemigo(enemigo)
+
+    def cantidad_enemigos(self):
+        return len(self.enjambre) if self.enjambre is not None else len(self.enemigos)
+
+    def posiciones_enemigos(self):
+        # Identificador de cada enemigo vivo -> (x, y); no se repite dentro de una partida
+        if self.enjambre is not None:
+            return self.enjambre.posiciones()
+        return {enemigo.identificador: (enemigo.x, enemigo.y) for enemigo in self.enemigos}
+
+    @property
+    def trampas_activas(self):
+        return self.indice.todas_las_trampas()
+
+    def reloj(self):
+        # Tiempo lógico en segundos: avanza con los ticks, no con el reloj de pared
+        return self.ticks / TICKS_POR_SEGUNDO
 
-    def _manejar_respawn(self):
-        ahora = time.time()
-        enemigos_revividos = []
+    def colocar_trampa(self):
+        resultado_trampa = self.jugador.colocar_trampa()
+        if resultado_trampa:
+            self.indice.agregar_trampa(resultado_trampa)
+            self.jugador.trampas_disponibles = self.config['max_trampas'] - self.indice.cantidad_trampas
+        return resultado_trampa
 
-        for item in self.enemigos_muertos:
-            tiempo_muerte = item['tiempo_muerte']
+    def aplicar_entrada(self, dx=0, dy=0, es_correr=False, trampa=False):
+        if dx or dy or trampa:
+            self.grabadora.registrar(self.ticks, codificar_entrada(dx, dy, es_correr, trampa))
 
-            if ahora >= tiempo_muerte + SEGUNDOS_RESPAWN:
-                e_x, e_y = self._obtener_posicion_segura('escapa')
+        if trampa and self.modo_actual == 'escapa':
+            self.colocar_trampa()
 
-                self.enemigos.append(Enemigo(e_x, e_y, 'escapa', self.config['velocidad_escapa']))
-                enemigos_revividos.append(item)
+        if dx != 0 or dy != 0:
+            return self.jugador.mover(dx, dy, self.mapa_logico, es_correr)
+        return False
 
-        for item in enemigos_revividos:
-            self.enemigos_muertos.remove(item)
+    def avanzar_tick(self, esta_corriendo=False):
+        with PERFILADOR.tramo('tick'):
+            return self._avanzar_tick(bool(esta_corriendo))
 
-    def _comprobar_trampas(self, enemigo):
-        if enemigo.modo_juego == 'escapa':
-            pos_enemigo = (enemigo.x, enemigo.y)
-            trampas_a_remover = []
-
-            for trampa in self.trampas_activas:
-                trampa_x, trampa_y, _ = trampa
-                if (trampa_x, trampa_y) == pos_enemigo:
-                    trampas_a_remover.append(trampa)
-                    self.enemigos_muertos.append({'enemigo': enemigo, 'tiempo_muerte': time.time()})
-                    self.puntaje_manager.cazador_eliminado_trampa()
-                    break
+    def _avanzar_tick(self, esta_corriendo):
+        if esta_corriendo != self.grabadora.corriendo:
+            self.grabadora.corriendo = esta_corriendo
+            self.grabadora.registrar(self.ticks, ENTRADA_CAMBIO_CARRERA | (ENTRADA_CORRER if esta_corriendo else 0))
 
-            for trampa in trampas_a_remover:
-                self.trampas_activas.remove(trampa)
+        with PERFILADOR.tramo('energia'):
+            self.jugador.regenerar_energia(esta_corriendo)
+        with PERFILADOR.tramo('enemigos'):
+            resultado = self.actualizar_enemigos()
 
-            return len(trampas_a_remover) > 0
+        self.ticks += 1
+        # Los temporizadores vencidos se disparan antes de la entrada del siguiente tick
+        with PERFILADOR.tramo('temporizador'):
+            self.planificador.ejecutar_hasta(self.ticks)
+        return resultado
+
+    def paso(self, dx=0, dy=0, es_correr=False, trampa=False):
+        self.aplicar_entrada(dx, dy, es_correr, trampa)
+        return self.avanzar_tick(es_correr)
+
+    def simular(self, controlador, max_ticks):
+        """
+        Avanza la partida sin interfaz tan rápido como permita la CPU.
+        controlador puede ser una función juego -> (dx, dy, es_correr, trampa) o None,
+        o una secuencia de esas entradas (una por tick).
+        """
+        entradas = None if callable(controlador) else iter(controlador)
+        resultado = None
+
+        while resultado is None and self.ticks < max_ticks:
+            entrada = next(entradas, None) if entradas is not None else controlador(self)
+            resultado = self.paso(*entrada) if entrada else self.paso()
+
+        return self.resumen(resultado)
+
+    def resumen(self, resultado=None):
+        if resultado == "VICTORIA":
+            puntaje = self.puntaje_final
+        else:
+            puntaje = int(self.puntaje_manager.puntos_actuales)
+
+        return {
+            'resultado': resultado or "TIEMPO_AGOTADO",
+            'puntaje': puntaje,
+            'ticks': self.ticks,
+            'tiempo': self.reloj(),
+        }
+
+    def _respawn_enemigo(self):
+        posicion = self._obtener_posicion_segura('escapa')
+        if posicion:
+            self._agregar_enemigo(posicion[0], posicion[1], 'escapa', self.config['velocidad_escapa'])
+
+    def _comprobar_trampas(self, enemigo):
+        if enemigo.modo_juego == 'escapa':
+            if self.indice.quitar_trampa_en((enemigo.x, enemigo.y)):
+                self.planificador.programar(SEGUNDOS_RESPAWN * TICKS_POR_SEGUNDO, self._respawn_enemigo)
+                self.puntaje_manager.cazador_eliminado_trampa()
+                return True
         return False
 
     def actualizar_enemigos(self):
-        self._manejar_respawn()
-
-        enemigos_a_remover = []
+        if self.enjambre is not None:
+            return self._actualizar_enjambre()
 
+        # Por fases, como el enjambre: trampas y movimiento de todos, y después colisiones.
+        # Así el resultado del tick no depende del orden de la lista de enemigos
+        jugador_pos = (self.jugador.x, self.jugador.y)
+        en_trampa = []
         for enemigo in self.enemigos:
             if self._comprobar_trampas(enemigo):
-                enemigos_a_remover.append(enemigo)
+                en_trampa.append(enemigo)
                 continue
 
-            jugador_pos = (self.jugador.x, self.jugador.y)
-            enemigo.mover_ia(jugador_pos, self.mapa_logico, self.salida_pos)
+            campo = None
+            if enemigo.buscador is None and enemigo.listo_para_mover():
+                objetivo = jugador_pos if enemigo.modo_juego == 'escapa' else self.salida_pos
+                campo = self.obtener_campo(enemigo.modo_juego, objetivo)
+            pos_anterior = (enemigo.x, enemigo.y)
+            if enemigo.mover_ia(jugador_pos, self.mapa_logico, self.salida_pos, campo, self.conectividad):
+                self.indice.mover_enemigo(enemigo, pos_anterior)
 
-            resultado_colision = self._comprobar_colisiones(enemigo)
+        for enemigo in en_trampa:
+            self._quitar_enemigo(enemigo)
 
-            if resultado_colision == "ENEMIGO_ATRAPADO" or resultado_colision == "ENEMIGO_ESCAPA":
+        if self.modo_actual == 'escapa':
+            if self.indice.enemigos_en(jugador_pos):
+                return "DERROTA_ATRAPADO"
+            return self._comprobar_victoria()
+
+        enemigos_a_remover = []
+        for enemigo in self.enemigos:
+            pos = (enemigo.x, enemigo.y)
+            if pos == jugador_pos:
+                self.puntaje_manager.enemigo_atrapado()
+                enemigos_a_remover.append(enemigo)
+            elif pos == self.salida_pos:
+                self.puntaje_manager.enemigo_escapo()
                 enemigos_a_remover.append(enemigo)
-            elif resultado_colision == "VICTORIA" or resultado_colision == "DERROTA_ATRAPADO":
-                return resultado_colision
 
         for enemigo in enemigos_a_remover:
-            if enemigo in self.enemigos:
-                self.enemigos.remove(enemigo)
-
-                if enemigo.modo_juego == 'cazador':
-                    velocidad = self.config['velocidad_cazador']
-                    e_x, e_y = self._obtener_posicion_segura('cazador')
-                    self.enemigos.append(Enemigo(e_x, e_y, 'cazador', velocidad))
+            self._quitar_enemigo(enemigo)
+            if enemigo.modo_juego == 'cazador':
+                posicion = self._obtener_posicion_segura('cazador')
+                if posicion:
+                    self._agregar_enemigo(posicion[0], posicion[1], 'cazador', self.config['velocidad_cazador'])
+        return None
 
+    def _campo_enjambre(self, modo):
+        objetivo = (self.jugador.x, self.jugador.y) if modo == 'escapa' else self.salida_pos
+        return self.obtener_campo(modo, objetivo)
+
+    def _actualizar_enjambre(self):
+        # Mismas reglas que actualizar_enemigos, pero por fases sobre todo el enjambre:
+        # trampas, movimiento y colisiones
+        enjambre = self.enjambre
+        xs, ys, modos = enjambre.xs, enjambre.ys, enjambre.modos
+        escapa = MODOS_ENJAMBRE.index('escapa')
+
+        if self.indice.cantidad_trampas:
+            for hueco in enjambre.huecos_vivos():
+                if modos[hueco] == escapa and self.indice.quitar_trampa_en((xs[hueco], ys[hueco])):
+                    enjambre.quitar(hueco)
+                    self.planificador.programar(SEGUNDOS_RESPAWN * TICKS_POR_SEGUNDO, self._respawn_enemigo)
+                    self.puntaje_manager.cazador_eliminado_trampa()
 
-        return None
+        enjambre.avanzar(self._campo_enjambre)
 
-    def _comprobar_colisiones(self, enemigo):
-        if (enemigo.x, enemigo.y) == (self.jugador.x, self.jugador.y):
-            if self.modo_actual == 'escapa':
+        jugador_pos = (self.jugador.x, self.jugador.y)
+        if self.modo_actual == 'escapa':
+            if any((xs[hueco], ys[hueco]) == jugador_pos for hueco in enjambre.huecos_vivos()):
                 return "DERROTA_ATRAPADO"
+            return self._comprobar_victoria()
 
-            elif self.modo_actual == 'cazador':
+        a_remover = []
+        for hueco in enjambre.huecos_vivos():
+            pos = (xs[hueco], ys[hueco])
+            if pos == jugador_pos:
                 self.puntaje_manager.enemigo_atrapado()
-                return "ENEMIGO_ATRAPADO"
-
-        if self.modo_actual == 'cazador' and (enemigo.x, enemigo.y) == self.salida_pos:
-            self.puntaje_manager.enemigo_escapo()
-            return "ENEMIGO_ESCAPA"
+                a_remover.append(hueco)
+            elif pos == self.salida_pos:
+                self.puntaje_manager.enemigo_escapo()
+                a_remover.append(hueco)
+
+        for hueco in a_remover:
+            enjambre.quitar(hueco)
+            if modos[hueco] != escapa:
+                posicion = self._obtener_posicion_segura('cazador')
+                if posicion:
+                    self._agregar_enemigo(posicion[0], posicion[1], 'cazador', self.config['velocidad_cazador'])
+        return None
 
+    def _comprobar_victoria(self):
         if self.modo_actual == 'escapa' and (self.jugador.x, self.jugador.y) == self.salida_pos:
-            tiempo_final = time.time() - self.tiempo_inicio
+            tiempo_final = self.reloj()
             multiplicador = self.config['multiplicador_puntaje']
             dificultad = self.dificultad
-            self.puntaje_manager.calcular_y_registrar_puntaje(self.jugador.nombre, 'escapa', tiempo_final, multiplicador, dificultad)
+            self.puntaje_final = self.puntaje_manager.calcular_y_registrar_puntaje(self.jugador.nombre, 'escapa', tiempo_final, multiplicador, dificultad)
             return "VICTORIA"
 
         return None
 
-# CLASE DE INTERFAZ Y REGISTRO
-
-class RegistroVentana(tk.Toplevel):
-    def __init__(self, master, callback, puntaje_manager):
-        super().__init__(master)
-        self.title("Proyecto 2: Menú Principal")
-        self.geometry("400x380")
-        self.configure(bg=BG_PRIMARIO)
-        self.transient(master)
-        self.callback = callback
-        self.puntaje_manager = puntaje_manager
-
-        tk.Label(self, text="ESCAPA DEL LABERINTO", bg=BG_PRIMARIO, fg=FG_PRIMARIO,
-                 font=('Arial', 14, 'bold')).pack(pady=(15, 10))
-
-        tk.Label(self, text="Ingrese su nombre:", bg=BG_PRIMARIO, fg=COLOR_TEXTO,
-                 font=('Arial', 10)).pack()
-        self.entry_nombre = tk.Entry(self, font=('Arial', 12), justify='center')
-        self.entry_nombre.pack(pady=(5, 15), padx=40, fill='x')
-
-        tk.Label(self, text="Seleccione Dificultad:", bg=BG_PRIMARIO, fg=COLOR_TEXTO,
-                 font=('Arial', 10)).pack()
-
-        self.opciones_dificultad = ['Facil', 'Normal', 'Dificil']
-        self.dificultad_var = tk.StringVar(self)
-        self.dificultad_var.set('Normal')
-
-        self.menu_dificultad = tk.OptionMenu(self, self.dificultad_var, *self.opciones_dificultad)
-        self.menu_dificultad.config(bg=BG_PRIMARIO, fg=FG_PRIMARIO, font=('Arial', 10), width=10)
-        self.menu_dificultad['menu'].config(bg=BG_PRIMARIO, fg='black', font=('Arial', 10))
-        self.menu_dificultad.pack(pady=(5, 15))
-
-        boton_kwargs = {'bg': ACCENT_BOTON_START, 'fg': FG_PRIMARIO, 'font': ('Arial', 10, 'bold'), 'relief': 'flat', 'width': 30}
-
-        tk.Button(self, text="Comenzar Modo Escapa",
-                  command=self._iniciar_escapa, **boton_kwargs).pack(pady=3)
-
-        tk.Button(self, text="Comenzar Modo Cazador",
-                  command=self._iniciar_cazador, **boton_kwargs).pack(pady=3)
-
-        info_frame = tk.Frame(self, bg=BG_PRIMARIO)
-        info_frame.pack(pady=(15, 5))
-
-        tk.Button(info_frame, text="Instrucciones", command=self.mostrar_instrucciones,
-                  bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, font=('Arial', 10), relief='flat').pack(side=tk.LEFT, padx=3)
-
-        tk.Button(info_frame, text="Ver Top Escapa", command=self._mostrar_top_escapa,
-                  bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, font=('Arial', 10), relief='flat').pack(side=tk.LEFT, padx=3)
-
-        tk.Button(info_frame, text="Ver Top Cazador", command=self._mostrar_top_cazador,
-                  bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, font=('Arial', 10), relief='flat').pack(side=tk.LEFT, padx=3)
-
-        tk.Button(info_frame, text="Ver Historial", command=self.mostrar_historial,
-                  bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, font=('Arial', 10), relief='flat').pack(side=tk.LEFT, padx=3)
-
-    def _iniciar_escapa(self):
-        self.iniciar_juego('escapa')
-
-    def _iniciar_cazador(self):
-        self.iniciar_juego('cazador')
-
-    def _mostrar_top_escapa(self):
-        self.mostrar_top('escapa')
-
-    def _mostrar_top_cazador(self):
-        self.mostrar_top('cazador')
-
-    def iniciar_juego(self, modo):
-        nombre = self.entry_nombre.get()
-        dificultad = self.dificultad_var.get()
-        if nombre:
-            self.callback(nombre, modo, dificultad)
-            self.destroy()
+# SIMULACIÓN SIN INTERFAZ
+
+class BotJugador:
+    """
+    Jugador automático para partidas sin interfaz: en escapa sigue el camino más corto a
+    la salida y pone trampas si un cazador está cerca; en cazador persigue al enemigo más cercano.
+    """
+    def __init__(self, ticks_por_movimiento=8, distancia_trampa=4):
+        self.ticks_por_movimiento = ticks_por_movimiento
+        self.distancia_trampa = distancia_trampa
+        self.campo = None
+
+    def __call__(self, juego):
+        if juego.ticks % self.ticks_por_movimiento:
+            return None
+
+        x, y = juego.jugador.x, juego.jugador.y
+        posiciones = juego.posiciones_enemigos().values()
+        cercania = [abs(ex - x) + abs(ey - y) for ex, ey in posiciones]
+
+        if juego.modo_actual == 'escapa':
+            objetivo = juego.salida_pos
+        elif posiciones:
+            objetivo = min(posiciones, key=lambda p: abs(p[0] - x) + abs(p[1] - y))
         else:
-            messagebox.showerror("Error", "El registro es obligatorio antes de comenzar.")
-
-    def mostrar_top(self, modo):
-        texto = self.puntaje_manager.mostrar_top(modo)
-        messagebox.showinfo("Top 5 Puntajes", texto)
-
-    def mostrar_historial(self):
-        texto = self.puntaje_manager.mostrar_historial_completo()
-        messagebox.showinfo("Historial de Partidas", texto)
-
-
-    def mostrar_instrucciones(self):
-        instrucciones = (
-            "Instrucciones del Juego\n\n"
-            "Dificultades (Afecta Velocidad, #Enemigos y Puntos):\n"
-            "  • Fácil: Velocidad Lenta / 1 Cazador (Escapa) / Multiplicador x1.0\n"
-            "  • Normal: Velocidad Media / 2 Cazadores (Escapa) / Multiplicador x1.5\n"
-            "  • Difícil: Velocidad Rápida / 3 Cazadores (Escapa) / Multiplicador x2.0\n\n"
-            "Modo 1: Escapa\n"
-            "  • IA Mejorada: Los enemigos usan BFS para perseguirte.\n"
-            "  • Objetivo: Llegar a la salida (bandera FIN).\n"
-            "  • Trampas (T): Máx. 3 activas (cooldown de 5s). Matan al cazador.\n\n"
-            "Modo 2: Cazador\n"
-            f"  • Restricción de Aparición: El cazador reaparece a una distancia mínima de {DISTANCIA_MINIMA_SALIDA} de la salida.\n"
-            "  • IA Mejorada: Los enemigos usan BFS para huir a la salida.\n"
-            "  • Objetivo: Atrapar al cazador antes de que escape.\n"
-            "  • Atrapado: El enemigo desaparece y reaparece en una zona segura (lejos de la salida)."
-        )
-        messagebox.showinfo("Instrucciones", instrucciones)
-
-
-class Interfaz(tk.Frame):
-    def __init__(self, master):
-        super().__init__(master)
-
-        self.master = master
-        self.juego = None
-        self.pack()
-        self.master.title("Proyecto 2: Escapa del Laberinto")
-        self.puntaje_manager_global = PuntajeManager()
-        self.canvas_mapa = None
-
+            return None
+
+        campo = self.campo
+        if campo is None or campo.objetivo != objetivo or campo.version_mapa != juego.version_mapa:
+            campo = CampoDistancias(juego.mapa_logico, objetivo, juego.version_mapa, juego.mapa_logico.mascara_jugador)
+            self.campo = campo
+
+        trampa = juego.modo_actual == 'escapa' and any(d <= self.distancia_trampa for d in cercania)
+        siguiente = campo.siguiente_paso((x, y))
+        if siguiente is None:
+            return (0, 0, False, trampa)
+        return (siguiente[0] - x, siguiente[1] - y, False, trampa)
+
+
+def simular_partida(filas, columnas, modo, dificultad, max_ticks, controlador=None, parametros=None,
+                    semilla=None, ruta_repeticion=None, nivel=None):
+    juego = Juego(filas, columnas, modo, dificultad, parametros, semilla, nivel)
+    juego.jugador.nombre = "Bot"
+    resumen = juego.simular(controlador or BotJugador(), max_ticks)
+    if ruta_repeticion:
+        guardar_repeticion(juego, ruta_repeticion, resumen['resultado'])
+    return resumen
+
+
+def percentil(valores_ordenados, q):
+    if not valores_ordenados:
+        return 0
+    posicion = min(len(valores_ordenados) - 1, int(q * len(valores_ordenados)))
+    return valores_ordenados[posicion]
+
+
+def ejecutar_sin_interfaz(args):
+    inicio = time.perf_counter()
+    conteo = {}
+    puntajes = []
+    ticks = []
+
+    parametros = None
+    if args.algoritmo:
+        parametros = {'algoritmo_escapa': args.algoritmo, 'algoritmo_cazador': args.algoritmo}
+    if args.enjambre:
+        parametros = dict(parametros or {}, enjambre=True, enemigos_escapa=args.enjambre)
+
+    if args.grabar:
+        os.makedirs(args.grabar, exist_ok=True)
+    # Con un paquete, cada partida juega el nivel siguiente (y se da la vuelta al final)
+    paquete = PaqueteNiveles(args.paquete) if args.paquete else None
+
+    for i in range(args.partidas):
+        ruta = os.path.join(args.grabar, f"partida_{i:05d}.rep") if args.grabar else None
+        nivel = paquete.nivel((args.nivel + i) % len(paquete)) if paquete else None
+        resumen = simular_partida(args.filas, args.columnas, args.modo, args.dificultad, args.ticks,
+                                  parametros=parametros, ruta_repeticion=ruta, nivel=nivel)
+        conteo[resumen['resultado']] = conteo.get(resumen['resultado'], 0) + 1
+        puntajes.append(resumen['puntaje'])
+        ticks.append(resumen['ticks'])
+
+    duracion = time.perf_counter() - inicio
+    print(f"{args.partidas} partidas ({args.modo}, {args.dificultad}, {args.filas}x{args.columnas}) en {duracion:.2f}s")
+    for resultado, cantidad in sorted(conteo.items()):
+        print(f"  {resultado}: {cantidad}")
+    print(f"  Puntaje medio: {sum(puntajes) / len(puntajes):.1f}")
+    print(f"  Ticks medios: {sum(ticks) / len(ticks):.1f}")
+    print(f"  Partidas por minuto: {args.partidas / duracion * 60:.0f}")
+
+# REPETICIONES (GRABACIÓN Y REPRODUCCIÓN)
+
+# Cada entrada es un byte: bits 0-2 dirección (0 = quieto, 1-4 = MOVIMIENTOS), bit 3 correr,
+# bit 4 trampa. Con el bit 5 el byte no es una entrada sino el estado de carrera del tick.
+ENTRADA_CORRER = 0x08
+ENTRADA_TRAMPA = 0x10
+ENTRADA_CAMBIO_CARRERA = 0x20
+MAGIA_REPETICION = b"ELRP"
+VERSION_REPETICION = 2
+# El último campo de la cabecera es un CRC32 de todo el archivo salvo él mismo
+CABECERA_REPETICION = struct.Struct("<4sBQHHBBIiII")
+MODOS_REPETICION = ('escapa', 'cazador')
+DIFICULTADES_REPETICION = ('Facil', 'Normal', 'Dificil')
+
+
+def codificar_entrada(dx, dy, es_correr, trampa):
+    codigo = MOVIMIENTOS.index((dx, dy)) + 1 if (dx or dy) else 0
+    if es_correr:
+        codigo |= ENTRADA_CORRER
+    if trampa:
+        codigo |= ENTRADA_TRAMPA
+    return codigo
+
+
+def decodificar_entrada(codigo):
+    direccion = codigo & 0x07
+    dx, dy = MOVIMIENTOS[direccion - 1] if direccion else (0, 0)
+    return dx, dy, bool(codigo & ENTRADA_CORRER), bool(codigo & ENTRADA_TRAMPA)
+
+
+class GrabadoraPartida:
+    """
+    Registra las entradas de una partida como pares (ticks desde el evento anterior en
+    varint, byte de entrada). Una partida típica ocupa unos pocos cientos de bytes.
+    """
+    def __init__(self):
+        self.eventos = bytearray()
+        self.ultimo_tick = 0
+        self.cantidad = 0
         self.corriendo = False
 
-        self.master.bind('<Shift_L>', self.iniciar_correr)
-        self.master.bind('<KeyRelease-Shift_L>', self.detener_correr)
-        self.master.bind('<Key>', self.manejar_tecla)
-
-        RegistroVentana(master, self.iniciar_juego, self.puntaje_manager_global)
-
-    def iniciar_correr(self, event):
-        self.corriendo = True
-
-    def detener_correr(self, event):
+    def registrar(self, tick, codigo):
+        delta = tick - self.ultimo_tick
+        self.ultimo_tick = tick
+        while delta >= 0x80:
+            self.eventos.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        self.eventos.append(delta)
+        self.eventos.append(codigo)
+        self.cantidad += 1
+
+
+def iterar_eventos(eventos):
+    # Generador de (tick, código) a partir de los bytes de la grabadora
+    tick = 0
+    i = 0
+    total = len(eventos)
+    while i < total:
+        delta = 0
+        desplazamiento = 0
+        while True:
+            byte = eventos[i]
+            i += 1
+            delta |= (byte & 0x7F) << desplazamiento
+            desplazamiento += 7
+            if byte < 0x80:
+                break
+        tick += delta
+        yield tick, eventos[i]
+        i += 1
+
+
+def _suma_repeticion(contenido):
+    fin = CABECERA_REPETICION.size
+    return zlib.crc32(contenido[fin:], zlib.crc32(contenido[:fin - 4]))
+
+
+def guardar_repeticion(juego, ruta, resultado=None):
+    resumen = juego.resumen(resultado)
+    extra = json.dumps({'parametros': juego.parametros, 'resultado': resumen['resultado'],
+                        'nombre': juego.jugador.nombre}, sort_keys=True).encode('utf-8')
+    contenido = bytearray(CABECERA_REPETICION.pack(
+        MAGIA_REPETICION, VERSION_REPETICION, juego.semilla, juego.filas, juego.columnas,
+        MODOS_REPETICION.index(juego.modo_actual), DIFICULTADES_REPETICION.index(juego.dificultad),
+        juego.ticks, resumen['puntaje'] or 0, len(extra), 0))
+    contenido += extra
+    contenido += juego.grabadora.eventos
+    struct.pack_into("<I", contenido, CABECERA_REPETICION.size - 4, _suma_repeticion(contenido))
+    with open(ruta, 'wb') as archivo:
+        archivo.write(contenido)
+    return ruta
+
+
+def cargar_repeticion(ruta):
+    with open(ruta, 'rb') as archivo:
+        contenido = archivo.read()
+
+    if len(contenido) < CABECERA_REPETICION.size:
+        raise ValueError(f"{ruta} no es una repetición válida")
+    (magia, version, semilla, filas, columnas, modo, dificultad,
+     ticks, puntaje, largo_extra, suma) = CABECERA_REPETICION.unpack_from(contenido)
+    if magia != MAGIA_REPETICION or version != VERSION_REPETICION:
+        raise ValueError(f"{ruta} no es una repetición válida")
+    # Con la suma correcta el resto del archivo es el que escribió guardar_repeticion
+    if suma != _suma_repeticion(contenido):
+        raise ValueError(f"{ruta} está dañada o incompleta")
+
+    inicio = CABECERA_REPETICION.size
+    extra = json.loads(contenido[inicio:inicio + largo_extra].decode('utf-8'))
+    return {
+        'semilla': semilla,
+        'filas': filas,
+        'columnas': columnas,
+        'modo': MODOS_REPETICION[modo],
+        'dificultad': DIFICULTADES_REPETICION[dificultad],
+        'ticks': ticks,
+        'puntaje': puntaje,
+        'resultado': extra['resultado'],
+        'parametros': extra['parametros'],
+        'nombre': extra['nombre'],
+        'eventos': contenido[inicio + largo_extra:],
+    }
+
+
+def reproducir_repeticion(datos):
+    """
+    Vuelve a jugar una repetición sin interfaz y tan rápido como se pueda. La partida
+    reproducida graba sus propias entradas, que deben coincidir byte a byte con las originales.
+    """
+    juego = Juego(datos['filas'], datos['columnas'], datos['modo'], datos['dificultad'],
+                  datos['parametros'] or None, datos['semilla'])
+    juego.jugador.nombre = datos['nombre']
+
+    eventos = iterar_eventos(datos['eventos'])
+    pendiente = next(eventos, None)
+    corriendo = False
+    resultado = None
+
+    while True:
+        while pendiente is not None and pendiente[0] <= juego.ticks:
+            codigo = pendiente[1]
+            if codigo & ENTRADA_CAMBIO_CARRERA:
+                corriendo = bool(codigo & ENTRADA_CORRER)
+            else:
+                juego.aplicar_entrada(*decodificar_entrada(codigo))
+            pendiente = next(eventos, None)
+
+        if resultado is not None or juego.ticks >= datos['ticks']:
+            break
+        resultado = juego.avanzar_tick(corriendo)
+
+    resumen = juego.resumen(resultado)
+    resumen['jugador'] = (juego.jugador.x, juego.jugador.y)
+    resumen['enemigos'] = juego.posiciones_enemigos()
+    resumen['coincide'] = (resumen['resultado'] == datos['resultado'] and
+                           (resumen['puntaje'] or 0) == datos['puntaje'] and
+                           resumen['ticks'] == datos['ticks'] and
+                           bytes(juego.grabadora.eventos) == bytes(datos['eventos']))
+    return resumen
+
+
+def ejecutar_repeticiones(args):
+    # Devuelve False si alguna repetición no se reprodujo igual que la original
+    todas_coinciden = True
+    for ruta in args.reproducir:
+        datos = cargar_repeticion(ruta)
+        inicio = time.perf_counter()
+        resumen = reproducir_repeticion(datos)
+        duracion = max(time.perf_counter() - inicio, 1e-9)
+
+        velocidad = resumen['tiempo'] / duracion
+        estado = "OK" if resumen['coincide'] else "DIFERENTE"
+        print(f"{ruta}: {estado} {resumen['resultado']} ({datos['resultado']}), puntaje {resumen['puntaje']} "
+              f"({datos['puntaje']}), {resumen['ticks']} ticks en {duracion * 1000:.1f} ms ({velocidad:.0f}x tiempo real)")
+        todas_coinciden = todas_coinciden and resumen['coincide']
+    return todas_coinciden
+
+# PAQUETES DE NIVELES
+
+# Cabecera (magia, versión, cantidad de niveles) seguida de una entrada de índice por nivel:
+# desplazamiento del bloque, semilla, filas, columnas y largo de cada lista de candidatas.
+# Cada bloque arranca alineado a 8 bytes: primero los enteros de 32 bits (estado del generador,
+# distancias a la salida, componentes del jugador y del enemigo, candidatas escapa y cazador)
+# y después los bytes (códigos de terreno, máscara del jugador y del enemigo).
+MAGIA_PAQUETE = b"ELPK"
+VERSION_PAQUETE = 1
+CABECERA_PAQUETE = struct.Struct("<4sBxxxI")
+ENTRADA_PAQUETE = struct.Struct("<QQHHII")
+LARGO_ESTADO_RNG = 625
+
+
+def _generar_nivel(tarea):
+    # Se ejecuta en un proceso del pool. Sin enemigos iniciales nada más usa el generador
+    # después de generar_mapa, así que su estado es el que necesita cargar_nivel
+    filas, columnas, semilla = tarea
+    juego = Juego(filas, columnas, 'escapa', 'Normal', {'enemigos_escapa': 0}, semilla)
+    mapa = juego.mapa_logico
+    candidatas = juego.aparicion.candidatas
+    enteros = array('I', juego.rng.getstate()[1])
+    bloque = (enteros.tobytes() + juego.aparicion.campo_salida.distancias.tobytes() +
+              juego.conectividad.componentes_jugador.tobytes() + juego.conectividad.componentes_enemigo.tobytes() +
+              candidatas['escapa'].tobytes() + candidatas['cazador'].tobytes() +
+              bytes(mapa.codigos) + bytes(mapa.mascara_jugador) + bytes(mapa.mascara_enemigo))
+    return semilla, filas, columnas, len(candidatas['escapa']), len(candidatas['cazador']), bloque
+
+
+def construir_paquete(ruta, tamanos, cantidad, semilla_inicial=0, procesos=None):
+    """
+    Genera y valida `cantidad` mapas por tamaño en un pool de procesos y los escribe en un
+    solo archivo. Los bloques se escriben a medida que llegan; el índice, al final.
+    """
+    tareas = [(tamano, tamano, semilla_inicial + i * len(tamanos) + j)
+              for i in range(cantidad) for j, tamano in enumerate(tamanos)]
+    procesos = procesos or os.cpu_count() or 1
+    indice = []
+
+    with open(ruta, 'wb') as archivo, multiprocessing.Pool(procesos) as pool:
+        archivo.write(CABECERA_PAQUETE.pack(MAGIA_PAQUETE, VERSION_PAQUETE, len(tareas)))
+        archivo.write(bytes(ENTRADA_PAQUETE.size * len(tareas)))
+        for semilla, filas, columnas, escapa, cazador, bloque in pool.imap(
+                _generar_nivel, tareas, chunksize=max(1, len(tareas) // (procesos * 8))):
+            archivo.write(bytes(-archivo.tell() % 8))
+            indice.append(ENTRADA_PAQUETE.pack(archivo.tell(), semilla, filas, columnas, escapa, cazador))
+            archivo.write(bloque)
+
+        archivo.seek(CABECERA_PAQUETE.size)
+        archivo.write(b"".join(indice))
+    return len(tareas)
+
+
+class NivelEmpaquetado:
+    """Un nivel de un paquete: todos sus datos son memoryviews sobre el archivo mapeado."""
+    def __init__(self, vista, desplazamiento, semilla, filas, columnas, escapa, cazador):
+        self.semilla = semilla
+        self.filas = filas
+        self.columnas = columnas
+        total = filas * columnas
+
+        enteros = vista[desplazamiento:desplazamiento + 4 * (LARGO_ESTADO_RNG + 3 * total + escapa + cazador)].cast('i')
+        self.estado_rng = enteros[:LARGO_ESTADO_RNG].cast('B').cast('I')
+        inicio = LARGO_ESTADO_RNG
+        self.distancias_salida = enteros[inicio:inicio + total]
+        self.componentes_jugador = enteros[inicio + total:inicio + 2 * total]
+        self.componentes_enemigo = enteros[inicio + 2 * total:inicio + 3 * total]
+        inicio += 3 * total
+        self.candidatas = {'escapa': enteros[inicio:inicio + escapa],
+                           'cazador': enteros[inicio + escapa:inicio + escapa + cazador]}
+
+        inicio = desplazamiento + 4 * (inicio + escapa + cazador)
+        self.codigos = vista[inicio:inicio + total]
+        self.mascara_jugador = vista[inicio + total:inicio + 2 * total]
+        self.mascara_enemigo = vista[inicio + 2 * total:inicio + 3 * total]
+
+
+class PaqueteNiveles:
+    """
+    Paquete de niveles abierto con mmap (solo lectura). Abrir un nivel es leer su entrada
+    del índice y armar vistas: O(1) y sin copias, sea cual sea el tamaño del mapa.
+    """
+    def __init__(self, ruta):
+        with open(ruta, 'rb') as archivo:
+            if os.fstat(archivo.fileno()).st_size < CABECERA_PAQUETE.size:
+                raise ValueError(f"{ruta} no es un paquete de niveles válido")
+            self.datos = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self.ruta = ruta
+        self.vista = memoryview(self.datos)
+        magia, version, self.cantidad = CABECERA_PAQUETE.unpack_from(self.datos)
+        if magia != MAGIA_PAQUETE or version != VERSION_PAQUETE:
+            raise ValueError(f"{ruta} no es un paquete de niveles válido")
+        if len(self.datos) < CABECERA_PAQUETE.size + self.cantidad * ENTRADA_PAQUETE.size:
+            raise ValueError(f"{ruta} está incompleto: falta el índice de sus {self.cantidad} niveles")
+
+    def __len__(self):
+        return self.cantidad
+
+    def nivel(self, indice):
+        if not 0 <= indice < self.cantidad:
+            raise IndexError(f"Nivel {indice} fuera de rango: {self.ruta} tiene {self.cantidad} niveles")
+        entrada = ENTRADA_PAQUETE.unpack_from(self.datos, CABECERA_PAQUETE.size + indice * ENTRADA_PAQUETE.size)
+        desplazamiento, _, filas, columnas, escapa, cazador = entrada
+        total = filas * columnas
+        if desplazamiento + 4 * (LARGO_ESTADO_RNG + 3 * total + escapa + cazador) + 3 * total > len(self.datos):
+            raise ValueError(f"{self.ruta} está incompleto: el nivel {indice} se sale del archivo")
+        return NivelEmpaquetado(self.vista, *entrada)
+
+
+def construir_paquete_desde_args(args):
+    inicio = time.perf_counter()
+    total = construir_paquete(args.construir_paquete, args.tamanos, args.niveles, procesos=args.procesos)
+    duracion = time.perf_counter() - inicio
+    tamano = os.path.getsize(args.construir_paquete)
+    print(f"{total} niveles ({', '.join(map(str, args.tamanos))}) en {duracion:.1f}s: "
+          f"{args.construir_paquete} ({tamano / 1024:.0f} KB)")
+
+# SIMULACIÓN EN LOTE (VARIOS PROCESOS)
+
+COLUMNAS_RESULTADOS = ['semilla', 'modo', 'dificultad', 'filas', 'columnas', 'parametros', 'resultado', 'puntaje', 'ticks']
+
+
+def _ejecutar_tarea(tarea):
+    # Se ejecuta en un proceso del pool; la semilla hace reproducible cada partida
+    resumen = simular_partida(tarea['filas'], tarea['columnas'], tarea['modo'], tarea['dificultad'],
+                              tarea['max_ticks'], parametros=tarea['parametros'], semilla=tarea['semilla'])
+    fila = dict(tarea)
+    del fila['max_ticks']
+    fila['parametros'] = json.dumps(tarea['parametros'], sort_keys=True) if tarea['parametros'] else ""
+    fila['resultado'] = resumen['resultado']
+    fila['puntaje'] = resumen['puntaje']
+    fila['ticks'] = resumen['ticks']
+    return fila
+
+
+def generar_tareas(modos, dificultades, tamanos, partidas, max_ticks, barrido=None, semilla_inicial=0):
+    # barrido: {'velocidad_escapa': [10, 20, 30], ...} -> producto cartesiano de combinaciones
+    barrido = barrido or {}
+    claves = sorted(barrido)
+    combinaciones = [dict(zip(claves, valores)) for valores in itertools.product(*(barrido[c] for c in claves))]
+
+    semilla = semilla_inicial
+    for modo, dificultad, tamano, parametros in itertools.product(modos, dificultades, tamanos, combinaciones):
+        for _ in range(partidas):
+            yield {
+                'semilla': semilla,
+                'modo': modo,
+                'dificultad': dificultad,
+                'filas': tamano,
+                'columnas': tamano,
+                'parametros': parametros,
+                'max_ticks': max_ticks,
+            }
+            semilla += 1
+
+
+def ejecutar_lote(tareas, ruta_resultados, procesos=None):
+    """
+    Reparte las partidas entre un pool de procesos y va escribiendo cada resultado al
+    CSV en cuanto llega. Devuelve los agregados por (modo, dificultad, tamaño, parámetros).
+    """
+    tareas = list(tareas)
+    procesos = procesos or os.cpu_count() or 1
+    bloque = max(1, len(tareas) // (procesos * 8))
+    agregados = {}
+
+    with open(ruta_resultados, 'w', newline='', encoding='utf-8') as archivo, \
+            multiprocessing.Pool(procesos) as pool:
+        escritor = csv.DictWriter(archivo, fieldnames=COLUMNAS_RESULTADOS)
+        escritor.writeheader()
+
+        for fila in pool.imap_unordered(_ejecutar_tarea, tareas, chunksize=bloque):
+            escritor.writerow(fila)
+
+            clave = (fila['modo'], fila['dificultad'], f"{fila['filas']}x{fila['columnas']}", fila['parametros'])
+            grupo = agregados.setdefault(clave, {'partidas': 0, 'victorias': 0, 'ticks_salida': [], 'puntajes': []})
+            grupo['partidas'] += 1
+            grupo['puntajes'].append(fila['puntaje'])
+            if fila['resultado'] == "VICTORIA":
+                grupo['victorias'] += 1
+                grupo['ticks_salida'].append(fila['ticks'])
+
+    return agregados
+
+
+def mostrar_resumen_lote(agregados):
+    for (modo, dificultad, tamano, parametros), grupo in sorted(agregados.items()):
+        ticks = sorted(grupo['ticks_salida'])
+        puntajes = sorted(grupo['puntajes'])
+        print(f"{modo:8} {dificultad:8} {tamano:>8} {parametros or '-'}")
+        print(f"    partidas: {grupo['partidas']}  victorias: {grupo['victorias'] / grupo['partidas']:.1%}")
+        print(f"    ticks hasta la salida p50/p90: {percentil(ticks, 0.5)}/{percentil(ticks, 0.9)}")
+        print(f"    puntaje medio: {sum(puntajes) / len(puntajes):.1f}  p10/p50/p90: "
+              f"{percentil(puntajes, 0.1)}/{percentil(puntajes, 0.5)}/{percentil(puntajes, 0.9)}")
+
+
+def ejecutar_lote_desde_args(args):
+    barrido = {}
+    for definicion in args.barrido:
+        clave, valores = definicion.split('=', 1)
+        barrido[clave] = [float(v) if '.' in v else int(v) for v in valores.split(',')]
+
+    tareas = generar_tareas(args.modos, args.dificultades, args.tamanos, args.partidas, args.ticks, barrido)
+    inicio = time.perf_counter()
+    agregados = ejecutar_lote(tareas, args.salida, args.procesos)
+    duracion = time.perf_counter() - inicio
+
+    total = sum(grupo['partidas'] for grupo in agregados.values())
+    print(f"{total} partidas en {duracion:.1f}s ({total / duracion * 60:.0f} por minuto). Resultados en {args.salida}")
+    mostrar_resumen_lote(agregados)
+
+# SERVIDOR DE PARTIDAS (ASYNCIO)
+
+class SalaJuego:
+    """
+    Una partida del servidor: el Juego, las entradas que llegaron desde el último tick y
+    lo último que se mandó a los clientes, para enviar solo lo que cambió.
+    """
+    def __init__(self, nombre, modo, dificultad, filas, columnas, semilla=None, parametros=None):
+        self.nombre = nombre
+        self.opciones = (filas, columnas, modo, dificultad, parametros)
+        self.clientes = []
+        self.partidas = 0
+        self.reiniciar(semilla)
+
+    def reiniciar(self, semilla=None):
+        self.juego = Juego(*self.opciones, semilla)
+        self.juego.jugador.nombre = self.nombre
+        self.entradas = deque()
         self.corriendo = False
+        self.enviado = {'enemigos': {}, 'jugador': None, 'trampas': None, 'puntaje': None, 'energia': None}
+        self.partidas += 1
+
+    def mensaje_inicio(self):
+        # El mapa va una sola vez por partida; después solo viajan diferencias
+        juego = self.juego
+        return {'tipo': 'inicio', 'sala': self.nombre, 'semilla': juego.semilla, 'modo': juego.modo_actual,
+                'filas': juego.filas, 'columnas': juego.columnas, 'salida': list(juego.salida_pos),
+                'mapa': base64.b64encode(bytes(juego.mapa_logico.codigos)).decode('ascii')}
+
+    def mensaje_estado_completo(self):
+        # Para quien entra a mitad de partida: lo último enviado, sobre lo que se aplicarán las diferencias
+        mensaje = {'tipo': 'estado', 'tick': self.juego.ticks,
+                   'enemigos': {str(clave): list(pos) for clave, pos in self.enviado['enemigos'].items()}}
+        for clave in ('jugador', 'trampas', 'puntaje', 'energia'):
+            if self.enviado[clave] is not None:
+                mensaje[clave] = self.enviado[clave]
+        return mensaje
+
+    def encolar_entrada(self, dx, dy, correr, trampa):
+        self.entradas.append((dx, dy, correr, trampa))
+
+    def avanzar(self):
+        # Igual que en la interfaz, las entradas recibidas se aplican antes del tick siguiente
+        juego = self.juego
+        while self.entradas:
+            dx, dy, correr, trampa = self.entradas.popleft()
+            self.corriendo = correr
+            juego.aplicar_entrada(dx, dy, correr, trampa)
+        return juego.avanzar_tick(self.corriendo)
+
+    def delta(self):
+        """Enemigos que se movieron, aparecieron o desaparecieron, y los demás campos que cambiaron."""
+        juego, enviado = self.juego, self.enviado
+        mensaje = {}
+
+        enemigos = juego.posiciones_enemigos()
+        anteriores = enviado['enemigos']
+        movidos = {str(clave): list(pos) for clave, pos in enemigos.items() if anteriores.get(clave) != pos}
+        quitados = [str(clave) for clave in anteriores if clave not in enemigos]
+        if movidos:
+            mensaje['enemigos'] = movidos
+        if quitados:
+            mensaje['quitados'] = quitados
+        enviado['enemigos'] = enemigos
+
+        for clave, valor in (('jugador', [juego.jugador.x, juego.jugador.y]),
+                             ('trampas', sorted([trampa[0], trampa[1]] for trampa in juego.trampas_activas)),
+                             ('puntaje', int(juego.puntaje_manager.puntos_actuales)),
+                             ('energia', int(juego.jugador.energia))):
+            if enviado[clave] != valor:
+                mensaje[clave] = enviado[clave] = valor
+
+        if not mensaje:
+            return None
+        mensaje['tipo'] = 'estado'
+        mensaje['tick'] = juego.ticks
+        return mensaje
+
+
+class ServidorJuegos:
+    """
+    Servidor asyncio con muchas salas en un solo proceso. Un único bucle avanza todas las
+    salas TICKS_POR_SEGUNDO veces por segundo y cada TICKS_POR_ENVIO ticks manda a cada
+    cliente las diferencias de su sala. Protocolo: un objeto JSON por línea en ambos sentidos.
+    El primer cliente de una sala juega; los siguientes solo miran.
+    """
+    def __init__(self, host="127.0.0.1", puerto=PUERTO_SERVIDOR, ticks_por_envio=TICKS_POR_ENVIO, ventana=1000):
+        self.host = host
+        self.puerto = puerto
+        self.ticks_por_envio = ticks_por_envio
+        self.salas = {}
+        self.tick = 0
+        self.ticks_descartados = 0
+        self.bytes_enviados = 0
+        self.duraciones = deque(maxlen=ventana)
+        self.retrasos = deque(maxlen=ventana)
+        self.servidor = None
+        self.tarea_ticks = None
+
+    async def iniciar(self):
+        self.servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        # Con puerto 0 el sistema elige uno libre
+        self.puerto = self.servidor.sockets[0].getsockname()[1]
+        self.tarea_ticks = asyncio.create_task(self._bucle_ticks())
+
+    async def detener(self):
+        self.tarea_ticks.cancel()
+        try:
+            await self.tarea_ticks
+        except asyncio.CancelledError:
+            pass
+        # Última tanda de diferencias, para que los clientes terminen con el estado final
+        for sala in self.salas.values():
+            mensaje = sala.delta()
+            if mensaje:
+                self._difundir(sala, mensaje)
+            for cliente in sala.clientes:
+                cliente.close()
+        self.servidor.close()
+        await self.servidor.wait_closed()
+
+    def _codificar(self, mensaje):
+        return (json.dumps(mensaje, separators=(',', ':')) + "\n").encode('utf-8')
+
+    def _enviar_bytes(self, cliente, datos):
+        if cliente.is_closing():
+            return
+        # Un cliente que no lee se perdería diferencias: se lo desconecta en vez de acumular
+        if cliente.transport.get_write_buffer_size() > LIMITE_BUFFER_CLIENTE:
+            cliente.close()
+            return
+        cliente.write(datos)
+        self.bytes_enviados += len(datos)
+
+    def _enviar(self, cliente, mensaje):
+        self._enviar_bytes(cliente, self._codificar(mensaje))
+
+    def _difundir(self, sala, mensaje):
+        datos = self._codificar(mensaje)
+        for cliente in sala.clientes:
+            self._enviar_bytes(cliente, datos)
+
+    async def _atender(self, lector, cliente):
+        sala = None
+        try:
+            while True:
+                # Un mensaje que no se puede procesar se contesta con un error y no corta la conexión
+                try:
+                    linea = await self._leer_linea(lector)
+                    if not linea:
+                        break
+                    sala = self._procesar(cliente, sala, linea)
+                except (ValueError, TypeError) as error:
+                    self._enviar(cliente, {'tipo': 'error', 'mensaje': str(error)})
+        except ConnectionError:
+            pass
+        finally:
+            if sala is not None:
+                sala.clientes.remove(cliente)
+                if not sala.clientes and self.salas.get(sala.nombre) is sala:
+                    del self.salas[sala.nombre]
+            cliente.close()
+
+    async def _leer_linea(self, lector):
+        # Como readline, pero una línea más larga que el límite del lector se descarta
+        # entera y se informa con ValueError
+        demasiado_larga = False
+        while True:
+            try:
+                linea = await lector.readuntil(b"\n")
+            except asyncio.IncompleteReadError as error:
+                return error.partial
+            except asyncio.LimitOverrunError as error:
+                await lector.readexactly(error.consumed)
+                demasiado_larga = True
+                continue
+            if demasiado_larga:
+                raise ValueError("Línea demasiado larga")
+            return linea
+
+    def _procesar(self, cliente, sala, linea):
+        # Devuelve la sala del cliente, que cambia al unirse
+        try:
+            mensaje = json.loads(linea)
+        except ValueError:
+            raise ValueError("JSON inválido") from None
+        tipo = mensaje.get('tipo') if isinstance(mensaje, dict) else None
+
+        if tipo == 'unirse' and sala is None:
+            return self._unirse(cliente, mensaje)
+        if tipo == 'entrada' and sala is not None:
+            entrada = self._leer_entrada(mensaje)
+            if entrada is None:
+                raise ValueError("Entrada inválida")
+            if sala.clientes and sala.clientes[0] is cliente:
+                sala.encolar_entrada(*entrada)
+            return sala
+        raise ValueError(f"Mensaje inesperado: {tipo}")
+
+    def _unirse(self, cliente, mensaje):
+        nombre = str(mensaje.get('sala', "sala"))
+        sala = self.salas.get(nombre)
+        if sala is None:
+            modo = mensaje.get('modo', 'escapa')
+            dificultad = mensaje.get('dificultad', 'Normal')
+            filas = mensaje.get('filas', 15)
+            columnas = mensaje.get('columnas', 15)
+            semilla = mensaje.get('semilla')
+            if modo not in ('escapa', 'cazador') or dificultad not in ('Facil', 'Normal', 'Dificil') or \
+                    not all(type(n) is int and 2 <= n <= TAMANO_MAXIMO_SALA for n in (filas, columnas)) or \
+                    (semilla is not None and type(semilla) is not int):
+                raise ValueError("Sala inválida")
+            # Un mapa sin celdas de aparición también llega como ValueError, con su motivo
+            sala = SalaJuego(nombre, modo, dificultad, filas, columnas, semilla)
+            self.salas[nombre] = sala
+
+        sala.clientes.append(cliente)
+        self._enviar(cliente, sala.mensaje_inicio())
+        self._enviar(cliente, sala.mensaje_estado_completo())
+        return sala
+
+    def _leer_entrada(self, mensaje):
+        # Los mismos movimientos que Interfaz.manejar_tecla, más correr y poner trampa
+        dx, dy = mensaje.get('dx', 0), mensaje.get('dy', 0)
+        if type(dx) is not int or type(dy) is not int or ((dx or dy) and (dx, dy) not in MOVIMIENTOS):
+            return None
+        return dx, dy, bool(mensaje.get('correr', False)), bool(mensaje.get('trampa', False))
+
+    async def _bucle_ticks(self):
+        # Paso fijo como en la interfaz: si el atraso pasa de MAX_TICKS_POR_FRAME se descarta
+        bucle = asyncio.get_running_loop()
+        paso = 1 / TICKS_POR_SEGUNDO
+        siguiente = bucle.time()
+        while True:
+            espera = siguiente - bucle.time()
+            # Aun sin espera se cede el control para atender la red
+            await asyncio.sleep(max(0.0, espera))
+            # El retraso es cuánto tarde se despertó el tick, sin contar lo que dura avanzarlo
+            self.retrasos.append(max(0.0, bucle.time() - siguiente))
+
+            inicio = time.perf_counter()
+            self.avanzar_salas()
+            self.duraciones.append(time.perf_counter() - inicio)
+
+            siguiente += paso
+            atraso = bucle.time() - siguiente
+            if atraso > MAX_TICKS_POR_FRAME * paso:
+                self.ticks_descartados += int(atraso / paso)
+                siguiente = bucle.time()
+
+    def avanzar_salas(self):
+        self.tick += 1
+        enviar = self.tick % self.ticks_por_envio == 0
+        for sala in list(self.salas.values()):
+            resultado = sala.avanzar()
+            if resultado is not None:
+                # Fin de partida: estado final, resumen y una partida nueva en la misma sala
+                mensaje = sala.delta()
+                if mensaje:
+                    self._difundir(sala, mensaje)
+                self._difundir(sala, dict(sala.juego.resumen(resultado), tipo='fin'))
+                try:
+                    sala.reiniciar()
+                except ValueError as error:
+                    # El mapa nuevo no admite la partida: se avisa y la sala se cierra
+                    self._difundir(sala, {'tipo': 'error', 'mensaje': str(error)})
+                    del self.salas[sala.nombre]
+                    for cliente in sala.clientes:
+                        cliente.close()
+                    continue
+                self._difundir(sala, sala.mensaje_inicio())
+            elif enviar:
+                mensaje = sala.delta()
+                if mensaje:
+                    self._difundir(sala, mensaje)
+
+    def informe(self):
+        duraciones = sorted(self.duraciones)
+        retrasos = sorted(self.retrasos)
+        media = sum(duraciones) / len(duraciones) if duraciones else 0
+        return {
+            'salas': len(self.salas),
+            'ticks': self.tick,
+            'ticks_descartados': self.ticks_descartados,
+            'duracion_p50': percentil(duraciones, 0.5),
+            'duracion_p99': percentil(duraciones, 0.99),
+            'retraso_p50': percentil(retrasos, 0.5),
+            'retraso_p99': percentil(retrasos, 0.99),
+            # Cuántas salas como estas entran en el presupuesto de un tick de un núcleo
+            'salas_por_nucleo': len(self.salas) / (media * TICKS_POR_SEGUNDO) if media else 0,
+            'bytes_enviados': self.bytes_enviados,
+        }
 
-    def iniciar_juego(self, nombre, modo, dificultad):
-        self.juego = Juego(15, 15, modo, dificultad)
-        self.juego.jugador.nombre = nombre
-        self.juego.puntaje_manager = self.puntaje_manager_global
-        self.crear_widgets()
-        self.actualizar_juego()
-
-    def crear_widgets(self):
-        for widget in self.winfo_children():
-            widget.destroy()
-
-        self.canvas_mapa = tk.Canvas(self, width=self.juego.columnas * CELDA_TAMANO,
-                                     height=self.juego.filas * CELDA_TAMANO, bg=COLOR_FONDO)
-        self.canvas_mapa.pack(pady=10)
-
-        info_frame = tk.Frame(self)
-        info_frame.pack(pady=5)
-
-        tk.Label(info_frame, text=f"Modo: {self.juego.modo_actual.capitalize()} | Dificultad: {self.juego.dificultad}", font=('Arial', 10, 'bold')).pack(side=tk.LEFT, padx=10)
 
-        self.label_energia = tk.Label(info_frame, text=f"Energía: {self.juego.jugador.energia:.1f}%")
-        self.label_energia.pack(side=tk.LEFT, padx=10)
+class ClientePrueba:
+    """
+    Cliente de bucle local para probar el servidor: juega con entradas al azar y rearma
+    el estado de su sala aplicando las diferencias que recibe.
+    """
+    def __init__(self, sala, modo='escapa', dificultad='Normal', filas=15, columnas=15, semilla=None, rng=None):
+        self.union = {'tipo': 'unirse', 'sala': sala, 'modo': modo, 'dificultad': dificultad,
+                      'filas': filas, 'columnas': columnas, 'semilla': semilla}
+        self.rng = rng or random.Random()
+        self.estado = {}
+        self.mapa = None
+        self.resultados = []
+        self.errores = []
+        self.mensajes = 0
+        self.bytes_recibidos = 0
+
+    async def conectar(self, host, puerto):
+        self.lector, self.escritor = await asyncio.open_connection(host, puerto)
+        self._mandar(self.union)
+
+    def _mandar(self, mensaje):
+        self.escritor.write((json.dumps(mensaje) + "\n").encode('utf-8'))
+
+    def aplicar(self, mensaje):
+        tipo = mensaje['tipo']
+        if tipo == 'inicio':
+            self.mapa = base64.b64decode(mensaje['mapa'])
+            self.estado = {'enemigos': {}}
+        elif tipo == 'estado':
+            enemigos = self.estado['enemigos']
+            enemigos.update(mensaje.get('enemigos', {}))
+            for clave in mensaje.get('quitados', ()):
+                del enemigos[clave]
+            for clave in ('jugador', 'trampas', 'puntaje', 'energia'):
+                if clave in mensaje:
+                    self.estado[clave] = mensaje[clave]
+        elif tipo == 'fin':
+            self.resultados.append(mensaje['resultado'])
+        elif tipo == 'error':
+            self.errores.append(mensaje['mensaje'])
+
+    async def escuchar(self):
+        async for linea in self.lector:
+            self.mensajes += 1
+            self.bytes_recibidos += len(linea)
+            self.aplicar(json.loads(linea))
+
+    async def jugar(self, duracion, ticks_por_entrada=8):
+        bucle = asyncio.get_running_loop()
+        fin = bucle.time() + duracion
+        while bucle.time() < fin:
+            dx, dy = self.rng.choice(MOVIMIENTOS)
+            self._mandar({'tipo': 'entrada', 'dx': dx, 'dy': dy,
+                          'correr': self.rng.random() < 0.2, 'trampa': self.rng.random() < 0.05})
+            await self.escritor.drain()
+            await asyncio.sleep(ticks_por_entrada / TICKS_POR_SEGUNDO)
+
+    def coincide_con(self, sala):
+        # El estado rearmado debe ser exactamente lo último que mandó el servidor
+        esperado = {'enemigos': {str(clave): list(pos) for clave, pos in sala.enviado['enemigos'].items()}}
+        esperado.update((clave, valor) for clave, valor in sala.enviado.items()
+                        if clave != 'enemigos' and valor is not None)
+        return self.estado == esperado and self.mapa == bytes(sala.juego.mapa_logico.codigos)
+
+
+async def prueba_carga(cantidad_salas, duracion, modo='escapa', dificultad='Normal', filas=15, columnas=15):
+    """Servidor y clientes en este mismo proceso, sobre 127.0.0.1; devuelve el informe del servidor."""
+    servidor = ServidorJuegos(puerto=0)
+    await servidor.iniciar()
+    clientes = [ClientePrueba(f"sala_{i}", modo, dificultad, filas, columnas, semilla=i, rng=random.Random(i))
+                for i in range(cantidad_salas)]
+    for cliente in clientes:
+        await cliente.conectar(servidor.host, servidor.puerto)
+    escuchas = [asyncio.create_task(cliente.escuchar()) for cliente in clientes]
+
+    await asyncio.gather(*(cliente.jugar(duracion) for cliente in clientes))
+    informe = servidor.informe()
+    salas = dict(servidor.salas)
+    await servidor.detener()
+    await asyncio.gather(*escuchas)
+
+    informe['coherentes'] = sum(cliente.coincide_con(salas[cliente.union['sala']]) for cliente in clientes)
+    informe['partidas'] = sum(len(cliente.resultados) for cliente in clientes)
+    informe['errores'] = sum(len(cliente.errores) for cliente in clientes)
+    informe['recibido_por_cliente'] = sum(cliente.bytes_recibidos for cliente in clientes) / cantidad_salas / duracion
+    return informe
+
+
+def ejecutar_prueba_servidor(args):
+    # La duración del tick la mide el servidor; los clientes del mismo proceso solo suman al retraso
+    for cantidad in args.salas:
+        informe = asyncio.run(prueba_carga(cantidad, args.duracion, args.modo, args.dificultad,
+                                           args.filas, args.columnas))
+        print(f"{cantidad} salas ({args.modo}, {args.dificultad}, {args.filas}x{args.columnas}), "
+              f"{informe['ticks']} ticks en {args.duracion:.0f}s")
+        print(f"  Tick (todas las salas) p50/p99: {informe['duracion_p50'] * 1000:.2f}/{informe['duracion_p99'] * 1000:.2f} ms")
+        print(f"  Retraso del tick p50/p99: {informe['retraso_p50'] * 1000:.2f}/{informe['retraso_p99'] * 1000:.2f} ms"
+              f"  | Ticks descartados: {informe['ticks_descartados']}")
+        print(f"  Salas por núcleo (estimado): {informe['salas_por_nucleo']:.0f}")
+        print(f"  Recibido por cliente: {informe['recibido_por_cliente'] / 1024:.1f} KB/s"
+              f"  | Partidas terminadas: {informe['partidas']}")
+        print(f"  Estados coherentes: {informe['coherentes']}/{cantidad}  | Errores: {informe['errores']}")
+
+
+def ejecutar_servidor(args):
+    async def principal():
+        servidor = ServidorJuegos(args.host, args.puerto)
+        await servidor.iniciar()
+        print(f"Servidor escuchando en {servidor.host}:{servidor.puerto}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await servidor.detener()
+
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        pass
+
+# BENCHMARKS
+
+RONDAS_BENCH = 3
+REPETICIONES_BENCH = 5
+# Por debajo del milisegundo unas pocas interrupciones del sistema ya mueven la medición,
+# así que esas métricas toleran el doble del umbral
+LIMITE_SUBMS = 1e-3
+FACTOR_UMBRAL_SUBMS = 2
+# El ruido medido sube el umbral de una métrica hasta este múltiplo, no más: una corrida
+# muy ruidosa no puede dejar pasar cualquier regresión
+FACTOR_DISPERSION_MAXIMA = 3
+
+
+def _medir(funcion, repeticiones):
+    # Mediana del tiempo de `repeticiones` llamadas; es más estable que la media
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2]
+
+
+def _mejor_de(medicion, rondas=RONDAS_BENCH):
+    # El mínimo entre rondas descarta las pausas del sistema, que solo pueden sumar tiempo
+    return min(medicion() for _ in range(rondas))
+
+
+def _pares_aleatorios(mapa_logico, mascara, cantidad, rng):
+    columnas = mapa_logico.columnas
+    transitables = [idx for idx in range(len(mascara)) if mascara[idx]]
+    return [(divmod(rng.choice(transitables), columnas), divmod(rng.choice(transitables), columnas))
+            for _ in range(cantidad)]
+
+
+def bench_generar_mapa(metricas, escala):
+    for tamano in (15, 60, 250):
+        semillas = range(max(3, (30 if tamano < 250 else 5) // escala))
+        tiempos, talladas = [], []
+        for semilla in semillas:
+            juego = Juego(tamano, tamano, 'escapa', 'Normal', semilla=semilla)
+
+            def generar():
+                juego.rng.seed(semilla)
+                inicio = time.perf_counter()
+                juego.generar_mapa()
+                return time.perf_counter() - inicio
+
+            tiempos.append(_mejor_de(generar))
+            talladas.append(juego.celdas_talladas)
+        tiempos.sort()
+        metricas[f'generar_mapa/{tamano}'] = tiempos[len(tiempos) // 2]
+        # Ya no hay reintentos: las celdas talladas miden cuánto hubo que corregir
+        metricas[f'generar_mapa/{tamano}/celdas_talladas'] = sum(talladas) / len(talladas)
+
+
+def bench_bfs(metricas, escala):
+    juego = Juego(120, 120, 'escapa', 'Normal', semilla=1)
+    rng = random.Random(1)
+    pares = _pares_aleatorios(juego.mapa_logico, juego.mapa_logico.mascara_enemigo, max(5, 40 // escala), rng)
+    enemigo = Enemigo(0, 0, 'escapa', 1)
+
+    def por_consulta(funcion):
+        return _mejor_de(lambda: _medir(lambda: [funcion(a, b) for a, b in pares], 3)) / len(pares)
+
+    metricas['bfs/enemigo_120'] = por_consulta(lambda a, b: enemigo._bfs(a, b, juego.mapa_logico))
+    metricas['bfs/validar_jugador_120'] = por_consulta(juego._validar_camino_bfs)
+    metricas['bfs/validar_enemigo_120'] = por_consulta(juego._validar_camino_enemigo_bfs)
+    # Distancia sobre el grafo jerárquico; la primera ronda además calcula los bloques
+    jerarquico = BuscadorJerarquico()
+    mapa, mascara = juego.mapa_logico, juego.mapa_logico.mascara_enemigo
+    metricas['bfs/hpa_120'] = por_consulta(
+        lambda a, b: jerarquico.distancia(mapa, mascara, mapa.indice(*a), mapa.indice(*b)))
+
+
+def bench_aparicion(metricas, escala):
+    # Mapa casi todo muro: el caso en el que antes se reintentaba sin fin
+    juego = Juego(250, 250, 'cazador', 'Normal', semilla=2)
+    rng = random.Random(2)
+    codigos = bytearray(Muro().simbolo if rng.random() < 0.95 else Camino().simbolo
+                        for _ in range(juego.filas * juego.columnas))
+    juego.mapa_logico = MapaTerreno(juego.filas, juego.columnas, codigos)
+    juego.mapa_logico[juego.salida_pos[0]][juego.salida_pos[1]] = Camino()
+
+    def construir():
+        inicio = time.perf_counter()
+        juego.aparicion = ServicioAparicion(juego.mapa_logico, juego.salida_pos, rng=juego.rng)
+        return time.perf_counter() - inicio
+
+    metricas['aparicion/construir_disperso_250'] = _mejor_de(construir)
+    llamadas = max(100, 2000 // escala)
+    metricas['aparicion/sortear_disperso_250'] = _mejor_de(
+        lambda: _medir(lambda: [juego._obtener_posicion_segura('escapa') for _ in range(llamadas)], 3)) / llamadas
+
+
+def bench_tick(metricas, escala):
+    for nombre, cantidad, enjambre in (('enemigos', 1, False), ('enemigos', 10, False),
+                                       ('enemigos', 100, False), ('enjambre', 300, True)):
+        def ronda():
+            # Misma semilla en cada ronda: las rondas repiten exactamente la misma partida
+            juego = Juego(60, 60, 'escapa', 'Normal', {'enemigos_escapa': 0, 'enjambre': enjambre}, semilla=3)
+            for _ in range(cantidad):
+                posicion = juego.aparicion.sortear('escapa', excluir=(0, 0))
+                juego._agregar_enemigo(posicion[0], posicion[1], 'escapa', juego.config['velocidad_escapa'])
+
+            tiempos = []
+            for _ in range(max(50, 300 // escala)):
+                inicio = time.perf_counter()
+                juego.actualizar_enemigos()
+                tiempos.append(time.perf_counter() - inicio)
+                juego.ticks += 1
+            tiempos.sort()
+            return tiempos[len(tiempos) // 2], percentil(tiempos, 0.99)
+
+        resultados = [ronda() for _ in range(RONDAS_BENCH)]
+        metricas[f'tick/{nombre}_{cantidad}'] = min(mediana for mediana, _ in resultados)
+        metricas[f'tick/{nombre}_{cantidad}/p99'] = min(p99 for _, p99 in resultados)
+
+
+def bench_puntajes(metricas, escala):
+    with tempfile.TemporaryDirectory() as carpeta:
+        for cantidad in (10_000, 100_000):
+            ruta = os.path.join(carpeta, f"bench_{cantidad}.db")
+            almacen = AlmacenPuntajes(ruta)
+            rng = random.Random(cantidad)
+            with almacen.conexion:
+                almacen.conexion.executemany(
+                    "INSERT INTO partidas (nombre, modo, dificultad, puntaje, fecha) VALUES (?, ?, ?, ?, ?)",
+                    ((f"J{i}", rng.choice(('escapa', 'cazador')), rng.choice(('Facil', 'Normal', 'Dificil')),
+                      rng.randrange(10000), f"2024-01-01 00:00:{i % 60:02d}") for i in range(cantidad // escala)))
+            almacen.cerrar()
+
+            manager = PuntajeManager(ruta)
+            inserciones = max(20, 200 // escala)
+            metricas[f'puntajes/insertar_{cantidad}'] = _mejor_de(lambda: _medir(
+                lambda: manager._registrar("Bench", 'escapa', 'Normal', rng.randrange(10000)), inserciones))
+            manager.almacen.cerrar()
+
+
+def bench_paquete(metricas, escala):
+    # Empezar una partida desde un paquete, a comparar con generar_mapa del mismo tamaño.
+    # El mmap sigue abierto mientras quedan vistas vivas; en Windows el archivo no se puede borrar.
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as carpeta:
+        ruta = os.path.join(carpeta, "bench.pack")
+        tamanos = (15, 60, 250)
+        construir_paquete(ruta, tamanos, 1, procesos=1)
+        paquete = PaqueteNiveles(ruta)
+
+        for i, tamano in enumerate(tamanos):
+            def abrir():
+                inicio = time.perf_counter()
+                Juego(0, 0, 'escapa', 'Normal', nivel=paquete.nivel(i))
+                return time.perf_counter() - inicio
+
+            metricas[f'paquete/abrir_{tamano}'] = _mejor_de(lambda: _medir(abrir, max(3, 20 // escala)))
+
+
+def bench_perseguir(metricas, escala):
+    # Persecución de un jugador que se mueve: árbol incremental contra los caminos guardados
+    for algoritmo in ('jps', 'incremental', 'campo'):
+        juego = Juego(120, 120, 'escapa', 'Normal', {'enemigos_escapa': 0, 'algoritmo_escapa': algoritmo}, semilla=5)
+        for _ in range(30):
+            posicion = juego.aparicion.sortear('escapa', excluir=(0, 0))
+            juego._agregar_enemigo(posicion[0], posicion[1], 'escapa', juego.config['velocidad_escapa'])
+        bot = BotJugador()
+
+        def ticks():
+            inicio = time.perf_counter()
+            for _ in range(max(50, 300 // escala)):
+                entrada = bot(juego)
+                if entrada:
+                    juego.aplicar_entrada(*entrada)
+                juego.avanzar_tick()
+            return (time.perf_counter() - inicio) / max(50, 300 // escala)
+
+        metricas[f'perseguir/{algoritmo}_120'] = ticks()
+
+
+def bench_terreno(metricas, escala):
+    # Abrir y cerrar celdas en plena partida: los índices se reparan sin recorrer el mapa
+    juego = Juego(250, 250, 'cazador', 'Normal', semilla=4)
+    rng = random.Random(4)
+    celdas = [(rng.randrange(juego.filas), rng.randrange(juego.columnas)) for _ in range(max(20, 200 // escala))]
+
+    def cambiar():
+        inicio = time.perf_counter()
+        for x, y in celdas:
+            original = juego.mapa_logico[x][y]
+            juego.cambiar_terreno(x, y, Camino() if isinstance(original, Muro) else Muro())
+            juego.cambiar_terreno(x, y, original)
+        return (time.perf_counter() - inicio) / (2 * len(celdas))
+
+    metricas['terreno/cambiar_250'] = _mejor_de(cambiar)
+
+
+BENCHMARKS = [bench_generar_mapa, bench_bfs, bench_aparicion, bench_tick, bench_puntajes, bench_paquete,
+              bench_perseguir, bench_terreno]
+
+
+def ejecutar_benchmarks(escala=1, repeticiones=REPETICIONES_BENCH):
+    """
+    Una pasada de calentamiento que se descarta y después `repeticiones` pasadas por
+    todos los benchmarks. Se repite la lista entera y no cada benchmark seguido, así las
+    muestras de una métrica quedan repartidas en toda la corrida y un rato lento de la
+    máquina no las toca a todas. Devuelve la mediana de cada métrica y su dispersión
+    ((máximo - mínimo) / mediana), que dice cuánto ruido tuvo esa medición.
+    """
+    muestras = {}
+    duraciones = dict.fromkeys((bench.__name__ for bench in BENCHMARKS), 0.0)
+    for repeticion in range(repeticiones + 1):
+        for bench in BENCHMARKS:
+            inicio = time.perf_counter()
+            metricas = {}
+            bench(metricas, escala)
+            duraciones[bench.__name__] += time.perf_counter() - inicio
+            if repeticion == 0:
+                continue
+            for nombre, valor in metricas.items():
+                muestras.setdefault(nombre, []).append(valor)
+    for nombre, duracion in duraciones.items():
+        print(f"  {nombre} ({duracion:.1f}s)")
+
+    metricas, dispersion = {}, {}
+    for nombre, valores in muestras.items():
+        valores.sort()
+        metricas[nombre] = percentil(valores, 0.5)
+        dispersion[nombre] = (valores[-1] - valores[0]) / metricas[nombre] if metricas[nombre] else 0.0
+    return metricas, dispersion
+
+
+def umbral_metrica(nombre, anterior, umbral, dispersion=0.0):
+    """
+    Umbral propio de cada métrica: el p99 sale de pocas muestras por ronda y se muestra
+    sin entrar en la comparación, lo que tarda menos de un milisegundo tolera más, y
+    ninguna métrica marca un cambio menor que el ruido que tuvieron sus repeticiones
+    (acotado a FACTOR_DISPERSION_MAXIMA veces su umbral).
+    """
+    if nombre.endswith('/p99'):
+        return None
+    if anterior < LIMITE_SUBMS:
+        umbral *= FACTOR_UMBRAL_SUBMS
+    return max(umbral, min(dispersion, umbral * FACTOR_DISPERSION_MAXIMA))
+
+
+def comparar_benchmarks(actuales, base, umbral, dispersion=None):
+    # Todas las métricas son "menos es mejor"; devuelve las que empeoraron más que su umbral.
+    # dispersion trae, por métrica, el mayor ruido de las dos corridas
+    dispersion = dispersion or {}
+    regresiones = []
+    for nombre, valor in sorted(actuales.items()):
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        cambio = (valor - anterior) / anterior if anterior else (0.0 if valor == anterior else float('inf'))
+        limite = umbral_metrica(nombre, anterior, umbral, dispersion.get(nombre, 0.0))
+        if limite is None:
+            marca = "(no cuenta)"
+        else:
+            marca = f"(umbral {limite:.0%}) " + ("REGRESIÓN" if cambio > limite else "")
+        print(f"  {nombre:<40} {anterior:12.6g} -> {valor:12.6g} ({cambio:+.1%}) {marca}")
+        if limite is not None and cambio > limite:
+            regresiones.append(nombre)
+    return regresiones
+
+
+def ejecutar_benchmarks_desde_args(args):
+    print("Ejecutando benchmarks...")
+    metricas, dispersion = ejecutar_benchmarks(args.bench_escala, args.bench_repeticiones)
+    for nombre, valor in sorted(metricas.items()):
+        print(f"  {nombre:<40} {valor:12.6g}")
+
+    with open(args.bench_salida, 'w', encoding='utf-8') as archivo:
+        json.dump({'fecha': time.strftime("%Y-%m-%d %H:%M:%S"), 'python': sys.version.split()[0],
+                   'escala': args.bench_escala, 'repeticiones': args.bench_repeticiones, 'metricas': metricas,
+                   'dispersion': dispersion}, archivo, indent=2, sort_keys=True)
+    print(f"Resultados guardados en {args.bench_salida}")
+
+    if not args.bench_comparar:
+        return True
+    with open(args.bench_comparar, encoding='utf-8') as archivo:
+        base = json.load(archivo)
+    print(f"Comparación con {args.bench_comparar} (umbral base {args.bench_umbral:.0%}):")
+    # Las corridas guardadas antes de medir la dispersión no la traen
+    ruido = {nombre: max(valor, base.get('dispersion', {}).get(nombre, 0.0)) for nombre, valor in dispersion.items()}
+    regresiones = comparar_benchmarks(metricas, base['metricas'], args.bench_umbral, ruido)
+    if regresiones:
+        print(f"{len(regresiones)} métricas empeoraron: {', '.join(regresiones)}")
+    return not regresiones
+
+# ENTRADA DE TECLADO
+
+# En minúsculas: con Shift o Bloq Mayús Tk manda 'W' en vez de 'w', y el soltar puede
+# llegar con otra mayúscula que el apretar (w, Shift, soltar W)
+TECLAS_MOVIMIENTO = {
+    'w': (-1, 0), 'up': (-1, 0),
+    's': (1, 0), 'down': (1, 0),
+    'a': (0, -1), 'left': (0, -1),
+    'd': (0, 1), 'right': (0, 1),
+}
+TECLAS_CORRER = ('shift_l', 'shift_r')
+TECLA_TRAMPA = 't'
+
+
+class EntradaTeclado:
+    """
+    Estado de las teclas mantenidas, leído una vez por tick con muestrear(). El ritmo lo
+    pone el juego y no la repetición automática del sistema: cada toque nuevo de una
+    dirección da un paso en el tick siguiente (hasta MAX_PASOS_EN_COLA en cola, uno por
+    tick) y mientras siga apretada se avanza cada ticks_por_paso ticks.
+    La repetición automática se filtra: un apretar de una tecla ya apretada se ignora y
+    los soltar se aplican recién al muestrear, así que el par soltar/apretar que manda X11
+    entre dos ticks no corta la tecla.
+    """
+    def __init__(self, ticks_por_paso=TICKS_POR_PASO_TECLADO, ventana=TICKS_POR_SEGUNDO * 5):
+        self.ticks_por_paso = ticks_por_paso
+        self.latencias = deque(maxlen=ventana)
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.apretadas = []
+        self.por_soltar = set()
+        self.pasos = deque()
+        self.trampa = False
+        self.ticks_sin_paso = 0
+        self.por_mostrar = []
+
+    def apretar(self, tecla, instante):
+        tecla = tecla.lower()
+        if tecla in self.por_soltar:
+            # Repetición automática de X11: el soltar anterior no era real
+            self.por_soltar.discard(tecla)
+            return
+        if tecla in self.apretadas:
+            return
+        self.apretadas.append(tecla)
+        if tecla in TECLAS_MOVIMIENTO and len(self.pasos) < MAX_PASOS_EN_COLA:
+            self.pasos.append((TECLAS_MOVIMIENTO[tecla], instante))
+        elif tecla == TECLA_TRAMPA:
+            self.trampa = True
+
+    def soltar(self, tecla):
+        tecla = tecla.lower()
+        if tecla in self.apretadas:
+            self.por_soltar.add(tecla)
+
+    def soltar_todo(self):
+        # Al perder el foco no llegan los soltar: se dan todas las teclas por soltadas
+        self.apretadas.clear()
+        self.por_soltar.clear()
+
+    @property
+    def corriendo(self):
+        return any(tecla in self.apretadas for tecla in TECLAS_CORRER)
+
+    def muestrear(self):
+        """
+        Devuelve (dx, dy, trampa, instante) para este tick; instante es el momento en que
+        se apretó la tecla del paso, o None si el paso viene de mantenerla.
+        """
+        for tecla in self.por_soltar:
+            self.apretadas.remove(tecla)
+        self.por_soltar.clear()
+
+        trampa, self.trampa = self.trampa, False
+        self.ticks_sin_paso += 1
+        if self.pasos:
+            (dx, dy), instante = self.pasos.popleft()
+            self.ticks_sin_paso = 0
+            return dx, dy, trampa, instante
+
+        # La dirección mantenida que cuenta es la última que se apretó
+        mantenida = next((tecla for tecla in reversed(self.apretadas) if tecla in TECLAS_MOVIMIENTO), None)
+        if mantenida is not None and self.ticks_sin_paso >= self.ticks_por_paso:
+            self.ticks_sin_paso = 0
+            dx, dy = TECLAS_MOVIMIENTO[mantenida]
+            return dx, dy, trampa, None
+        return 0, 0, trampa, None
+
+    def paso_aplicado(self, instante):
+        self.por_mostrar.append(instante)
+
+    def frame_mostrado(self, instante):
+        # Latencia de tecla a pantalla de cada paso que este frame muestra por primera vez
+        for inicio in self.por_mostrar:
+            self.latencias.append(instante - inicio)
+            if PERFILADOR.activo:
+                PERFILADOR.registrar_tramo('latencia_entrada', inicio, instante)
+        self.por_mostrar.clear()
+
+    def percentiles_latencia(self):
+        latencias = sorted(self.latencias)
+        return percentil(latencias, 0.5), percentil(latencias, 0.99)
 
-        self.label_puntaje = tk.Label(info_frame, text="Puntos: 0")
-        self.label_puntaje.pack(side=tk.LEFT, padx=10)
+# CLASE DE INTERFAZ Y REGISTRO
 
-        self.label_trampas = tk.Label(info_frame, text=f"Trampas: {len(self.juego.trampas_activas)}/3")
-        self.label_trampas.pack(side=tk.LEFT, padx=10)
+def cargar_interfaz():
+    """
+    Importa tkinter y define las ventanas recién cuando se abre la interfaz: la simulación
+    sin interfaz, el lote, el servidor y los benchmarks funcionan donde no hay Tk.
+    Devuelve el módulo tkinter y la clase Interfaz.
+    """
+    import tkinter as tk
+    from tkinter import messagebox
 
-        if self.juego.modo_actual == 'cazador':
-             button_text = "Guardar Puntaje y Salir"
-             button_bg = "#E74C3C"
-        else:
-             button_text = "Reiniciar (Menú Principal)"
-             button_bg = None
+    class RegistroVentana(tk.Toplevel):
+        def __init__(self, master, callback, puntaje_manager):
+            super().__init__(master)
+            self.title("Proyecto 2: Menú Principal")
+            self.geometry("400x440")
+            self.configure(bg=BG_PRIMARIO)
+            self.transient(master)
+            self.callback = callback
+            self.puntaje_manager = puntaje_manager
 
-        tk.Button(info_frame, text=button_text, command=self.reiniciar_juego, bg=button_bg).pack(side=tk.RIGHT, padx=10)
+            tk.Label(self, text="ESCAPA DEL LABERINTO", bg=BG_PRIMARIO, fg=FG_PRIMARIO,
+                     font=('Arial', 14, 'bold')).pack(pady=(15, 10))
 
-    def reiniciar_juego(self):
-        if self.juego and self.juego.modo_actual == 'cazador':
-            self.juego.puntaje_manager.log_cazador_final(self.juego.jugador.nombre, self.juego.dificultad)
+            tk.Label(self, text="Ingrese su nombre:", bg=BG_PRIMARIO, fg=COLOR_TEXTO,
+                     font=('Arial', 10)).pack()
+            self.entry_nombre = tk.Entry(self, font=('Arial', 12), justify='center')
+            self.entry_nombre.pack(pady=(5, 15), padx=40, fill='x')
 
-        self.juego = None
-        self.corriendo = False
-        RegistroVentana(self.master, self.iniciar_juego, self.puntaje_manager_global)
-
-    def dibujar_mapa(self):
-        if not self.juego or not self.canvas_mapa: return
-        self.canvas_mapa.delete("all")
-
-        for r in range(self.juego.filas):
-            for c in range(self.juego.columnas):
-                terreno = self.juego.mapa_logico[r][c]
-                x1, y1 = c * CELDA_TAMANO, r * CELDA_TAMANO
-                x2, y2 = x1 + CELDA_TAMANO, y1 + CELDA_TAMANO
-                color = COLORES_TERRENO.get(terreno.simbolo, "gray")
-                self.canvas_mapa.create_rectangle(x1, y1, x2, y2, fill=color, outline="#ccc")
-
-                if (r, c) == self.juego.salida_pos:
-                    self.canvas_mapa.create_text(x1 + CELDA_TAMANO/2, y1 + CELDA_TAMANO/2, text="FIN", font=('Arial', 10, 'bold'))
-
-        for trampa in self.juego.trampas_activas:
-            tx, ty, _ = trampa
-            cx = ty * CELDA_TAMANO + CELDA_TAMANO // 2
-            cy = tx * CELDA_TAMANO + CELDA_TAMANO // 2
-            self.canvas_mapa.create_oval(cx - 5, cy - 5, cx + 5, cy + 5, fill="orange", tags="trampa")
-
-        self._dibujar_entidad(self.juego.jugador.x, self.juego.jugador.y, "red", "jugador")
-        for enemigo in self.juego.enemigos:
-            self._dibujar_entidad(enemigo.x, enemigo.y, "yellow", "enemigo", is_rect=True)
-
-    def _dibujar_entidad(self, r, c, color, tag, is_rect=False):
-        cx = c * CELDA_TAMANO + CELDA_TAMANO // 2
-        cy = r * CELDA_TAMANO + CELDA_TAMANO // 2
-
-        border_color = "red"
-        if tag == "jugador" and self.corriendo:
-            border_color = "darkorange"
-
-        if is_rect:
-            self.canvas_mapa.create_rectangle(cx - 8, cy - 8, cx + 8, cy + 8, fill=color, tags=tag, outline="black")
-        else:
-            self.canvas_mapa.create_oval(cx - 10, cy - 10, cx + 10, cy + 10, fill=color, tags=tag, outline=border_color, width=2)
+            tk.Label(self, text="Seleccione Dificultad:", bg=BG_PRIMARIO, fg=COLOR_TEXTO,
+                     font=('Arial', 10)).pack()
 
+            self.opciones_dificultad = ['Facil', 'Normal', 'Dificil']
+            self.dificultad_var = tk.StringVar(self)
+            self.dificultad_var.set('Normal')
 
-    def manejar_tecla(self, event):
-        if not self.juego: return
+            self.menu_dificultad = tk.OptionMenu(self, self.dificultad_var, *self.opciones_dificultad)
+            self.menu_dificultad.config(bg=BG_PRIMARIO, fg=FG_PRIMARIO, font=('Arial', 10), width=10)
+            self.menu_dificultad['menu'].config(bg=BG_PRIMARIO, fg='black', font=('Arial', 10))
+            self.menu_dificultad.pack(pady=(5, 15))
 
-        dx, dy = 0, 0
-        es_correr = self.corriendo
+            tk.Label(self, text="Tamaño del Mapa:", bg=BG_PRIMARIO, fg=COLOR_TEXTO,
+                     font=('Arial', 10)).pack()
 
-        if event.keysym in ['w', 'Up']: dx = -1; dy = 0
-        elif event.keysym in ['s', 'Down']: dx = 1; dy = 0
-        elif event.keysym in ['a', 'Left']: dx = 0; dy = -1
-        elif event.keysym in ['d', 'Right']: dx = 0; dy = 1
+            self.tamano_var = tk.StringVar(self)
+            self.tamano_var.set(str(TAMANOS_MAPA[0]))
 
-        if event.keysym == 't' and self.juego.modo_actual == 'escapa':
-            self.colocar_trampa_handler()
+            self.menu_tamano = tk.OptionMenu(self, self.tamano_var, *[str(t) for t in TAMANOS_MAPA])
+            self.menu_tamano.config(bg=BG_PRIMARIO, fg=FG_PRIMARIO, font=('Arial', 10), width=10)
+            self.menu_tamano['menu'].config(bg=BG_PRIMARIO, fg='black', font=('Arial', 10))
+            self.menu_tamano.pack(pady=(5, 15))
 
-        if dx != 0 or dy != 0:
-            self.juego.jugador.mover(dx, dy, self.juego.mapa_logico, es_correr)
-
-    def colocar_trampa_handler(self):
-        if len(self.juego.trampas_activas) < 3:
-            resultado_trampa = self.juego.jugador.colocar_trampa()
-            if resultado_trampa:
-                self.juego.trampas_activas.append(resultado_trampa)
-                self.juego.jugador.trampas_disponibles = 3 - len(self.juego.trampas_activas)
-            else:
-                tiempo_restante = max(0, self.juego.jugador.trampa_cooldown_fin - time.time())
-                if tiempo_restante > 0:
-                    print(f"Trampa en cooldown. Espera {tiempo_restante:.1f}s")
-                else:
-                      print("Límite de 3 trampas activas alcanzado.")
+            boton_kwargs = {'bg': ACCENT_BOTON_START, 'fg': FG_PRIMARIO, 'font': ('Arial', 10, 'bold'), 'relief': 'flat', 'width': 30}
 
-        else:
-            print("Límite de 3 trampas activas alcanzado.")
+            tk.Button(self, text="Comenzar Modo Escapa",
+                      command=self._iniciar_escapa, **boton_kwargs).pack(pady=3)
 
-    def actualizar_info(self):
-        if not self.juego: return
+            tk.Button(self, text="Comenzar Modo Cazador",
+                      command=self._iniciar_cazador, **boton_kwargs).pack(pady=3)
 
-        cooldown_restante = max(0, self.juego.jugador.trampa_cooldown_fin - time.time())
-        cooldown_str = f" ({cooldown_restante:.1f}s)" if cooldown_restante > 0 else ""
+            info_frame = tk.Frame(self, bg=BG_PRIMARIO)
+            info_frame.pack(pady=(15, 5))
 
-        self.label_energia.config(text=f"Energía: {self.juego.jugador.energia:.1f}%")
-        self.label_puntaje.config(text=f"Puntos: {self.juego.puntaje_manager.puntos_actuales}")
-        self.label_trampas.config(text=f"Trampas: {len(self.juego.trampas_activas)}/3{cooldown_str}")
+            tk.Button(info_frame, text="Instrucciones", command=self.mostrar_instrucciones,
+                      bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, font=('Arial', 10), relief='flat').pack(side=tk.LEFT, padx=3)
 
-    def mostrar_final(self, resultado):
-        if resultado == "VICTORIA":
-            puntaje = self.juego.puntaje_manager.top_escapa[0]['puntaje'] if self.juego.puntaje_manager.top_escapa else 'N/A'
-            mensaje = f"¡VICTORIA! Has escapado en dificultad {self.juego.dificultad}.\nTu puntaje final es: {puntaje}"
-        elif resultado == "DERROTA_ATRAPADO":
-              mensaje = "¡DERROTA! Has sido atrapado por un cazador."
-        else:
-            return
+            tk.Button(info_frame, text="Ver Top Escapa", command=self._mostrar_top_escapa,
+                      bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, font=('Arial', 10), relief='flat').pack(side=tk.LEFT, padx=3)
 
-        messagebox.showinfo(resultado, mensaje)
-        self.reiniciar_juego()
+            tk.Button(info_frame, text="Ver Top Cazador", command=self._mostrar_top_cazador,
+                      bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, font=('Arial', 10), relief='flat').pack(side=tk.LEFT, padx=3)
 
-    def actualizar_juego(self):
-        if not self.juego:
-            self.master.after(int(1000/FPS), self.actualizar_juego)
-            return
+            tk.Button(info_frame, text="Ver Historial", command=self.mostrar_historial,
+                      bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, font=('Arial', 10), relief='flat').pack(side=tk.LEFT, padx=3)
 
-        self.juego.jugador.regenerar_energia(self.corriendo)
+        def _iniciar_escapa(self):
+            self.iniciar_juego('escapa')
 
-        resultado = self.juego.actualizar_enemigos()
+        def _iniciar_cazador(self):
+            self.iniciar_juego('cazador')
 
-        if resultado:
-            self.mostrar_final(resultado)
-            return
+        def _mostrar_top_escapa(self):
+            self.mostrar_top('escapa')
 
-        self.actualizar_info()
-        self.dibujar_mapa()
+        def _mostrar_top_cazador(self):
+            self.mostrar_top('cazador')
 
-        self.master.after(int(1000/FPS), self.actualizar_juego)
+        def iniciar_juego(self, modo):
+            nombre = self.entry_nombre.get()
+            dificultad = self.dificultad_var.get()
+            tamano = int(self.tamano_var.get())
+            if nombre:
+                self.callback(nombre, modo, dificultad, tamano)
+                self.destroy()
+            else:
+                messagebox.showerror("Error", "El registro es obligatorio antes de comenzar.")
+
+        def mostrar_top(self, modo):
+            texto = self.puntaje_manager.mostrar_top(modo)
+            messagebox.showinfo(f"Top {self.puntaje_manager.clasificacion.k} Puntajes", texto)
+
+        def mostrar_historial(self):
+            HistorialVentana(self, self.puntaje_manager)
+
+
+        def mostrar_instrucciones(self):
+            instrucciones = (
+                "Instrucciones del Juego\n\n"
+                "Dificultades (Afecta Velocidad, #Enemigos y Puntos):\n"
+                "  • Fácil: Velocidad Lenta / 1 Cazador (Escapa) / Multiplicador x1.0\n"
+                "  • Normal: Velocidad Media / 2 Cazadores (Escapa) / Multiplicador x1.5\n"
+                "  • Difícil: Velocidad Rápida / 3 Cazadores (Escapa) / Multiplicador x2.0\n\n"
+                "Modo 1: Escapa\n"
+                "  • IA Mejorada: Los enemigos te persiguen con Jump Point Search (A* que salta los pasillos rectos)\n"
+                "    y solo recalculan el camino cuando te alejas del punto planificado.\n"
+                "  • Objetivo: Llegar a la salida (bandera FIN).\n"
+                "  • Trampas (T): Máx. 3 activas (cooldown de 5s). Matan al cazador.\n\n"
+                "Modo 2: Cazador\n"
+                f"  • Restricción de Aparición: El cazador reaparece a una distancia mínima de {DISTANCIA_MINIMA_SALIDA} pasos de la salida.\n"
+                "  • IA Mejorada: Los enemigos huyen a la salida siguiendo un mapa de distancias (BFS desde la salida)\n"
+                "    que se calcula una sola vez por mapa.\n"
+                "  • Objetivo: Atrapar al cazador antes de que escape.\n"
+                "  • Atrapado: El enemigo desaparece y reaparece en una zona segura (lejos de la salida)."
+            )
+            messagebox.showinfo("Instrucciones", instrucciones)
+
+
+    class HistorialVentana(tk.Toplevel):
+        """
+        Historial con scroll virtual: solo existen FILAS_VISIBLES etiquetas y al desplazarse
+        se pide a la base de datos la página que corresponde a esa posición. La posición y
+        su cursor los lleva un PaginadorHistorial.
+        """
+        FILAS_VISIBLES = 15
+        TODOS = "Todos"
+
+        def __init__(self, master, puntaje_manager):
+            super().__init__(master)
+            self.title("Historial de Partidas")
+            self.configure(bg=BG_PRIMARIO)
+            self.puntaje_manager = puntaje_manager
+            self.paginador = PaginadorHistorial(puntaje_manager, self.FILAS_VISIBLES)
+
+            filtros_frame = tk.Frame(self, bg=BG_PRIMARIO)
+            filtros_frame.pack(pady=(10, 5), padx=10, fill='x')
+
+            self.modo_var = tk.StringVar(self, self.TODOS)
+            tk.OptionMenu(filtros_frame, self.modo_var, self.TODOS, 'escapa', 'cazador').pack(side=tk.LEFT, padx=3)
+
+            self.dificultad_var = tk.StringVar(self, self.TODOS)
+            tk.OptionMenu(filtros_frame, self.dificultad_var, self.TODOS, 'Facil', 'Normal', 'Dificil').pack(side=tk.LEFT, padx=3)
+
+            tk.Label(filtros_frame, text="Jugador:", bg=BG_PRIMARIO, fg=COLOR_TEXTO).pack(side=tk.LEFT, padx=(10, 3))
+            self.entry_nombre = tk.Entry(filtros_frame, width=15)
+            self.entry_nombre.pack(side=tk.LEFT)
+
+            tk.Button(filtros_frame, text="Filtrar", command=self.aplicar_filtros,
+                      bg=ACCENT_BOTON_INFO, fg=FG_PRIMARIO, relief='flat').pack(side=tk.LEFT, padx=5)
+
+            lista_frame = tk.Frame(self, bg=BG_PRIMARIO)
+            lista_frame.pack(padx=10, pady=(0, 5), fill='both', expand=True)
+
+            self.barra = tk.Scrollbar(lista_frame, orient=tk.VERTICAL, command=self.desplazar)
+            self.barra.pack(side=tk.RIGHT, fill='y')
+
+            self.etiquetas = []
+            for _ in range(self.FILAS_VISIBLES):
+                etiqueta = tk.Label(lista_frame, text="", anchor='w', width=70, bg=BG_PRIMARIO, fg=COLOR_TEXTO,
+                                    font=('Courier', 9))
+                etiqueta.pack(fill='x')
+                self.etiquetas.append(etiqueta)
+
+            self.label_total = tk.Label(self, text="", bg=BG_PRIMARIO, fg=COLOR_TEXTO)
+            self.label_total.pack(pady=(0, 10))
+
+            # El Toplevel está en los bindtags de sus hijos, así que la rueda funciona sobre las filas
+            self.bind('<MouseWheel>', self.rueda)
+            self.bind('<Button-4>', lambda e: self.mover(-3))
+            self.bind('<Button-5>', lambda e: self.mover(3))
+            self.aplicar_filtros()
+
+        def aplicar_filtros(self):
+            modo = self.modo_var.get()
+            dificultad = self.dificultad_var.get()
+            self.paginador.filtrar(None if modo == self.TODOS else modo,
+                                   None if dificultad == self.TODOS else dificultad,
+                                   self.entry_nombre.get().strip() or None)
+            self.label_total.config(text=f"{self.paginador.total} partidas")
+            self.refrescar()
+
+        def refrescar(self):
+            pagina = self.paginador.pagina()
+            for i, etiqueta in enumerate(self.etiquetas):
+                etiqueta.config(text=self.puntaje_manager.formatear_registro(pagina[i]) if i < len(pagina) else "")
+
+            inicio, total = self.paginador.inicio, self.paginador.total
+            if total:
+                self.barra.set(inicio / total, min(1.0, (inicio + self.FILAS_VISIBLES) / total))
+            else:
+                self.barra.set(0.0, 1.0)
+
+        def mover(self, filas):
+            if self.paginador.mover(filas):
+                self.refrescar()
+
+        def desplazar(self, accion, cantidad, unidad=None):
+            if accion == 'moveto':
+                self.mover(int(float(cantidad) * self.paginador.total) - self.paginador.inicio)
+            elif accion == 'scroll':
+                paso = self.FILAS_VISIBLES if unidad == 'pages' else 1
+                self.mover(int(cantidad) * paso)
+
+        def rueda(self, event):
+            self.mover(-3 if event.delta > 0 else 3)
+
+
+    class Interfaz(tk.Frame):
+        def __init__(self, master, ruta_traza=None):
+            super().__init__(master)
+
+            self.master = master
+            self.juego = None
+            self.pack()
+            self.master.title("Proyecto 2: Escapa del Laberinto")
+            self.puntaje_manager_global = PuntajeManager(RUTA_PUNTAJES)
+            self.canvas_mapa = None
+            self.version_escena = None
+            self.items_creados = 0
+
+            self.corriendo = False
+            self.entrada = EntradaTeclado()
+            self.id_bucle = None
+            self.retrasos = deque(maxlen=TICKS_POR_SEGUNDO * 5)
+            self.frames_omitidos = 0
+
+            # F3 muestra los tiempos por etapa; con ruta_traza se guarda una traza al cerrar
+            PERFILADOR.activar(grabar_traza=ruta_traza is not None)
+            self.ruta_traza = ruta_traza
+            self.mostrar_perfil = False
+            self.label_perfil = None
+            self.frames_perfil = 0
+            self.master.protocol("WM_DELETE_WINDOW", self.cerrar)
+
+            # Las teclas solo se anotan; la simulación las lee una vez por tick
+            self.master.bind('<F3>', self.alternar_perfil)
+            self.master.bind('<KeyPress>', self.manejar_tecla)
+            self.master.bind('<KeyRelease>', self.soltar_tecla)
+            self.master.bind('<FocusOut>', lambda event: self.entrada.soltar_todo())
+
+            RegistroVentana(master, self.iniciar_juego, self.puntaje_manager_global)
+
+        def alternar_perfil(self, event=None):
+            self.mostrar_perfil = not self.mostrar_perfil
+            if self.label_perfil is None:
+                return
+            if self.mostrar_perfil:
+                self.label_perfil.place(in_=self.canvas_mapa, x=4, y=4)
+                self.label_perfil.lift()
+            else:
+                self.label_perfil.place_forget()
+
+        def actualizar_perfil(self):
+            # Unas pocas veces por segundo alcanza para leer los percentiles
+            self.frames_perfil += 1
+            if not self.mostrar_perfil or self.label_perfil is None or self.frames_perfil % 15:
+                return
+            self.label_perfil.config(text=PERFILADOR.texto_resumen())
+
+        def cerrar(self):
+            if self.ruta_traza:
+                print(f"Traza guardada en {PERFILADOR.exportar_traza(self.ruta_traza)}")
+            self.master.destroy()
+
+        def iniciar_juego(self, nombre, modo, dificultad, tamano=15):
+            # Un mapa de cientos de celdas tarda hasta un segundo en generarse: se arma en otro
+            # hilo y mientras tanto la ventana sigue respondiendo y muestra cuánto lleva.
+            # El hilo no toca Tk ni la base de puntajes; Juego solo guarda el manager
+            for widget in self.winfo_children():
+                widget.destroy()
+            self.canvas_mapa = None
+            self.label_perfil = None
+            etiqueta = tk.Label(self, text="", font=('Arial', 12), padx=40, pady=40)
+            etiqueta.pack()
+            resultado = {}
+            inicio = time.perf_counter()
+
+            def generar():
+                try:
+                    resultado['juego'] = Juego(tamano, tamano, modo, dificultad,
+                                               puntaje_manager=self.puntaje_manager_global)
+                except ValueError as error:
+                    resultado['error'] = error
+
+            def esperar():
+                if hilo.is_alive():
+                    etiqueta.config(text=f"Generando mapa de {tamano}x{tamano}... "
+                                         f"{time.perf_counter() - inicio:.1f} s")
+                    self.master.after(100, esperar)
+                    return
+                etiqueta.destroy()
+                if 'juego' not in resultado:
+                    messagebox.showerror("Error", f"No se pudo crear la partida: {resultado.get('error')}")
+                    RegistroVentana(self.master, self.iniciar_juego, self.puntaje_manager_global)
+                    return
+                self.juego = resultado['juego']
+                self.juego.jugador.nombre = nombre
+                self.puntaje_manager_global.empezar_partida()
+                self.crear_widgets()
+                self.iniciar_bucle()
+
+            hilo = threading.Thread(target=generar, daemon=True)
+            hilo.start()
+            esperar()
+
+        def crear_widgets(self):
+            for widget in self.winfo_children():
+                widget.destroy()
+
+            self.canvas_mapa = tk.Canvas(self, width=min(self.juego.columnas, VISTA_CELDAS) * CELDA_TAMANO,
+                                         height=min(self.juego.filas, VISTA_CELDAS) * CELDA_TAMANO, bg=COLOR_FONDO)
+            self.canvas_mapa.pack(pady=10)
+            self.version_escena = None
+
+            info_frame = tk.Frame(self)
+            info_frame.pack(pady=5)
+
+            tk.Label(info_frame, text=f"Modo: {self.juego.modo_actual.capitalize()} | Dificultad: {self.juego.dificultad}", font=('Arial', 10, 'bold')).pack(side=tk.LEFT, padx=10)
+
+            self.label_energia = tk.Label(info_frame, text=f"Energía: {self.juego.jugador.energia:.1f}%")
+            self.label_energia.pack(side=tk.LEFT, padx=10)
+
+            self.label_puntaje = tk.Label(info_frame, text="Puntos: 0")
+            self.label_puntaje.pack(side=tk.LEFT, padx=10)
+
+            self.label_trampas = tk.Label(info_frame, text=f"Trampas: 0/{self.juego.config['max_trampas']}")
+            self.label_trampas.pack(side=tk.LEFT, padx=10)
+
+            self.label_bucle = tk.Label(info_frame, text="Jitter: -")
+            self.label_bucle.pack(side=tk.LEFT, padx=10)
+
+            self.label_perfil = tk.Label(self, justify=tk.LEFT, anchor='nw', font=('Courier', 9), bg="black", fg="white")
+            if self.mostrar_perfil:
+                self.label_perfil.place(in_=self.canvas_mapa, x=4, y=4)
+
+            if self.juego.modo_actual == 'cazador':
+                 button_text = "Guardar Puntaje y Salir"
+                 button_bg = "#E74C3C"
+            else:
+                 button_text = "Reiniciar (Menú Principal)"
+                 button_bg = None
+
+            tk.Button(info_frame, text=button_text, command=self.reiniciar_juego, bg=button_bg).pack(side=tk.RIGHT, padx=10)
+
+        def guardar_repeticion(self, resultado=None):
+            try:
+                os.makedirs(RUTA_REPETICIONES, exist_ok=True)
+                nombre = f"{time.strftime('%Y%m%d-%H%M%S')}_{self.juego.modo_actual}_{self.juego.semilla}.rep"
+                ruta = guardar_repeticion(self.juego, os.path.join(RUTA_REPETICIONES, nombre), resultado)
+                print(f"Repetición guardada en {ruta}")
+            except OSError as error:
+                print(f"No se pudo guardar la repetición: {error}")
+
+        def reiniciar_juego(self):
+            if self.juego and self.juego.modo_actual == 'cazador':
+                self.guardar_repeticion()
+                self.juego.puntaje_manager.log_cazador_final(self.juego.jugador.nombre, self.juego.dificultad)
+
+            self.juego = None
+            self.corriendo = False
+            self.entrada.reiniciar()
+            RegistroVentana(self.master, self.iniciar_juego, self.puntaje_manager_global)
+
+        def dibujar_mapa(self):
+            # Dibujo retenido: las celdas visibles son un conjunto fijo de rectángulos que se
+            # recolorean al mover la cámara; en cada frame solo se mueven (coords) o
+            # reconfiguran los ítems de las entidades que cambiaron
+            if not self.juego or not self.canvas_mapa: return
+            if self.version_escena != self.juego.version_mapa:
+                self._construir_escena()
+
+            self._actualizar_camara()
+
+            jugador = self.juego.jugador
+            self._mover_item(self.item_jugador, jugador.x, jugador.y, 10)
+            if self.corriendo != self.jugador_corriendo:
+                self.jugador_corriendo = self.corriendo
+                self.canvas_mapa.itemconfig(self.item_jugador, outline="darkorange" if self.corriendo else "red")
+
+            items_enemigos = {}
+            for clave, (ex, ey) in self.juego.posiciones_enemigos().items():
+                item = self.items_enemigos.pop(clave, None)
+                if item is None:
+                    item = self._crear_entidad(ex, ey, "yellow", "enemigo", is_rect=True)
+                else:
+                    self._mover_item(item, ex, ey, 8)
+                items_enemigos[clave] = item
+            for item in self.items_enemigos.values():
+                self._borrar_item(item)
+            self.items_enemigos = items_enemigos
+
+            items_trampas = {}
+            for trampa in self.juego.trampas_activas:
+                item = self.items_trampas.pop(trampa, None)
+                if item is None:
+                    item = self.canvas_mapa.create_oval(0, 0, 0, 0, fill="orange", tags="trampa")
+                    self.items_creados += 1
+                    PERFILADOR.contar('items_canvas')
+                    self._mover_item(item, trampa[0], trampa[1], 5)
+                    # Las trampas quedan sobre el terreno pero debajo de las entidades
+                    self.canvas_mapa.tag_lower(item, self.item_jugador)
+                else:
+                    self._mover_item(item, trampa[0], trampa[1], 5)
+                items_trampas[trampa] = item
+            for item in self.items_trampas.values():
+                self._borrar_item(item)
+            self.items_trampas = items_trampas
+
+        def _construir_escena(self):
+            self.canvas_mapa.delete("all")
+            self.posiciones_items = {}
+            self.items_enemigos = {}
+            self.items_trampas = {}
+
+            self.vista_filas = min(self.juego.filas, VISTA_CELDAS)
+            self.vista_columnas = min(self.juego.columnas, VISTA_CELDAS)
+            self.camara = None
+            self.items_vista = []
+            self.colores_vista = []
+
+            for r in range(self.vista_filas):
+                for c in range(self.vista_columnas):
+                    x1, y1 = c * CELDA_TAMANO, r * CELDA_TAMANO
+                    x2, y2 = x1 + CELDA_TAMANO, y1 + CELDA_TAMANO
+                    self.items_vista.append(self.canvas_mapa.create_rectangle(x1, y1, x2, y2, fill=COLOR_FONDO, outline="#ccc"))
+                    self.colores_vista.append(COLOR_FONDO)
+
+            self.item_salida = self.canvas_mapa.create_text(0, 0, text="FIN", font=('Arial', 10, 'bold'), state='hidden')
+            self.items_creados += len(self.items_vista) + 1
+            PERFILADOR.contar('items_canvas', len(self.items_vista) + 1)
+
+            self.jugador_corriendo = self.corriendo
+            self.item_jugador = self._crear_entidad(self.juego.jugador.x, self.juego.jugador.y, "red", "jugador")
+            self.version_escena = self.juego.version_mapa
+
+        def _actualizar_camara(self):
+            # Cámara centrada en el jugador y limitada a los bordes del mapa
+            jugador = self.juego.jugador
+            fila0 = min(max(0, jugador.x - self.vista_filas // 2), self.juego.filas - self.vista_filas)
+            columna0 = min(max(0, jugador.y - self.vista_columnas // 2), self.juego.columnas - self.vista_columnas)
+            if (fila0, columna0) == self.camara:
+                return
+            self.camara = (fila0, columna0)
+
+            mapa = self.juego.mapa_logico
+            slot = 0
+            for r in range(fila0, fila0 + self.vista_filas):
+                for c in range(columna0, columna0 + self.vista_columnas):
+                    color = COLORES_TERRENO.get(mapa[r][c].simbolo, "gray")
+                    if self.colores_vista[slot] != color:
+                        self.colores_vista[slot] = color
+                        self.canvas_mapa.itemconfig(self.items_vista[slot], fill=color)
+                    slot += 1
+
+            salida_fila = self.juego.salida_pos[0] - fila0
+            salida_columna = self.juego.salida_pos[1] - columna0
+            if 0 <= salida_fila < self.vista_filas and 0 <= salida_columna < self.vista_columnas:
+                self.canvas_mapa.coords(self.item_salida, salida_columna * CELDA_TAMANO + CELDA_TAMANO/2,
+                                        salida_fila * CELDA_TAMANO + CELDA_TAMANO/2)
+                self.canvas_mapa.itemconfig(self.item_salida, state='normal')
+            else:
+                self.canvas_mapa.itemconfig(self.item_salida, state='hidden')
+
+        def _mover_item(self, item, r, c, radio):
+            # Se guarda la celda en pantalla (None si está fuera de la vista) para no tocar
+            # el ítem si no cambió
+            fila, columna = r - self.camara[0], c - self.camara[1]
+            visible = 0 <= fila < self.vista_filas and 0 <= columna < self.vista_columnas
+            destino = (fila, columna) if visible else None
+
+            anterior = self.posiciones_items.get(item, False)
+            if anterior == destino:
+                return
+            self.posiciones_items[item] = destino
+
+            if not visible:
+                self.canvas_mapa.itemconfig(item, state='hidden')
+                return
+            if anterior is None:
+                self.canvas_mapa.itemconfig(item, state='normal')
+
+            cx = columna * CELDA_TAMANO + CELDA_TAMANO // 2
+            cy = fila * CELDA_TAMANO + CELDA_TAMANO // 2
+            self.canvas_mapa.coords(item, cx - radio, cy - radio, cx + radio, cy + radio)
+
+        def _borrar_item(self, item):
+            self.posiciones_items.pop(item, None)
+            self.canvas_mapa.delete(item)
+
+        def _crear_entidad(self, r, c, color, tag, is_rect=False):
+            border_color = "red"
+            if tag == "jugador" and self.corriendo:
+                border_color = "darkorange"
+
+            if is_rect:
+                item = self.canvas_mapa.create_rectangle(0, 0, 0, 0, fill=color, tags=tag, outline="black")
+            else:
+                item = self.canvas_mapa.create_oval(0, 0, 0, 0, fill=color, tags=tag, outline=border_color, width=2)
+
+            self.items_creados += 1
+            PERFILADOR.contar('items_canvas')
+            if self.camara is not None:
+                self._mover_item(item, r, c, 8 if is_rect else 10)
+            return item
+
+        def manejar_tecla(self, event):
+            if not self.juego: return
+            self.entrada.apretar(event.keysym, time.perf_counter())
+
+        def soltar_tecla(self, event):
+            self.entrada.soltar(event.keysym)
+
+        def aplicar_entrada_tick(self):
+            dx, dy, trampa, instante = self.entrada.muestrear()
+            self.corriendo = self.entrada.corriendo
+
+            if trampa and self.juego.modo_actual == 'escapa':
+                self.colocar_trampa_handler()
+
+            if dx != 0 or dy != 0:
+                if self.juego.aplicar_entrada(dx, dy, self.corriendo) and instante is not None:
+                    self.entrada.paso_aplicado(instante)
+
+        def colocar_trampa_handler(self):
+            max_trampas = self.juego.config['max_trampas']
+            if self.juego.indice.cantidad_trampas < max_trampas:
+                # Pasa por aplicar_entrada para que la trampa quede en la repetición
+                antes = self.juego.indice.cantidad_trampas
+                self.juego.aplicar_entrada(trampa=True)
+                if self.juego.indice.cantidad_trampas == antes:
+                    tiempo_restante = max(0, self.juego.jugador.trampa_cooldown_fin - self.juego.reloj())
+                    if tiempo_restante > 0:
+                        print(f"Trampa en cooldown. Espera {tiempo_restante:.1f}s")
+                    else:
+                          print(f"Límite de {max_trampas} trampas activas alcanzado.")
 
+            else:
+                print(f"Límite de {max_trampas} trampas activas alcanzado.")
+
+        def actualizar_info(self):
+            if not self.juego: return
+
+            cooldown_restante = max(0, self.juego.jugador.trampa_cooldown_fin - self.juego.reloj())
+            cooldown_str = f" ({cooldown_restante:.1f}s)" if cooldown_restante > 0 else ""
+
+            self.label_energia.config(text=f"Energía: {self.juego.jugador.energia:.1f}%")
+            self.label_puntaje.config(text=f"Puntos: {self.juego.puntaje_manager.puntos_actuales}")
+            self.label_trampas.config(text=f"Trampas: {self.juego.indice.cantidad_trampas}/{self.juego.config['max_trampas']}{cooldown_str}")
+
+            retrasos = sorted(self.retrasos)
+            latencia_p50, latencia_p99 = self.entrada.percentiles_latencia()
+            self.label_bucle.config(text=f"Jitter p50/p99: {percentil(retrasos, 0.5) * 1000:.1f}/"
+                                         f"{percentil(retrasos, 0.99) * 1000:.1f} ms | Frames omitidos: {self.frames_omitidos}"
+                                         f" | Tecla a pantalla p50/p99: {latencia_p50 * 1000:.0f}/{latencia_p99 * 1000:.0f} ms")
+
+        def mostrar_final(self, resultado):
+            if resultado == "VICTORIA":
+                puntaje = self.juego.puntaje_final if self.juego.puntaje_final is not None else 'N/A'
+                mensaje = f"¡VICTORIA! Has escapado en dificultad {self.juego.dificultad}.\nTu puntaje final es: {puntaje}"
+                if self.juego.puntaje_manager.ultima_posicion:
+                    mensaje += f"\nQuedaste en el puesto #{self.juego.puntaje_manager.ultima_posicion} de {self.juego.dificultad}."
+            elif resultado == "DERROTA_ATRAPADO":
+                  mensaje = "¡DERROTA! Has sido atrapado por un cazador."
+            else:
+                return
+
+            self.guardar_repeticion(resultado)
+            messagebox.showinfo(resultado, mensaje)
+            self.reiniciar_juego()
+
+        def iniciar_bucle(self):
+            # Un único bucle activo: se cancela el anterior si una partida nueva empieza
+            if self.id_bucle is not None:
+                self.master.after_cancel(self.id_bucle)
+            ahora = time.perf_counter()
+            self.acumulador = 0.0
+            self.ultimo_instante = ahora
+            self.ultimo_dibujo = ahora - 1 / FPS
+            self.llamado_esperado = ahora
+            self.retrasos.clear()
+            self.frames_omitidos = 0
+            self.entrada.reiniciar()
+            self.entrada.latencias.clear()
+            self.actualizar_juego()
+
+        def actualizar_juego(self):
+            # Paso fijo con acumulador: la simulación avanza TICKS_POR_SEGUNDO veces por segundo
+            # real sin importar la carga, y el dibujo corre aparte con tope de FPS
+            self.id_bucle = None
+            if not self.juego:
+                return
+
+            ahora = time.perf_counter()
+            self.retrasos.append(max(0.0, ahora - self.llamado_esperado))
+            self.acumulador += ahora - self.ultimo_instante
+            self.ultimo_instante = ahora
+
+            paso = 1 / TICKS_POR_SEGUNDO
+            ticks = 0
+            resultado = None
+            with PERFILADOR.tramo('simulacion'):
+                while self.acumulador >= paso and ticks < MAX_TICKS_POR_FRAME:
+                    self.aplicar_entrada_tick()
+                    resultado = self.juego.avanzar_tick(self.corriendo)
+                    self.acumulador -= paso
+                    ticks += 1
+
+                    if resultado:
+                        break
+            if resultado:
+                self.mostrar_final(resultado)
+                return
+
+            if self.acumulador >= paso:
+                self.acumulador = 0.0
+
+            if ahora - self.ultimo_dibujo >= 1 / FPS:
+                self.frames_omitidos += max(0, int((ahora - self.ultimo_dibujo) * FPS) - 1)
+                self.ultimo_dibujo = ahora
+                with PERFILADOR.tramo('frame'):
+                    with PERFILADOR.tramo('info'):
+                        self.actualizar_info()
+                        self.actualizar_perfil()
+                    with PERFILADOR.tramo('dibujo'):
+                        self.dibujar_mapa()
+                    # El movimiento aparece cuando Tk pinta, enseguida después de este llamado
+                    self.entrada.frame_mostrado(time.perf_counter())
+
+            despues = time.perf_counter()
+            proximo_tick = despues + max(0.0, paso - self.acumulador)
+            proximo_dibujo = self.ultimo_dibujo + 1 / FPS
+            self.llamado_esperado = min(proximo_tick, proximo_dibujo)
+            espera_ms = max(1, int((self.llamado_esperado - despues) * 1000))
+            self.id_bucle = self.master.after(espera_ms, self.actualizar_juego)
+
+
+    return tk, Interfaz
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = Interfaz(root)
-    root.mainloop()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Proyecto 2: Escapa del Laberinto")
+    parser.add_argument('--headless', action='store_true', help="Simular partidas con el bot, sin interfaz")
+    parser.add_argument('--lote', action='store_true', help="Barrido de dificultad en varios procesos")
+    parser.add_argument('--partidas', type=int, default=100, help="Partidas (por combinación en --lote)")
+    parser.add_argument('--modo', choices=['escapa', 'cazador'], default='escapa')
+    parser.add_argument('--dificultad', choices=['Facil', 'Normal', 'Dificil'], default='Normal')
+    parser.add_argument('--filas', type=int, default=15)
+    parser.add_argument('--columnas', type=int, default=15)
+    parser.add_argument('--ticks', type=int, default=TICKS_POR_SEGUNDO * 120, help="Máximo de ticks por partida")
+    parser.add_argument('--modos', nargs='+', default=['escapa', 'cazador'])
+    parser.add_argument('--dificultades', nargs='+', default=['Facil', 'Normal', 'Dificil'])
+    parser.add_argument('--tamanos', nargs='+', type=int, default=[15])
+    parser.add_argument('--barrido', nargs='*', default=[], help="Parámetros a barrer, p.ej. velocidad_escapa=10,20,30")
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--salida', default="resultados_lote.csv")
+    parser.add_argument('--algoritmo', choices=['campo'] + sorted(ALGORITMOS_BUSQUEDA), default=None,
+                        help="Búsqueda de caminos de los enemigos (por defecto la de la dificultad)")
+    parser.add_argument('--enjambre', type=int, default=None,
+                        help="Partidas con N enemigos guardados en arreglos paralelos (--headless)")
+    parser.add_argument('--servidor', action='store_true', help="Servir partidas por red (JSON por línea)")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--puerto', type=int, default=PUERTO_SERVIDOR)
+    parser.add_argument('--prueba-servidor', action='store_true',
+                        help="Prueba de carga del servidor con clientes locales (--salas, --duracion)")
+    parser.add_argument('--salas', nargs='+', type=int, default=[10, 50, 100])
+    parser.add_argument('--duracion', type=float, default=5.0)
+    parser.add_argument('--construir-paquete', default=None,
+                        help="Generar un paquete de niveles (--niveles por cada tamaño de --tamanos)")
+    parser.add_argument('--niveles', type=int, default=1000)
+    parser.add_argument('--paquete', default=None, help="Jugar los niveles de un paquete (--headless)")
+    parser.add_argument('--nivel', type=int, default=0, help="Primer nivel del paquete a jugar")
+    parser.add_argument('--grabar', default=None, help="Carpeta donde guardar una repetición por partida (--headless)")
+    parser.add_argument('--reproducir', nargs='+', default=None, help="Reproducir repeticiones .rep sin interfaz")
+    parser.add_argument('--bench', action='store_true', help="Ejecutar los benchmarks y guardar los resultados")
+    parser.add_argument('--bench-salida', default="benchmark.json")
+    parser.add_argument('--bench-comparar', default=None, help="JSON de una corrida anterior; falla si algo empeora")
+    parser.add_argument('--bench-umbral', type=float, default=0.25, help="Empeoramiento tolerado (0.25 = 25%%)")
+    parser.add_argument('--bench-escala', type=int, default=1, help="Divide el tamaño de cada benchmark (corridas rápidas)")
+    parser.add_argument('--bench-repeticiones', type=int, default=REPETICIONES_BENCH,
+                        help="Repeticiones de cada benchmark tras el calentamiento; se guarda la mediana")
+    parser.add_argument('--perfil', action='store_true', help="Medir tiempos por etapa y mostrar el resumen (--headless, --reproducir)")
+    parser.add_argument('--traza', default=None, help="Guardar una traza Chrome (chrome://tracing, Perfetto, speedscope)")
+    args = parser.parse_args()
+
+    # La interfaz activa el perfilador por su cuenta; el lote corre en otros procesos
+    if (args.perfil or args.traza) and (args.headless or args.reproducir) and not args.lote:
+        PERFILADOR.activar(grabar_traza=args.traza is not None)
+
+    if args.bench:
+        raise SystemExit(0 if ejecutar_benchmarks_desde_args(args) else 1)
+    elif args.construir_paquete:
+        construir_paquete_desde_args(args)
+    elif args.prueba_servidor:
+        ejecutar_prueba_servidor(args)
+    elif args.servidor:
+        ejecutar_servidor(args)
+    elif args.reproducir:
+        coinciden = ejecutar_repeticiones(args)
+    elif args.lote:
+        ejecutar_lote_desde_args(args)
+    elif args.headless:
+        ejecutar_sin_interfaz(args)
+    else:
+        tk, Interfaz = cargar_interfaz()
+        root = tk.Tk()
+        app = Interfaz(root, args.traza)
+        root.mainloop()
+
+    if PERFILADOR.activo and (args.headless or args.reproducir):
+        print(PERFILADOR.texto_resumen())
+        if args.traza:
+            print(f"Traza guardada en {PERFILADOR.exportar_traza(args.traza)}")
+    if args.reproducir and not coinciden:
+        raise SystemExit(1)
 
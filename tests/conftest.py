@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+RUTA_JUEGO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "avance proyecto 2.py")
+
+
+@pytest.fixture(scope="session")
+def juego():
+    # El nombre del archivo tiene espacios: se carga por ruta en vez de importarlo. Queda
+    # registrado en sys.modules para que los procesos hijos puedan pasar sus funciones
+    spec = importlib.util.spec_from_file_location("avance_proyecto_2", RUTA_JUEGO)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
@@ -0,0 +1,42 @@
+import pytest
+
+
+def test_umbral_metrica(juego):
+    assert juego.umbral_metrica('tick/enemigos_1/p99', 1e-5, 0.25) is None
+    assert juego.umbral_metrica('generar_mapa/250', 0.2, 0.25) == 0.25
+    # Bajo el milisegundo se tolera FACTOR_UMBRAL_SUBMS veces el umbral
+    assert juego.umbral_metrica('tick/enemigos_1', 1e-6, 0.25) == 0.25 * juego.FACTOR_UMBRAL_SUBMS
+    # Un ruido menor que el umbral no lo baja; uno mayor lo sube
+    assert juego.umbral_metrica('generar_mapa/250', 0.2, 0.25, 0.1) == 0.25
+    assert juego.umbral_metrica('generar_mapa/250', 0.2, 0.25, 0.5) == 0.5
+
+
+@pytest.mark.parametrize('anterior', [0.2, 1e-6])
+def test_dispersion_acotada(juego, anterior):
+    base = juego.umbral_metrica('bfs/enemigo_120', anterior, 0.25)
+    maximo = base * juego.FACTOR_DISPERSION_MAXIMA
+    assert juego.umbral_metrica('bfs/enemigo_120', anterior, 0.25, 100.0) == maximo
+    assert juego.umbral_metrica('bfs/enemigo_120', anterior, 0.25, maximo - 0.01) == maximo - 0.01
+
+
+def test_umbral_propio_por_metrica(juego):
+    base = {'tick/enemigos_1': 1e-6, 'tick/enemigos_1/p99': 1e-5, 'generar_mapa/250': 0.2, 'bfs/enemigo_120': 0.005}
+    actuales = {'tick/enemigos_1': 1.4e-6, 'tick/enemigos_1/p99': 1e-4, 'generar_mapa/250': 0.3, 'bfs/enemigo_120': 0.007}
+    # El p99 no cuenta, bajo el milisegundo se tolera el doble y el ruido medido sube el umbral
+    assert juego.comparar_benchmarks(actuales, base, 0.25, {'bfs/enemigo_120': 0.5}) == ['generar_mapa/250']
+
+
+def test_comparar_benchmarks(juego):
+    base = {'a': 1.0, 'b': 1.0, 'c': 2.0, 'd': 0.0, 'e': 0.0, 'quitada': 1.0}
+    actuales = {'a': 1.25, 'b': 1.26, 'c': 1.0, 'd': 0.0, 'e': 0.1, 'nueva': 5.0}
+    # Justo en el umbral no es regresión; mejorar nunca lo es; las métricas sin par se saltean
+    assert juego.comparar_benchmarks(actuales, base, 0.25) == ['b', 'e']
+    assert juego.comparar_benchmarks(actuales, actuales, 0.25) == []
+
+
+def test_ruido_enorme_no_esconde_una_regresion(juego):
+    base = {'generar_mapa/250': 0.2}
+    # Con umbral 25% y ruido 1000%, el límite queda en 75%: duplicar el tiempo se marca igual
+    assert juego.comparar_benchmarks({'generar_mapa/250': 0.4}, base, 0.25, {'generar_mapa/250': 10.0}) == \
+        ['generar_mapa/250']
+    assert juego.comparar_benchmarks({'generar_mapa/250': 0.34}, base, 0.25, {'generar_mapa/250': 10.0}) == []
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+
+def _recorrer(mapa, mascara, inicio, camino):
+    # El camino viene invertido (próximo paso al final): cada paso es a un vecino transitable
+    actual = inicio
+    for celda in reversed(camino):
+        assert mascara[celda]
+        fila, col = divmod(actual, mapa.columnas)
+        fila_sig, col_sig = divmod(celda, mapa.columnas)
+        assert abs(fila - fila_sig) + abs(col - col_sig) == 1
+        actual = celda
+    return actual
+
+
+@pytest.mark.parametrize('algoritmo', ['astar', 'jps'])
+@pytest.mark.parametrize('semilla', range(8))
+def test_camino_minimo_igual_a_bfs(juego, algoritmo, semilla):
+    rng = random.Random(semilla)
+    tamano = (15, 30, 60)[semilla % 3]
+    partida = juego.Juego(tamano, tamano, 'escapa', 'Normal', semilla=semilla)
+    mapa = partida.mapa_logico
+    mascara = mapa.mascara_enemigo
+    buscador = juego.ALGORITMOS_BUSQUEDA[algoritmo]()
+    transitables = [idx for idx in range(len(mascara)) if mascara[idx]]
+
+    sin_camino = 0
+    for _ in range(40):
+        inicio, objetivo = rng.choice(transitables), rng.choice(transitables)
+        distancia = juego.CampoDistancias(mapa, divmod(objetivo, mapa.columnas)).distancias[inicio]
+        camino = buscador.buscar(mapa, mascara, inicio, objetivo)
+        if distancia == -1:
+            assert camino is None
+            sin_camino += 1
+            continue
+        assert len(camino) == distancia
+        assert _recorrer(mapa, mascara, inicio, camino) == objetivo
+    assert sin_camino < 40
+
+
+@pytest.mark.parametrize('algoritmo', ['astar', 'jps'])
+def test_objetivo_bloqueado_o_aislado(juego, algoritmo):
+    # Una columna de muros parte el mapa en dos; la salida de la izquierda es un muro
+    codigos = bytearray(juego.Camino().simbolo for _ in range(10 * 10))
+    for fila in range(10):
+        codigos[fila * 10 + 5] = juego.Muro().simbolo
+    codigos[3 * 10 + 1] = juego.Muro().simbolo
+    mapa = juego.MapaTerreno(10, 10, codigos)
+    buscador = juego.ALGORITMOS_BUSQUEDA[algoritmo]()
+
+    assert buscador.buscar(mapa, mapa.mascara_enemigo, mapa.indice(0, 0), mapa.indice(3, 1)) is None
+    assert buscador.buscar(mapa, mapa.mascara_enemigo, mapa.indice(0, 0), mapa.indice(9, 9)) is None
+    camino = buscador.buscar(mapa, mapa.mascara_enemigo, mapa.indice(0, 0), mapa.indice(9, 4))
+    assert len(camino) == 13
+
+
+def test_camino_guardado_se_replanifica_fuera_del_radio(juego):
+    mapa = juego.MapaTerreno(20, 20)
+    buscador = juego.BuscadorAEstrella()
+    enemigo = juego.Enemigo(0, 0, 'escapa', 1, buscador, radio_replanificacion=4)
+
+    def paso(objetivo):
+        enemigo.x, enemigo.y = enemigo._paso_planificado((enemigo.x, enemigo.y), objetivo, mapa)
+
+    paso((19, 19))
+    assert buscador.consultas == 1
+    # Dentro del radio se sigue con el camino guardado
+    paso((19, 15))
+    paso((17, 17))
+    assert buscador.consultas == 1
+    # Más lejos que el radio del punto planificado: se recalcula
+    paso((10, 19))
+    assert buscador.consultas == 2
+    # Si el próximo paso se cierra también
+    siguiente = divmod(enemigo.camino[-1], mapa.columnas)
+    mapa[siguiente[0]][siguiente[1]] = juego.Muro()
+    paso((10, 19))
+    assert buscador.consultas == 3
+    assert (enemigo.x, enemigo.y) != siguiente
+
+
+def test_cerca_del_final_la_tolerancia_se_achica(juego):
+    mapa = juego.MapaTerreno(20, 20)
+    buscador = juego.BuscadorAEstrella()
+    enemigo = juego.Enemigo(0, 0, 'escapa', 1, buscador, radio_replanificacion=4)
+    enemigo.x, enemigo.y = enemigo._paso_planificado((0, 0), (0, 6), mapa)
+    # Quedan 5 pasos: la tolerancia baja a 2, así que un desvío de 3 ya replanifica
+    enemigo._paso_planificado((enemigo.x, enemigo.y), (0, 3), mapa)
+    assert buscador.consultas == 2
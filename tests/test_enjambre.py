@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.mark.parametrize('modo', ['escapa', 'cazador'])
+@pytest.mark.parametrize('dificultad', ['Facil', 'Dificil'])
+@pytest.mark.parametrize('semilla', range(4))
+def test_enjambre_igual_a_enemigos_sueltos(juego, modo, dificultad, semilla):
+    # El enjambre sigue los campos de distancias, así que los enemigos sueltos también
+    parametros = {'algoritmo_escapa': 'campo', 'algoritmo_cazador': 'campo', 'enemigos_escapa': 6}
+    partidas = [juego.Juego(25, 25, modo, dificultad, dict(parametros, enjambre=enjambre), semilla)
+                for enjambre in (False, True)]
+    bots = [juego.BotJugador(), juego.BotJugador()]
+    assert partidas[1].enjambre is not None and partidas[0].enjambre is None
+
+    for _ in range(3000):
+        entradas = [bot(partida) for bot, partida in zip(bots, partidas)]
+        assert entradas[0] == entradas[1]
+        resultados = [partida.paso(*entrada) if entrada else partida.paso()
+                      for partida, entrada in zip(partidas, entradas)]
+        assert resultados[0] == resultados[1]
+        # Los identificadores dependen del orden de las apariciones; las posiciones no
+        sueltos, enjambre = (sorted(partida.posiciones_enemigos().values()) for partida in partidas)
+        assert sueltos == enjambre
+        assert partidas[0].puntaje_manager.puntos_actuales == partidas[1].puntaje_manager.puntos_actuales
+        if resultados[0] is not None:
+            break
+    assert partidas[0].resumen(resultados[0]) | {'tiempo': 0} == partidas[1].resumen(resultados[1]) | {'tiempo': 0}
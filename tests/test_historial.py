@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+FILTROS = [{}, {'modo': 'escapa'}, {'modo': 'cazador', 'dificultad': 'Dificil'}, {'dificultad': 'Normal'},
+           {'nombre': 'Ana'}]
+
+
+@pytest.fixture
+def puntajes(juego):
+    # Pocas fechas distintas: casi todas las páginas cortan en medio de un empate
+    rng = random.Random(13)
+    manager = juego.PuntajeManager()
+    for _ in range(400):
+        manager.almacen.registrar(rng.choice(['Ana', 'Beto', 'Caro']), rng.choice(['escapa', 'cazador']),
+                                  rng.choice(['Facil', 'Normal', 'Dificil']), rng.randrange(1000),
+                                  f"2024-01-0{rng.randrange(1, 6)} 10:00:00")
+    return manager
+
+
+def _esperado(manager, filtros, limite=-1, salto=0):
+    donde, parametros = manager.almacen._filtro(**filtros)
+    filas = manager.almacen.conexion.execute(
+        f"SELECT id, nombre, modo, dificultad, puntaje, fecha FROM partidas{donde} "
+        f"ORDER BY fecha DESC, id DESC LIMIT ? OFFSET ?", parametros + [limite, salto])
+    return [dict(fila) for fila in filas]
+
+
+def _clave(fila):
+    return (fila['fecha'], fila['id'])
+
+
+@pytest.mark.parametrize('filtros', FILTROS)
+@pytest.mark.parametrize('limite', [1, 7, 50])
+def test_paginas_iguales_a_offset(puntajes, filtros, limite):
+    cursor, salto = None, 0
+    while True:
+        pagina = puntajes.pagina_historial(cursor, limite, **filtros)
+        assert pagina == _esperado(puntajes, filtros, limite, salto)
+        if not pagina:
+            break
+        cursor, salto = _clave(pagina[-1]), salto + limite
+    assert salto >= puntajes.cantidad_historial(**filtros)
+
+
+@pytest.mark.parametrize('filtros', FILTROS)
+def test_mover_cursor_igual_a_offset(puntajes, filtros):
+    rng = random.Random(len(filtros))
+    todas = _esperado(puntajes, filtros)
+    # El cursor de la posición p es la clave de la fila p - 1; None es el principio
+    cursores = [None] + [_clave(fila) for fila in todas]
+    for _ in range(200):
+        posicion = rng.randrange(len(cursores))
+        filas = rng.randint(-40, 40)
+        movido = puntajes.mover_cursor_historial(cursores[posicion], filas, **filtros)
+        if posicion + filas < 0:
+            assert movido is None
+        elif posicion + filas >= len(cursores):
+            assert movido == cursores[posicion]
+        else:
+            assert movido == cursores[posicion + filas]
+
+
+@pytest.mark.parametrize('filtros', FILTROS)
+def test_paginador_sigue_a_offset(juego, puntajes, filtros):
+    rng = random.Random(7)
+    paginador = juego.PaginadorHistorial(puntajes, 15)
+    paginador.PASO_ANCLA = 9
+    paginador.filtrar(**filtros)
+    total = puntajes.cantidad_historial(**filtros)
+    assert paginador.total == total
+    for _ in range(150):
+        # Pasos de rueda, páginas y saltos de barra, que usan las anclas
+        filas = rng.choice([rng.randint(-3, 3), rng.choice([-15, 15]), rng.randint(-total, total)])
+        antes = paginador.inicio
+        esperado_inicio = min(max(0, antes + filas), max(0, total - 15))
+        assert paginador.mover(filas) == (esperado_inicio != antes)
+        assert paginador.inicio == esperado_inicio
+        assert paginador.pagina() == _esperado(puntajes, filtros, 15, esperado_inicio)
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+
+def _mapa(juego, semilla, tamano):
+    return juego.Juego(tamano, tamano, 'escapa', 'Normal', semilla=semilla).mapa_logico
+
+
+def _recorrer(mapa, mascara, inicio, camino):
+    # CaminoJerarquico se consume con pop() como la lista invertida de A*
+    actual, pasos = inicio, 0
+    while len(camino):
+        celda = camino.pop()
+        assert mascara[celda]
+        fila, col = divmod(actual, mapa.columnas)
+        fila_sig, col_sig = divmod(celda, mapa.columnas)
+        assert abs(fila - fila_sig) + abs(col - col_sig) == 1
+        actual, pasos = celda, pasos + 1
+    return actual, pasos
+
+
+def _vecinos(mapa, celda):
+    fila, col = divmod(celda, mapa.columnas)
+    for df, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        if mapa.dentro(fila + df, col + dc):
+            yield mapa.indice(fila + df, col + dc)
+
+
+def _bfs(mapa, mascara, origen):
+    distancias = [-1] * len(mascara)
+    distancias[origen] = 0
+    cola = [origen]
+    for actual in cola:
+        for vecino in _vecinos(mapa, actual):
+            if mascara[vecino] and distancias[vecino] == -1:
+                distancias[vecino] = distancias[actual] + 1
+                cola.append(vecino)
+    return distancias
+
+
+@pytest.mark.parametrize('semilla', range(6))
+def test_hay_camino_solo_si_bfs_llega(juego, semilla):
+    rng = random.Random(semilla)
+    mapa = _mapa(juego, semilla, (30, 60)[semilla % 2])
+    buscador = juego.BuscadorJerarquico(tamano=6)
+    for mascara in (mapa.mascara_enemigo, mapa.mascara_jugador):
+        transitables = [idx for idx in range(len(mascara)) if mascara[idx]]
+        for _ in range(30):
+            inicio, objetivo = rng.choice(transitables), rng.choice(transitables)
+            if inicio == objetivo:
+                continue
+            esperado = _bfs(mapa, mascara, objetivo)[inicio]
+            largo = buscador.distancia(mapa, mascara, inicio, objetivo)
+            camino = buscador.buscar(mapa, mascara, inicio, objetivo)
+            if esperado == -1:
+                assert largo is None and camino is None
+                continue
+            # HPA* no garantiza el mínimo, pero nunca da menos que BFS
+            assert largo >= esperado
+            pasos = len(camino)
+            assert _recorrer(mapa, mascara, inicio, camino) == (objetivo, pasos)
+
+
+def test_objetivo_bloqueado_o_aislado(juego):
+    # Una columna de muros parte el mapa en dos; la celda (3, 1) es un muro
+    codigos = bytearray(juego.Camino().simbolo for _ in range(20 * 20))
+    for fila in range(20):
+        codigos[fila * 20 + 10] = juego.Muro().simbolo
+    codigos[3 * 20 + 1] = juego.Muro().simbolo
+    mapa = juego.MapaTerreno(20, 20, codigos)
+    grafo = juego.GrafoJerarquico(mapa, mapa.mascara_enemigo, tamano=5)
+
+    assert grafo.buscar(mapa.indice(19, 0), mapa.indice(3, 1)) is None
+    assert grafo.buscar(mapa.indice(0, 0), mapa.indice(19, 19)) is None
+    assert grafo.distancia(mapa.indice(0, 0), mapa.indice(19, 19)) is None
+    camino = grafo.buscar(mapa.indice(0, 0), mapa.indice(19, 9))
+    assert _recorrer(mapa, mapa.mascara_enemigo, mapa.indice(0, 0), camino) == (mapa.indice(19, 9), 28)
+
+
+@pytest.mark.parametrize('semilla', range(4))
+def test_bloques_actualizados_igual_a_reconstruir(juego, semilla):
+    rng = random.Random(semilla)
+    mapa = _mapa(juego, semilla, 23)
+    # La primera asignación puede cambiar las máscaras de objeto; el grafo se arma después
+    mapa.asignar_indice(0, mapa[0][0])
+    grafo = juego.GrafoJerarquico(mapa, mapa.mascara_enemigo, tamano=5)
+    bloques = range(grafo.bloques_fila * grafo.bloques_columna)
+
+    for _ in range(60):
+        celda = rng.randrange(mapa.filas * mapa.columnas)
+        mapa.asignar_indice(celda, rng.choice(juego.TERRENOS))
+        grafo.celda_cambiada(celda)
+        for bloque in rng.sample(bloques, 4):
+            grafo._calcular_bloque(bloque)
+
+        nuevo = juego.GrafoJerarquico(mapa, mapa.mascara_enemigo, tamano=5)
+        assert grafo.bordes == nuevo.bordes
+        for bloque in bloques:
+            grafo._calcular_bloque(bloque)
+            nuevo._calcular_bloque(bloque)
+            assert grafo.entradas[bloque] == nuevo.entradas[bloque]
+            assert grafo.aristas[bloque] == nuevo.aristas[bloque]
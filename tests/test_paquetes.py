@@ -0,0 +1,73 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def paquete(juego, tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp('paquete') / 'niveles.pack')
+    assert juego.construir_paquete(ruta, [9, 16], 3, semilla_inicial=40, procesos=1) == 6
+    return ruta
+
+
+def test_niveles_iguales_a_generar(juego, paquete):
+    niveles = juego.PaqueteNiveles(paquete)
+    assert len(niveles) == 6
+    semillas = []
+    for i in range(len(niveles)):
+        nivel = niveles.nivel(i)
+        semillas.append(nivel.semilla)
+        for modo in ('escapa', 'cazador'):
+            generado = juego.Juego(nivel.filas, nivel.columnas, modo, 'Normal', semilla=nivel.semilla)
+            cargado = juego.Juego(0, 0, modo, 'Normal', nivel=nivel)
+            assert (cargado.filas, cargado.columnas, cargado.semilla) == (generado.filas, generado.columnas,
+                                                                         generado.semilla)
+            assert bytes(cargado.mapa_logico.codigos) == bytes(generado.mapa_logico.codigos)
+            assert bytes(cargado.mapa_logico.mascara_jugador) == bytes(generado.mapa_logico.mascara_jugador)
+            assert bytes(cargado.mapa_logico.mascara_enemigo) == bytes(generado.mapa_logico.mascara_enemigo)
+            assert cargado.salida_pos == generado.salida_pos
+            assert list(cargado.aparicion.campo_salida.distancias) == list(generado.aparicion.campo_salida.distancias)
+            for tipo in ('escapa', 'cazador'):
+                assert list(cargado.aparicion.candidatas[tipo]) == list(generado.aparicion.candidatas[tipo])
+            assert cargado.posiciones_enemigos() == generado.posiciones_enemigos()
+            assert cargado.rng.getstate() == generado.rng.getstate()
+    assert semillas == list(range(40, 46))
+
+
+def test_cambiar_terreno_no_toca_el_archivo(juego, paquete):
+    niveles = juego.PaqueteNiveles(paquete)
+    antes = bytes(niveles.nivel(1).codigos)
+    partida = juego.Juego(0, 0, 'escapa', 'Normal', nivel=niveles.nivel(1))
+    partida.cambiar_terreno(2, 2, juego.TERRENOS[1])
+    partida.cambiar_terreno(3, 3, juego.TERRENOS[0])
+    assert bytes(niveles.nivel(1).codigos) == antes
+
+
+def test_cabecera_o_indice_invalidos(juego, paquete, tmp_path):
+    contenido = open(paquete, 'rb').read()
+    fin_indice = juego.CABECERA_PAQUETE.size + 6 * juego.ENTRADA_PAQUETE.size
+    casos = {
+        'vacio': (b"", "no es un paquete"),
+        'cabecera_corta': (contenido[:5], "no es un paquete"),
+        'magia': (b"XXXX" + contenido[4:], "no es un paquete"),
+        'version': (contenido[:4] + b"\x09" + contenido[5:], "no es un paquete"),
+        'sin_indice': (contenido[:fin_indice - 1], "falta el índice"),
+    }
+    for nombre, (datos, mensaje) in casos.items():
+        ruta = tmp_path / f'{nombre}.pack'
+        ruta.write_bytes(datos)
+        with pytest.raises(ValueError, match=mensaje):
+            juego.PaqueteNiveles(str(ruta))
+
+    # El índice está completo pero el último bloque quedó cortado
+    ruta = tmp_path / 'cortado.pack'
+    ruta.write_bytes(contenido[:-1])
+    niveles = juego.PaqueteNiveles(str(ruta))
+    niveles.nivel(0)
+    with pytest.raises(ValueError, match="se sale del archivo"):
+        niveles.nivel(5)
+
+
+@pytest.mark.parametrize('indice', [-1, 6, 100])
+def test_indice_fuera_de_rango(juego, paquete, indice):
+    niveles = juego.PaqueteNiveles(paquete)
+    with pytest.raises(IndexError, match=f"Nivel {indice} fuera de rango"):
+        niveles.nivel(indice)
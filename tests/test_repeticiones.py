@@ -0,0 +1,51 @@
+import pytest
+
+
+def _grabar(juego, ruta, modo, semilla, parametros=None):
+    partida = juego.Juego(20, 20, modo, 'Normal', parametros, semilla)
+    partida.jugador.nombre = "Bot"
+    resumen = partida.simular(juego.BotJugador(), 3000)
+    juego.guardar_repeticion(partida, ruta, resumen['resultado'])
+    return partida, resumen
+
+
+@pytest.mark.parametrize('modo', ['escapa', 'cazador'])
+@pytest.mark.parametrize('semilla', range(3))
+def test_reproducir_da_el_mismo_final(juego, tmp_path, modo, semilla):
+    ruta = str(tmp_path / 'partida.rep')
+    partida, resumen = _grabar(juego, ruta, modo, semilla)
+
+    datos = juego.cargar_repeticion(ruta)
+    assert (datos['semilla'], datos['modo'], datos['ticks']) == (semilla, modo, resumen['ticks'])
+    reproducida = juego.reproducir_repeticion(datos)
+    assert reproducida['coincide']
+    assert reproducida['resultado'] == resumen['resultado']
+    assert reproducida['puntaje'] == resumen['puntaje']
+    assert reproducida['ticks'] == resumen['ticks']
+    assert reproducida['jugador'] == (partida.jugador.x, partida.jugador.y)
+    assert reproducida['enemigos'] == partida.posiciones_enemigos()
+
+
+def test_repeticion_truncada_o_danada_se_rechaza(juego, tmp_path):
+    ruta = tmp_path / 'partida.rep'
+    _grabar(juego, str(ruta), 'escapa', 7)
+    contenido = ruta.read_bytes()
+    assert len(contenido) > juego.CABECERA_REPETICION.size
+
+    casos = {
+        'vacia': b"",
+        'cabecera_corta': contenido[:juego.CABECERA_REPETICION.size - 1],
+        'sin_eventos': contenido[:-1],
+        'magia': b"XXXX" + contenido[4:],
+    }
+    # Un bit cambiado en la cabecera, en el JSON o en los eventos
+    for posicion in (8, juego.CABECERA_REPETICION.size + 2, len(contenido) - 2):
+        danado = bytearray(contenido)
+        danado[posicion] ^= 0x01
+        casos[f'bit_{posicion}'] = bytes(danado)
+
+    for nombre, datos in casos.items():
+        danada = tmp_path / f'{nombre}.rep'
+        danada.write_bytes(datos)
+        with pytest.raises(ValueError, match="repetición válida|dañada o incompleta"):
+            juego.cargar_repeticion(str(danada))
@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+
+async def _conversar(juego, lineas):
+    # Manda las líneas y devuelve una respuesta por cada una; la conexión debe seguir abierta
+    servidor = juego.ServidorJuegos(puerto=0)
+    await servidor.iniciar()
+    try:
+        lector, escritor = await asyncio.open_connection(servidor.host, servidor.puerto)
+        respuestas = []
+        for linea in lineas:
+            escritor.write(linea + b"\n")
+            await escritor.drain()
+            respuestas.append(json.loads(await asyncio.wait_for(lector.readline(), 5)))
+        escritor.close()
+        return respuestas
+    finally:
+        await servidor.detener()
+
+
+def test_mensajes_invalidos_responden_error_sin_cortar(juego):
+    respuestas = asyncio.run(_conversar(juego, [
+        b"x" * (1 << 17),
+        b'{"tipo": "unirse", "sala": "a", "semilla": "abc"}',
+        b'{"tipo": "unirse", "sala": "a", "filas": 500, "columnas": 500}',
+        b'{"tipo": "unirse", "sala": "a", "modo": "cazador", "filas": 3, "columnas": 3}',
+        b'{"tipo": "unirse", "sala": "a"}',
+    ]))
+    assert [respuesta['tipo'] for respuesta in respuestas] == ['error', 'error', 'error', 'error', 'inicio']
+    assert respuestas[0]['mensaje'] == "Línea demasiado larga"
+    assert respuestas[1]['mensaje'] == respuestas[2]['mensaje'] == "Sala inválida"
+    assert "no tiene celdas" in respuestas[3]['mensaje']
+
+
+def test_retraso_no_incluye_la_duracion_del_tick(juego):
+    # Un tick lento: su duración va a duraciones y no al retraso con que se despertó
+    servidor = juego.ServidorJuegos(puerto=0)
+    servidor.avanzar_salas = lambda: juego.time.sleep(0.05)
+
+    async def un_tick():
+        tarea = asyncio.create_task(servidor._bucle_ticks())
+        while not servidor.duraciones:
+            await asyncio.sleep(0.001)
+        tarea.cancel()
+
+    asyncio.run(un_tick())
+    assert servidor.duraciones[0] >= 0.05
+    assert servidor.retrasos[0] < 0.02
@@ -0,0 +1,31 @@
+import importlib.util
+import sys
+
+from conftest import RUTA_JUEGO
+
+
+def test_sin_tkinter(monkeypatch):
+    # Con None en sys.modules, cualquier import de tkinter falla como en una máquina sin Tk
+    monkeypatch.setitem(sys.modules, 'tkinter', None)
+    spec = importlib.util.spec_from_file_location("avance_proyecto_2_sin_tk", RUTA_JUEGO)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+
+    resumen = modulo.simular_partida(15, 15, 'escapa', 'Normal', 2000, semilla=1)
+    assert resumen['resultado'] in ('VICTORIA', 'DERROTA_ATRAPADO', 'TIEMPO_AGOTADO')
+
+
+def test_puntaje_manager_inyectado(juego):
+    manager = juego.PuntajeManager()
+    partidas = [juego.Juego(15, 15, 'escapa', 'Facil', semilla=semilla, puntaje_manager=manager)
+                for semilla in range(3)]
+    assert all(partida.puntaje_manager is manager for partida in partidas)
+    assert juego.Juego(15, 15, 'escapa', 'Facil', semilla=0).puntaje_manager is not manager
+
+    # Las victorias quedan en la base del manager compartido
+    victorias = 0
+    for partida in partidas:
+        partida.jugador.nombre = "Bot"
+        manager.empezar_partida()
+        victorias += partida.simular(juego.BotJugador(), 5000)['resultado'] == 'VICTORIA'
+    assert manager.cantidad_historial() == victorias > 0
@@ -0,0 +1,20 @@
+def test_soltar_en_mayuscula_suelta_la_tecla(juego):
+    # w, Shift, soltar: Tk manda el soltar como 'W' porque Shift sigue apretada
+    entrada = juego.EntradaTeclado()
+    entrada.apretar('w', 0.0)
+    entrada.apretar('Shift_L', 0.0)
+    entrada.soltar('W')
+    assert entrada.muestrear()[:2] == (-1, 0)
+    assert 'w' not in entrada.apretadas
+    assert entrada.corriendo
+    for _ in range(entrada.ticks_por_paso * 2):
+        assert entrada.muestrear()[:2] == (0, 0)
+
+
+def test_shift_con_wasd_mueve(juego):
+    entrada = juego.EntradaTeclado()
+    entrada.apretar('Shift_R', 0.0)
+    entrada.apretar('D', 0.0)
+    assert entrada.muestrear()[:2] == (0, 1)
+    entrada.apretar('T', 0.0)
+    assert entrada.muestrear()[2]
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+
+def _particion(etiquetas):
+    # Las etiquetas pueden cambiar de número; lo que importa es qué celdas van juntas
+    nombres = {}
+    return [-1 if etiqueta == -1 else nombres.setdefault(etiqueta, len(nombres)) for etiqueta in etiquetas]
+
+
+@pytest.mark.parametrize('semilla', range(6))
+def test_cambiar_terreno_igual_a_reconstruir(juego, semilla):
+    rng = random.Random(semilla)
+    partida = juego.Juego(rng.choice([8, 15, 25]), rng.choice([8, 15, 25]), rng.choice(['escapa', 'cazador']),
+                          'Normal', semilla=semilla)
+    for _ in range(120):
+        partida.obtener_campo('extra', (rng.randrange(partida.filas), rng.randrange(partida.columnas)))
+        partida.cambiar_terreno(rng.randrange(partida.filas), rng.randrange(partida.columnas),
+                                rng.choice(juego.TERRENOS))
+
+        conectividad = juego.IndiceConectividad(partida.mapa_logico, partida.version_mapa)
+        assert _particion(partida.conectividad.componentes_jugador) == _particion(conectividad.componentes_jugador)
+        assert _particion(partida.conectividad.componentes_enemigo) == _particion(conectividad.componentes_enemigo)
+
+        aparicion = juego.ServicioAparicion(partida.mapa_logico, partida.salida_pos, partida.version_mapa)
+        assert list(partida.aparicion.campo_salida.distancias) == list(aparicion.campo_salida.distancias)
+        for modo in ('escapa', 'cazador'):
+            assert list(partida.aparicion.candidatas[modo]) == list(aparicion.candidatas[modo])
+
+        for campo in partida._campos.values():
+            esperado = juego.CampoDistancias(partida.mapa_logico, campo.objetivo, partida.version_mapa)
+            assert list(campo.distancias) == list(esperado.distancias)
+            # Reparado, sigue valiendo para la versión actual del mapa
+            assert campo.version_mapa == partida.version_mapa
+
+
+@pytest.mark.parametrize('semilla', range(6))
+def test_buscador_incremental_sigue_caminos_minimos(juego, semilla):
+    # El jugador camina y el terreno cambia; cada paso debe acercar una celda según BFS
+    rng = random.Random(semilla)
+    partida = juego.Juego(15, 15, 'escapa', 'Normal', {'algoritmo_escapa': 'incremental'}, semilla=semilla)
+    mapa, filas, columnas = partida.mapa_logico, partida.filas, partida.columnas
+    buscador = partida.obtener_buscador('incremental')
+    jugador = divmod(rng.choice([i for i in range(filas * columnas) if mapa.mascara_enemigo[i]]), columnas)
+    enemigos = [divmod(rng.randrange(filas * columnas), columnas) for _ in range(3)]
+
+    for _ in range(150):
+        if rng.random() < 0.15:
+            partida.cambiar_terreno(rng.randrange(filas), rng.randrange(columnas), rng.choice(juego.TERRENOS))
+        else:
+            dx, dy = rng.choice(juego.MOVIMIENTOS)
+            x, y = jugador[0] + dx, jugador[1] + dy
+            if mapa.dentro(x, y) and mapa.mascara_jugador[mapa.indice(x, y)]:
+                jugador = (x, y)
+
+        distancias = juego.CampoDistancias(mapa, jugador).distancias
+        for i, enemigo in enumerate(enemigos):
+            paso = buscador.siguiente_paso(enemigo, jugador, mapa, partida.conectividad)
+            celda = mapa.indice(*enemigo)
+            if mapa.mascara_enemigo[celda]:
+                esperado = distancias[celda]
+            else:
+                alcanzados = [distancias[v] for v in juego.vecinos_celda(filas, columnas, celda) if distancias[v] >= 0]
+                esperado = min(alcanzados) + 1 if alcanzados else -1
+            if enemigo == jugador or esperado <= 0:
+                assert paso is None
+                continue
+            assert paso is not None
+            assert abs(paso[0] - enemigo[0]) + abs(paso[1] - enemigo[1]) == 1
+            assert distancias[mapa.indice(*paso)] == esperado - 1
+            enemigos[i] = paso